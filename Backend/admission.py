@@ -0,0 +1,105 @@
+"""
+Admission control for chat generation in the Mental Health Support API
+Decides, before a chat turn reaches the model, whether it gets a generation,
+a template reply, or a 503, from the number of generations in flight and
+how long recent ones took
+"""
+
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ADMIT = "admit"
+DEGRADE = "degrade"
+SHED = "shed"
+
+# Risk levels that always get the model, however busy it is
+ALWAYS_ADMIT = {"moderate", "high", "critical"}
+
+
+class AdmissionController:
+    """Load shedding for model generations
+
+    The model host counts as overloaded once max_in_flight generations are
+    running, or once busy_in_flight are and the running average of recent
+    generation times is over latency_target. While it is, LOW-risk turns get
+    a template reply (mode "degrade") or are turned away (mode "reject");
+    anything riskier is always admitted. Admitted turns hold a slot until
+    release(). Must only be used from the event loop.
+    """
+
+    # Smoothing factor for the running average of generation times
+    LATENCY_ALPHA = 0.2
+
+    def __init__(self, max_in_flight: int = 16, latency_target: float = 10.0,
+                 busy_in_flight: Optional[int] = None, mode: str = DEGRADE):
+        if mode not in (DEGRADE, "reject"):
+            raise ValueError(f"Unknown shed mode {mode!r}; expected 'degrade' or 'reject'")
+        self.max_in_flight = max_in_flight
+        self.latency_target = latency_target
+        self.busy_in_flight = busy_in_flight if busy_in_flight is not None else max(1, max_in_flight // 4)
+        self.mode = mode
+        self.in_flight = 0
+        self.average_seconds: Optional[float] = None
+        self.overloaded = False
+        self.stats = {ADMIT: 0, DEGRADE: 0, SHED: 0, "overloads": 0}
+
+    def _check_overload(self) -> bool:
+        overloaded = self.in_flight >= self.max_in_flight or (
+            self.in_flight >= self.busy_in_flight
+            and self.average_seconds is not None
+            and self.average_seconds > self.latency_target
+        )
+        # An overload episode lasts until the backlog has drained, so a host
+        # hovering at the limit doesn't log every flip
+        if overloaded and not self.overloaded:
+            self.overloaded = True
+            self.stats["overloads"] += 1
+            logger.warning("Chat model overloaded (%d in flight, recent generations %.1fs); "
+                           "shedding low-risk turns", self.in_flight, self.average_seconds or 0.0)
+        elif self.overloaded and self.in_flight < self.busy_in_flight:
+            self.overloaded = False
+            logger.info("Chat model load back to normal (%d in flight)", self.in_flight)
+        return overloaded
+
+    def admit(self, risk_level: str) -> str:
+        """ADMIT (and take a slot), DEGRADE or SHED one chat turn"""
+        if risk_level in ALWAYS_ADMIT or not self._check_overload():
+            self.in_flight += 1
+            self.stats[ADMIT] += 1
+            return ADMIT
+        decision = DEGRADE if self.mode == DEGRADE else SHED
+        self.stats[decision] += 1
+        return decision
+
+    def release(self, elapsed: Optional[float] = None):
+        """Free an admitted turn's slot; elapsed is its generation time if it finished"""
+        self.in_flight -= 1
+        if elapsed is not None:
+            average = self.average_seconds
+            self.average_seconds = elapsed if average is None else (
+                average + self.LATENCY_ALPHA * (elapsed - average)
+            )
+        self._check_overload()
+
+    def retry_after(self) -> float:
+        """Rough wait before a shed turn is worth retrying: one generation's time"""
+        return self.average_seconds or 1.0
+
+    def status(self) -> Dict:
+        return {
+            "overloaded": self.overloaded,
+            "in_flight": self.in_flight,
+            "average_generation_seconds": (
+                round(self.average_seconds, 3) if self.average_seconds is not None else None
+            ),
+            "admitted": self.stats[ADMIT],
+            "degraded": self.stats[DEGRADE],
+            "shed": self.stats[SHED],
+            "overloads": self.stats["overloads"],
+            "mode": self.mode,
+            "max_in_flight": self.max_in_flight,
+            "busy_in_flight": self.busy_in_flight,
+            "latency_target_seconds": self.latency_target
+        }
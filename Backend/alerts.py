@@ -0,0 +1,116 @@
+"""
+In-process crisis alert bus for the Mental Health Support API
+Chat handlers publish events; counselor dashboards subscribe over SSE
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+
+class AlertSubscription:
+    """One subscriber's bounded queue of pending events"""
+
+    def __init__(self, max_pending: int):
+        self.queue: "asyncio.Queue[Dict]" = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+
+class CrisisAlertBus:
+    """Fan-out of crisis events to live subscribers, with a bounded replay buffer
+
+    Publishing never waits on a subscriber. A subscriber whose queue is full is
+    marked overflowed and disconnected instead; it reconnects with the last
+    event id it saw and catches up from the replay buffer. Publish and
+    subscribe must both be called on the event loop.
+
+    Event ids count up from the time the bus was created, in microseconds,
+    so ids from before a restart are lower than any issued after it. A last
+    event id this bus never reached (clock skew between restarts) is treated
+    as unknown, and the whole buffer is replayed.
+    """
+
+    def __init__(self, buffer_size: int = 500, max_pending: int = 100):
+        self.max_pending = max_pending
+        self._buffer: "deque[Dict]" = deque(maxlen=buffer_size)
+        self._ids = itertools.count(time.time_ns() // 1000)
+        self.last_id = 0
+        self._subscribers: Set[AlertSubscription] = set()
+        self.dropped_subscribers = 0
+
+    def publish(self, event_type: str, data: Dict) -> Dict:
+        self.last_id = next(self._ids)
+        event = {
+            "id": self.last_id,
+            "type": event_type,
+            "timestamp": datetime.utcnow().isoformat(),
+            "data": data
+        }
+        self._buffer.append(event)
+
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self._subscribers.discard(subscription)
+                self.dropped_subscribers += 1
+        return event
+
+    def known(self, last_event_id: Optional[int]) -> Optional[int]:
+        """last_event_id, or None if this bus never issued it"""
+        if last_event_id is None or last_event_id > self.last_id:
+            return None
+        return last_event_id
+
+    def replay(self, last_event_id: Optional[int]) -> List[Dict]:
+        """Buffered events newer than last_event_id (all of them if it is None or unknown)"""
+        last_event_id = self.known(last_event_id)
+        if last_event_id is None:
+            return list(self._buffer)
+        return [event for event in self._buffer if event["id"] > last_event_id]
+
+    async def subscribe(self, last_event_id: Optional[int] = None,
+                        heartbeat_seconds: float = 15.0) -> AsyncIterator[Optional[Dict]]:
+        """Yield replayed then live events; None marks an idle heartbeat interval
+
+        Ends when the subscriber falls max_pending events behind.
+        """
+        subscription = AlertSubscription(self.max_pending)
+        # Register before replaying so nothing published in between is lost
+        self._subscribers.add(subscription)
+        try:
+            sent_id = self.known(last_event_id) or 0
+            for event in self.replay(last_event_id):
+                sent_id = event["id"]
+                yield event
+
+            while not subscription.overflowed:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] > sent_id:
+                    sent_id = event["id"]
+                    yield event
+        finally:
+            self._subscribers.discard(subscription)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": len(self._subscribers),
+            "buffered": len(self._buffer),
+            "dropped_subscribers": self.dropped_subscribers
+        }
+
+
+def format_sse(event: Optional[Dict]) -> str:
+    """Render an event (or a heartbeat comment for None) in text/event-stream format"""
+    if event is None:
+        return ": keepalive\n\n"
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,92 @@
+"""
+/chat/message benchmark against each chat engine
+Drives the ASGI app in-process with concurrent clients and reports throughput
+and latency percentiles. The llm engine needs a running Ollama server.
+
+    python benchmarks/bench_chat_endpoint.py --engines simple llm --requests 200 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MESSAGES = [
+    "I'm so stressed about my exams next week",
+    "I feel anxious and can't sleep",
+    "Today was actually a pretty good day",
+    "I feel lonely since I moved to the hostel",
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def bench_engine(main, engine_name: str, requests: int, concurrency: int):
+    import httpx
+    from chat_engine import get_chat_engine
+
+    main.chatbot = get_chat_engine(engine_name)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        response = await client.post("/auth/login", json={"email": "student@demo.com", "password": "123456"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        latencies = []
+        queue = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(MESSAGES[i % len(MESSAGES)])
+
+        async def worker():
+            while not queue.empty():
+                message = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/chat/message", json={"message": message}, headers=headers)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{engine_name:8s} {requests / elapsed:9.1f} req/s   "
+          f"p50 {statistics.median(latencies):9.1f} ms   "
+          f"p95 {percentile(latencies, 0.95):9.1f} ms   "
+          f"max {max(latencies):9.1f} ms")
+
+
+async def run(args):
+    import main
+
+    # Benchmark the engine, not the per-user rate limit
+    main.RATE_LIMITS.pop("chat", None)
+    main.RATE_LIMITS.pop("login", None)
+    await main.init_demo_users()
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent clients")
+    for engine_name in args.engines:
+        await bench_engine(main, engine_name, args.requests, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /chat/message per chat engine")
+    parser.add_argument("--engines", nargs="+", default=["simple", "llm"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    # Keep the SQLite transcript written by the llm engine out of the tree
+    os.chdir(tempfile.mkdtemp())
+    os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+/chat/message under overload, with and without admission control
+Replaces the Ollama call with a simulated model host that runs --parallel
+generations at a time, each taking --generation-seconds, and offers it more
+chat turns per second than it can serve. Reports latency per risk level,
+replies that missed their deadline, and how many turns were degraded or shed.
+
+    python benchmarks/bench_chat_overload.py --rate 8 --seconds 20 --parallel 2 --generation-seconds 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MESSAGES = {
+    "low": "Today was okay, I just wanted to talk for a bit",
+    "moderate": "I'm so stressed about my exams next week",
+    "high": "I feel hopeless about everything lately",
+}
+RISK_MIX = ["low"] * 85 + ["moderate"] * 10 + ["high"] * 5
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def simulated_engine(parallel: int, generation_seconds: float):
+    from chat_engine import LLMChatEngine
+    from chatbot import DeadlineExceeded
+
+    class SimulatedHost(LLMChatEngine):
+        """LLMChatEngine whose model host is a fixed number of slow slots"""
+
+        slots = threading.Semaphore(parallel)
+
+        def _stream_reply(self, route, messages, deadline, expires_at, on_chunk=None):
+            # Waiting for a slot counts against the deadline, as queueing in Ollama would
+            if not self.slots.acquire(timeout=max(0.0, expires_at - time.monotonic())):
+                raise DeadlineExceeded()
+            try:
+                time.sleep(generation_seconds)
+            finally:
+                self.slots.release()
+            return "That sounds like a lot to carry. What has been on your mind the most?"
+
+    engine = SimulatedHost()
+    engine.warm_up()
+    return engine
+
+
+async def offer_load(main, client, headers, rate: float, seconds: float, seed: int):
+    rng = random.Random(seed)
+    latencies = defaultdict(list)
+    outcomes = Counter()
+
+    async def turn(risk: str):
+        start = time.perf_counter()
+        response = await client.post("/chat/message", json={"message": MESSAGES[risk]}, headers=headers)
+        elapsed = time.perf_counter() - start
+        if response.status_code == 503:
+            outcomes["shed"] += 1
+            return
+        response.raise_for_status()
+        reply = response.json()
+        latencies[risk].append(elapsed * 1000)
+        if reply["degraded"]:
+            outcomes["degraded"] += 1
+        elif "What has been on your mind" not in reply["response"]:
+            outcomes["missed deadline"] += 1
+        else:
+            outcomes["generated"] += 1
+
+    # Open loop: turns arrive on schedule whether or not earlier ones finished
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(rate * seconds)):
+        await asyncio.sleep(max(0.0, start + i / rate - time.perf_counter()))
+        tasks.append(asyncio.create_task(turn(rng.choice(RISK_MIX))))
+    await asyncio.gather(*tasks)
+    return latencies, outcomes
+
+
+async def run(args):
+    import httpx
+    import main
+    from admission import AdmissionController
+
+    main.RATE_LIMITS.pop("chat", None)
+    main.RATE_LIMITS.pop("login", None)
+    await main.init_demo_users()
+    main.chatbot = simulated_engine(args.parallel, args.generation_seconds)
+
+    capacity = args.parallel / args.generation_seconds
+    print(f"{args.rate:.0f} turns/s offered for {args.seconds:.0f} s to a host serving {capacity:.1f}/s")
+    controllers = {
+        "off": AdmissionController(max_in_flight=10**9, latency_target=float("inf")),
+        "degrade": AdmissionController(max_in_flight=args.max_in_flight,
+                                       latency_target=args.latency_target),
+        "reject": AdmissionController(max_in_flight=args.max_in_flight,
+                                      latency_target=args.latency_target, mode="reject"),
+    }
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        response = await client.post("/auth/login", json={"email": "student@demo.com", "password": "123456"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for name in args.modes:
+            main.chat_admission = controllers[name]
+            latencies, outcomes = await offer_load(main, client, headers, args.rate, args.seconds, args.seed)
+            print(f"\nadmission {name}: " + ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())))
+            for risk in MESSAGES:
+                if latencies[risk]:
+                    print(f"  {risk:9s} p50 {statistics.median(latencies[risk]):8.0f} ms   "
+                          f"p95 {percentile(latencies[risk], 0.95):8.0f} ms   "
+                          f"max {max(latencies[risk]):8.0f} ms")
+            # Let the host drain before the next mode
+            await asyncio.sleep(args.generation_seconds * 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offer /chat/message more load than the model can serve")
+    parser.add_argument("--rate", type=float, default=8.0)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--parallel", type=int, default=2)
+    parser.add_argument("--generation-seconds", type=float, default=0.5)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--latency-target", type=float, default=1.5)
+    parser.add_argument("--modes", nargs="+", choices=["off", "degrade", "reject"],
+                        default=["off", "degrade", "reject"])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Scale the model deadlines to the simulated host, and keep the
+    # transcripts out of the source tree
+    os.environ.setdefault("CHAT_DEADLINE_SECONDS", str(args.generation_seconds * 8))
+    os.environ.setdefault("CHAT_REQUEST_TIMEOUT_SECONDS", str(args.generation_seconds * 12))
+    os.environ["OLLAMA_FAST_MODEL"] = ""
+    os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+    os.environ["STATE_DIR"] = tempfile.mkdtemp()
+    os.environ["MOOD_STORE_DIR"] = tempfile.mkdtemp()
+    os.chdir(tempfile.mkdtemp())
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Chat transport benchmark: POST /chat/message versus the /chat/ws WebSocket
+Starts a uvicorn worker with the given engine, then has concurrent clients
+send the same number of turns over each transport and reports throughput and
+per-turn latency
+
+    python benchmarks/bench_chat_transport.py --clients 50 --turns 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MESSAGES = [
+    "I'm so stressed about my exams next week",
+    "I feel anxious and can't sleep",
+    "Today was actually a pretty good day",
+    "I feel lonely since I moved to the hostel",
+]
+
+# Runs in the server process: benchmark the transport, not the rate limiter
+SERVER_CODE = """
+import sys, uvicorn, main
+main.RATE_LIMITS.pop("chat", None)
+main.RATE_LIMITS.pop("login", None)
+uvicorn.run(main.app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def wait_for_login(client, base_url: str) -> str:
+    for _ in range(600):
+        try:
+            response = await client.post(f"{base_url}/auth/login",
+                                         json={"email": "student@demo.com", "password": "123456"})
+            if response.status_code == 200:
+                return response.json()["access_token"]
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not come up")
+
+
+async def post_client(base_url: str, token: str, turns: int, latencies: list):
+    import httpx
+
+    # One keep-alive connection per client, as a browser tab would use
+    async with httpx.AsyncClient(timeout=300) as client:
+        for i in range(turns):
+            start = time.perf_counter()
+            response = await client.post(
+                f"{base_url}/chat/message",
+                json={"message": MESSAGES[i % len(MESSAGES)]},
+                headers={"Authorization": f"Bearer {token}", "Origin": "http://localhost:3000"}
+            )
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def ws_client(ws_url: str, token: str, turns: int, latencies: list):
+    import websockets
+
+    async with websockets.connect(f"{ws_url}/chat/ws?token={token}") as socket_:
+        await socket_.recv()  # ready
+        for i in range(turns):
+            start = time.perf_counter()
+            await socket_.send(json.dumps({"type": "message", "message": MESSAGES[i % len(MESSAGES)], "turn": i}))
+            while json.loads(await socket_.recv())["type"] != "reply":
+                pass
+            latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def bench(name: str, client_factory, clients: int, turns: int):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client_factory(latencies) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:10s} {len(latencies) / elapsed:9.1f} turns/s   "
+          f"p50 {statistics.median(latencies):8.2f} ms   "
+          f"p95 {percentile(latencies, 0.95):8.2f} ms   "
+          f"max {max(latencies):8.2f} ms")
+
+
+async def run(args, port: int):
+    import httpx
+
+    base_url = f"http://127.0.0.1:{port}"
+    ws_url = f"ws://127.0.0.1:{port}"
+    async with httpx.AsyncClient() as client:
+        token = await wait_for_login(client, base_url)
+
+    print(f"{args.engine} engine, {args.clients} concurrent clients x {args.turns} turns")
+    for _ in range(args.rounds):
+        await bench("POST", lambda latencies: post_client(base_url, token, args.turns, latencies),
+                    args.clients, args.turns)
+        await bench("WebSocket", lambda latencies: ws_client(ws_url, token, args.turns, latencies),
+                    args.clients, args.turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the POST and WebSocket chat transports")
+    parser.add_argument("--engine", default="simple")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    port = free_port()
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["CHAT_ENGINE"] = args.engine
+    env.setdefault("LOG_SAMPLE_RATE", "0")
+
+    # The server's SQLite files go in a scratch directory, not the source tree
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER_CODE, str(port)],
+        cwd=tempfile.mkdtemp(), env=env, stderr=subprocess.DEVNULL
+    )
+    try:
+        asyncio.run(run(args, port))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Conversation search benchmark: FTS5 index versus a LIKE scan
+Fills a scratch database with synthetic conversations (the triggers index
+them as they go), then times ranked searches with and without filters,
+deep pages, the LIKE scan the index replaces, and save_conversation.
+"windowed" marks searches that ranked only the newest SEARCH_WINDOW matches.
+
+    python benchmarks/bench_conversation_search.py --rows 2000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import ConversationManager  # noqa: E402
+
+TOPICS = ["exams", "sleep", "hostel", "family", "friends", "assignments", "money", "placement",
+          "roommate", "homesick", "deadline", "breakup", "grades", "internship", "anxiety"]
+RARE_TOPICS = ["scholarship", "bereavement", "visa"]
+OPENERS = ["I keep thinking about", "I can't stop worrying about", "Today was hard because of",
+           "I feel overwhelmed by", "I'm okay but a bit stressed about", "Nobody understands my"]
+REPLIES = ["That sounds really difficult. What part of {} weighs on you most?",
+           "It makes sense to feel this way about {}. Have you talked to anyone?",
+           "Thank you for sharing. Let's take a breath together and look at {} step by step."]
+RISK_LEVELS = ["low"] * 80 + ["moderate"] * 15 + ["high"] * 4 + ["critical"]
+
+
+def build(db_path: str, rows: int, users: int, seed: int):
+    rng = random.Random(seed)
+    ConversationManager(db_path)
+    start_time = datetime(2024, 1, 1)
+    conn = sqlite3.connect(db_path)
+    batch = []
+    for i in range(rows):
+        topic = rng.choice(RARE_TOPICS) if rng.random() < 0.0005 else rng.choice(TOPICS)
+        batch.append((
+            f"session-{i // 10}", f"user-{rng.randrange(users)}",
+            (start_time + timedelta(seconds=i * 15)).isoformat(),
+            f"{rng.choice(OPENERS)} {topic} and {rng.choice(TOPICS)}",
+            rng.choice(REPLIES).format(topic), "neutral", rng.choice(RISK_LEVELS)
+        ))
+        if len(batch) == 50_000:
+            conn.executemany('''
+                INSERT INTO conversations (session_id, user_id, timestamp, user_message,
+                                           bot_response, emotion_detected, risk_level)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+            conn.commit()
+            batch = []
+    if batch:
+        conn.executemany('''
+            INSERT INTO conversations (session_id, user_id, timestamp, user_message,
+                                       bot_response, emotion_detected, risk_level)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', batch)
+        conn.commit()
+    conn.execute("INSERT INTO conversations_fts (conversations_fts) VALUES ('optimize')")
+    conn.commit()
+    conn.close()
+
+
+def timed(func, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def like_scan(db_path: str, word: str):
+    conn = sqlite3.connect(db_path)
+    try:
+        pattern = f"%{word}%"
+        return conn.execute('''
+            SELECT id, user_message, bot_response FROM conversations
+            WHERE user_message LIKE ? OR bot_response LIKE ?
+            ORDER BY id DESC LIMIT 20
+        ''', (pattern, pattern)).fetchall()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time conversation search on a large database")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "conversations.db")
+    start = time.perf_counter()
+    build(db_path, args.rows, args.users, args.seed)
+    print(f"{args.rows} conversations indexed in {time.perf_counter() - start:.1f} s, "
+          f"{os.path.getsize(db_path) / 2**20:.0f} MiB")
+
+    manager = ConversationManager(db_path)
+    cases = [
+        ("rare word", lambda: manager.search("scholarship")),
+        ("common word", lambda: manager.search("exams")),
+        ("two words", lambda: manager.search("hostel roommate")),
+        ("prefix", lambda: manager.search("intern*")),
+        ("common + user", lambda: manager.search("exams", user_id="user-42")),
+        ("common + risk", lambda: manager.search("exams", risk_levels=["high", "critical"])),
+        ("common + dates", lambda: manager.search("exams", since="2024-03-01", until="2024-03-08")),
+        ("common, page 50", lambda: manager.search("exams", page=50)),
+        ("LIKE rare", lambda: like_scan(db_path, "scholarship")),
+    ]
+    for name, case in cases:
+        elapsed, result = timed(case, args.repeat)
+        if isinstance(result, dict):
+            note = f"{len(result['results'])} rows on the page" + ("" if result["exhaustive"] else ", windowed")
+        else:
+            note = f"{len(result)} rows"
+        print(f"{name:16s} {elapsed:9.1f} ms  ({note})")
+
+    latencies = []
+    for i in range(1000):
+        start = time.perf_counter()
+        manager.save_conversation("user-1", f"I keep thinking about exams {i}",
+                                  "That sounds really difficult.", "anxiety", "low")
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"save_conversation p50 {statistics.median(latencies):.2f} ms, max {max(latencies):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
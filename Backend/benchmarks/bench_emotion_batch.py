@@ -0,0 +1,70 @@
+"""
+Batch emotion classification benchmark
+Times analyze_emotion called once per message against analyze_batch on the
+same synthetic corpus, and checks that both give identical results
+
+    python benchmarks/bench_emotion_batch.py --messages 100000
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import EMOTION_CODES, EmotionAnalyzer  # noqa: E402
+
+
+def build_corpus(analyzer: EmotionAnalyzer, messages: int, keyword_rate: float, seed: int):
+    """Chat-length messages with lexicon words mixed into random filler"""
+    rng = random.Random(seed)
+    keywords = [word for words in analyzer.emotion_lexicon.values() for word in words]
+    filler = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9)))
+              for _ in range(3000)]
+    corpus = []
+    for _ in range(messages):
+        words = [rng.choice(keywords) if rng.random() < keyword_rate else rng.choice(filler)
+                 for _ in range(rng.randint(10, 25))]
+        text = ' '.join(words)
+        corpus.append(text[0].upper() + text[1:] + rng.choice(['.', '?', '!', ' :(']))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-message and batch emotion analysis")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--keyword-rate", type=float, default=0.05,
+                        help="fraction of words drawn from the lexicon (default: 0.05)")
+    parser.add_argument("--seed", type=int, default=2)
+    args = parser.parse_args()
+
+    analyzer = EmotionAnalyzer()
+    corpus = build_corpus(analyzer, args.messages, args.keyword_rate, args.seed)
+    # Build the keyword index outside the timed region
+    analyzer.analyze_batch(corpus[:10])
+
+    start = time.perf_counter()
+    expected = [analyzer.analyze_emotion(text) for text in corpus]
+    loop_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    codes, confidences = analyzer.analyze_batch(corpus)
+    batch_elapsed = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for (emotion, confidence), code, batch_confidence in zip(expected, codes, confidences)
+        if EMOTION_CODES[code] != emotion or confidence != batch_confidence
+    )
+
+    print(f"{args.messages} messages, keyword rate {args.keyword_rate}")
+    print(f"analyze_emotion loop {loop_elapsed:8.3f} s")
+    print(f"analyze_batch        {batch_elapsed:8.3f} s  ({loop_elapsed / batch_elapsed:.1f}x)")
+    print(f"mismatches           {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
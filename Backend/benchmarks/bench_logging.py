@@ -0,0 +1,86 @@
+"""
+Logging overhead benchmark
+Compares the time a request thread spends per log call with the old
+synchronous FileHandler + StreamHandler setup against the queued listener
+
+    python benchmarks/bench_logging.py --requests 20000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging_config  # noqa: E402
+
+
+def log_requests(logger: logging.Logger, requests: int):
+    """Emit what one chat request logs: an access line and a chat line"""
+    for i in range(requests):
+        logger.info("%s %s", "POST", "/chat/message",
+                    extra={"route": "/chat/message", "status_code": 200,
+                           "duration_ms": 12.5, "sampled": True})
+        logger.info("Chat message processed",
+                    extra={"route": "/chat/message", "user": "3f2a9c0d1e7b",
+                           "risk_level": "low", "duration_ms": 11.9, "sampled": True})
+
+
+def run_sync(log_file: str, requests: int) -> float:
+    root = logging.getLogger()
+    handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(logging_config.StructuredFormatter(logging_config.LOG_FORMAT))
+    root.handlers = handlers
+    root.setLevel(logging.INFO)
+
+    start = time.perf_counter()
+    log_requests(logging.getLogger("bench"), requests)
+    elapsed = time.perf_counter() - start
+
+    for handler in handlers:
+        handler.close()
+    return elapsed
+
+
+def run_queued(log_file: str, requests: int, sample_rate: float):
+    logging_config.setup_logging(log_file=log_file, sample_rate=sample_rate)
+
+    start = time.perf_counter()
+    log_requests(logging.getLogger("bench"), requests)
+    elapsed = time.perf_counter() - start
+
+    drain_start = time.perf_counter()
+    logging_config.stop_logging()
+    return elapsed, time.perf_counter() - drain_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-request logging overhead")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    # Console output goes to /dev/null so terminal speed doesn't skew the numbers
+    sys.stderr = open(os.devnull, "w")
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        log_file = os.path.join(workdir, "bench.log")
+        results["sync file+console"] = (run_sync(log_file, args.requests), None)
+        results["queued"] = run_queued(log_file, args.requests, 1.0)
+        results["queued, 10% sampling"] = run_queued(log_file, args.requests, 0.1)
+    sys.stderr = sys.__stderr__
+
+    print(f"{args.requests} simulated requests, 2 log calls each")
+    for name, (elapsed, drain) in results.items():
+        per_request = elapsed / args.requests * 1e6
+        line = f"{name:22s} {per_request:8.2f} us/request on the request thread"
+        if drain is not None:
+            line += f"   (listener drained backlog in {drain * 1000:.0f} ms)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Request profiler overhead
+Times GET /auth/me (the auth dependencies and little else) in-process with
+the profiling middleware not installed, installed but idle (header mode, no
+header sent), and profiling every request. Each configuration runs in a
+fresh process, since the middleware is installed at import time.
+
+    python benchmarks/bench_profiler.py --requests 5000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGURATIONS = {
+    "off": {},
+    "idle": {"PROFILE_ON_HEADER": "1"},
+    "every request": {"PROFILE_SAMPLE_RATE": "1"},
+}
+
+
+async def measure(requests: int):
+    import httpx
+    import main
+
+    main.RATE_LIMITS.pop("login", None)
+    await main.init_demo_users()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/auth/login", json={"email": "student@demo.com", "password": "123456"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for _ in range(200):
+            await client.get("/auth/me", headers=headers)
+
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.get("/auth/me", headers=headers)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            response.raise_for_status()
+    written = main.request_profiler.stats["written"]
+    print(f"p50 {statistics.median(latencies):7.1f} us   mean {statistics.mean(latencies):7.1f} us   "
+          f"({written} profiles written)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time requests with and without the request profiler")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--step", action="store_true")
+    args = parser.parse_args()
+
+    if args.step:
+        return asyncio.run(measure(args.requests))
+
+    for name, settings in CONFIGURATIONS.items():
+        env = dict(os.environ)
+        env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+        env["STATE_DIR"] = tempfile.mkdtemp()
+        env["MOOD_STORE_DIR"] = tempfile.mkdtemp()
+        env["PROFILE_DIR"] = tempfile.mkdtemp()
+        env.setdefault("BCRYPT_ROUNDS", "4")
+        env.setdefault("LOG_SAMPLE_RATE", "0")
+        env.update(settings)
+        print(f"{name:14s} ", end="", flush=True)
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--requests", str(args.requests), "--step"],
+                       env=env, cwd=tempfile.mkdtemp(), check=True, stderr=subprocess.DEVNULL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Record memory benchmark
+Builds the same bookings and mood entries as plain dicts (the old in-memory
+shape) and as the compact representations (BookingRecord, MoodStore), and
+reports the heap each takes as measured by tracemalloc. MoodStore columns are
+memory-mapped files, so their on-disk size is reported separately.
+
+    python benchmarks/bench_record_memory.py --entries 1000000 --users 5000
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import records  # noqa: E402
+from mood_store import MoodStore  # noqa: E402
+
+MOODS = ["very-happy", "happy", "neutral", "sad", "very-sad"]
+STATUSES = ["pending", "confirmed", "completed", "cancelled"]
+TIMES = ["09:00", "10:00", "11:00", "14:00", "15:00", "16:00"]
+
+
+def make_users(count: int):
+    return [(str(uuid.uuid4()), f"Student {i}") for i in range(count)]
+
+
+def sample_times(entries: int):
+    start = datetime(2025, 1, 1)
+    return [start + timedelta(seconds=i * 30, microseconds=i % 1_000_000) for i in range(entries)]
+
+
+def dict_bookings(users, moments, rng):
+    bookings = []
+    for moment in moments:
+        user_id, user_name = rng.choice(users)
+        bookings.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "user_name": user_name,
+            "date": moment.date().isoformat(),
+            "time": rng.choice(TIMES),
+            "concerns": None,
+            "status": rng.choice(STATUSES),
+            "version": 1,
+            "created_at": moment.isoformat()
+        })
+    return bookings
+
+
+def compact_bookings(users, moments, rng):
+    codes = [records.user_refs.code(user) for user in users]
+    bookings = {}
+    for moment in moments:
+        booking = records.BookingRecord(
+            user=rng.choice(codes),
+            date=moment.date().isoformat(),
+            time=rng.choice(TIMES),
+            concerns=None,
+            status=rng.choice(STATUSES),
+            created_at=records.to_epoch_us(moment)
+        )
+        bookings[booking.key] = booking
+    return bookings
+
+
+def dict_moods(users, moments, rng):
+    entries = []
+    for moment in moments:
+        user_id, user_name = rng.choice(users)
+        entries.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "user_name": user_name,
+            "mood": rng.choice(MOODS),
+            "note": None,
+            "timestamp": moment.isoformat()
+        })
+    return entries
+
+
+def compact_moods(users, moments, rng):
+    store = MoodStore(tempfile.mkdtemp())
+    for moment in moments:
+        user_id, user_name = rng.choice(users)
+        store.append(user_id, user_name, rng.choice(MOODS), None, records.to_epoch_us(moment))
+    return store
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def measure(build, *args):
+    """(bytes still allocated by the result, build seconds, result)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dict and compact record memory use")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    users = make_users(args.users)
+    moments = sample_times(args.entries)
+
+    print(f"{args.entries} records per kind, {args.users} users")
+    for kind, builders in (("bookings", (dict_bookings, compact_bookings)),
+                           ("mood entries", (dict_moods, compact_moods))):
+        results = []
+        for build in builders:
+            size, elapsed, result = measure(build, users, moments, random.Random(args.seed))
+            results.append(size)
+            print(f"{kind:13s} {build.__name__.split('_')[0]:8s} {size / 2**20:9.1f} MiB  "
+                  f"{size / args.entries:7.1f} B/record  built in {elapsed:5.1f} s")
+            if isinstance(result, MoodStore):
+                result.close()
+                on_disk = directory_size(result.directory)
+                print(f"{'':13s} {'on disk':8s} {on_disk / 2**20:9.1f} MiB  "
+                      f"{on_disk / args.entries:7.1f} B/record (mapped, not heap)")
+            del result
+        print(f"{kind:13s} compact uses {results[1] / results[0]:.0%} of the dict footprint\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Cold start benchmark for the Mental Health Support API
+Reports module import times and time-to-first-healthy-response of a fresh
+uvicorn worker (plus time until the demo login works)
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_time_ms(module: str, workdir: str) -> float:
+    """Import a module in a fresh interpreter and return the wall time"""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print((time.perf_counter() - start) * 1000)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=workdir, env=run_env(),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def poll(request: urllib.request.Request, deadline: float, interval: float = 0.005) -> bool:
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(request, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(interval)
+    return False
+
+
+def startup_times_ms(workdir: str, timeout: float = 30.0):
+    """Spawn a worker; return ms until /health answers and until a demo login succeeds"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=run_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = start + timeout
+        if not poll(urllib.request.Request(f"{base_url}/health"), deadline):
+            raise RuntimeError("worker never became healthy")
+        healthy = (time.monotonic() - start) * 1000
+
+        login = urllib.request.Request(
+            f"{base_url}/auth/login",
+            data=json.dumps({"email": "student@demo.com", "password": "123456"}).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        # Poll gently: every attempt counts against the login rate limit
+        if not poll(login, deadline, interval=0.25):
+            raise RuntimeError("demo login never succeeded")
+        login_ready = (time.monotonic() - start) * 1000
+        return healthy, login_ready
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend import and startup latency")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Run from a scratch directory so the SQLite database and logs stay out of the tree
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {
+            "import chatbot": [import_time_ms("chatbot", workdir) for _ in range(args.runs)],
+            "import main": [import_time_ms("main", workdir) for _ in range(args.runs)],
+        }
+        startups = [startup_times_ms(workdir) for _ in range(args.runs)]
+        results["first healthy response"] = [healthy for healthy, _ in startups]
+        results["first demo login"] = [login for _, login in startups]
+
+    for name, timings in results.items():
+        print(f"{name:24s} median {statistics.median(timings):8.1f} ms   "
+              f"min {min(timings):8.1f} ms   max {max(timings):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
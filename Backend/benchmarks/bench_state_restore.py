@@ -0,0 +1,128 @@
+"""
+Restart-to-ready benchmark for the state snapshot and journal
+Populates a scratch STATE_DIR with users and bookings, snapshots it, then
+journals a tail of booking status changes and logins. A fresh process then
+imports the app and restores the state, timing each step.
+
+    python benchmarks/bench_state_restore.py --users 100000 --bookings 900000 --tail 100000
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A syntactically valid hash; nobody logs in during the benchmark
+HASHED_PASSWORD = "$2b$12$" + "a" * 53
+STATUSES = ["confirmed", "completed", "cancelled"]
+TIMES = ["09:00", "10:00", "11:00", "14:00", "15:00", "16:00"]
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def populate(args):
+    import main
+    from records import BookingRecord
+
+    rng = random.Random(args.seed)
+    created_at = main.to_epoch_us(main.datetime(2025, 1, 1))
+    start = time.perf_counter()
+    users = []
+    for i in range(args.users):
+        user = main.user_from_row((
+            f"user-{i:08d}", f"Student {i}", f"student{i}@example.com", HASHED_PASSWORD,
+            "student", 20, f"STU{i:06d}", "active", created_at, None
+        ))
+        main.index_user(user)
+        users.append(user)
+    for i in range(args.bookings):
+        user = rng.choice(users)
+        main.index_booking(BookingRecord(
+            user=main.user_ref(user),
+            date=f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            time=rng.choice(TIMES),
+            concerns=None,
+            status="pending",
+            created_at=created_at + i
+        ))
+    print(f"built {args.users} users and {args.bookings} bookings in {time.perf_counter() - start:.1f} s")
+
+    main.state_journal.start()
+    start = time.perf_counter()
+    main.state_journal.snapshot()
+    main.state_journal.close(snapshot=False)
+    print(f"snapshot written in {time.perf_counter() - start:.1f} s")
+
+    main.state_journal.start()
+    bookings = list(main.bookings_by_id.values())
+    start = time.perf_counter()
+    for i in range(args.tail):
+        if i % 2:
+            main.record_login(rng.choice(users))
+            continue
+        booking = rng.choice(bookings)
+        main.set_booking_status(booking, rng.choice(STATUSES), booking.version + 1, created_at + i)
+        main.state_journal.append("booking_status", booking.key, booking.status,
+                                  booking.version, booking.updated_at)
+    enqueue = time.perf_counter() - start
+    main.state_journal.close(snapshot=False)
+    print(f"journalled {args.tail} operations: {enqueue / args.tail * 1e6:.1f} us each to enqueue, "
+          f"{time.perf_counter() - start:.1f} s to disk")
+
+
+def restart(args, process_start: float):
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    main.restore_state()
+    restored = time.perf_counter()
+    main.state_journal.close(snapshot=False)
+    print(f"restart: import {imported - start:.2f} s, restore {restored - imported:.2f} s, "
+          f"ready {restored - process_start:.2f} s after process start")
+    print(f"restored {len(main.users_db)} users and {len(main.bookings_by_id)} bookings")
+
+
+def main():
+    process_start = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Time restoring state from the snapshot and journal")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--bookings", type=int, default=900_000)
+    parser.add_argument("--tail", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--step", choices=["populate", "restart"])
+    args = parser.parse_args()
+
+    if args.step == "populate":
+        return populate(args)
+    if args.step == "restart":
+        return restart(args, process_start)
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["STATE_DIR"] = tempfile.mkdtemp()
+    env["MOOD_STORE_DIR"] = tempfile.mkdtemp()
+    # Keep the automatic snapshot out of the journal tail being measured
+    env["JOURNAL_SNAPSHOT_EVERY"] = str(args.tail + 1)
+    env.setdefault("LOG_SAMPLE_RATE", "0")
+    # The app's SQLite files go in a scratch directory, not the source tree
+    scratch = tempfile.mkdtemp()
+    command = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:]
+
+    print(f"{args.users + args.bookings} records, {args.tail} journalled operations")
+    subprocess.run(command + ["--step", "populate"], env=env, cwd=scratch,
+                   check=True, stderr=subprocess.DEVNULL)
+    print(f"state directory: {directory_size(env['STATE_DIR']) / 2**20:.1f} MiB")
+    for _ in range(2):
+        subprocess.run(command + ["--step", "restart"], env=env, cwd=scratch,
+                       check=True, stderr=subprocess.DEVNULL)
+
+
+if __name__ == "__main__":
+    main()
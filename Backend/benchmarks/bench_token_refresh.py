@@ -0,0 +1,134 @@
+"""
+Password logins versus refresh tokens over a simulated day
+Simulates a day of student sessions and counts how often each scheme needs
+the password (a bcrypt verify): access tokens alone, which send the student
+back to the login form every ACCESS_TOKEN_EXPIRE_MINUTES, or rotating
+refresh tokens, which only need it after a logout. The counts are priced with
+the measured CPU time of a login and of a refresh on this host. Also times
+the per-request token check against an empty and a full denylist.
+
+    python benchmarks/bench_token_refresh.py --students 5000 --sessions 3 --logout-rate 0.1
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DAY = 86400
+
+
+def simulate_day(args, access_seconds: float):
+    """(password logins with access tokens only, with refresh tokens, refreshes)"""
+    rng = random.Random(args.seed)
+    plain_logins = refresh_logins = refreshes = 0
+    for _ in range(args.students):
+        starts = sorted(rng.uniform(0, DAY) for _ in range(rng.randint(0, args.sessions * 2)))
+        # Yesterday's access token has long expired; its refresh token hasn't
+        plain_expires = refresh_expires = 0.0
+        signed_in = rng.random() >= args.logout_rate
+        for start in starts:
+            length = rng.uniform(args.min_session_minutes, args.max_session_minutes) * 60
+            moment = start
+            while moment < start + length:
+                if moment >= plain_expires:
+                    plain_logins += 1
+                    plain_expires = moment + access_seconds
+                if moment >= refresh_expires:
+                    if signed_in:
+                        refreshes += 1
+                    else:
+                        refresh_logins += 1
+                        signed_in = True
+                    refresh_expires = moment + access_seconds
+                moment += rng.expovariate(1 / args.request_interval)
+            if rng.random() < args.logout_rate:
+                signed_in = False
+                refresh_expires = 0.0
+    return plain_logins, refresh_logins, refreshes
+
+
+def cpu_time(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.process_time()
+        func()
+        times.append(time.process_time() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the bcrypt work refresh tokens save in a day")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--sessions", type=int, default=3, help="average sessions per student per day")
+    parser.add_argument("--min-session-minutes", type=float, default=5)
+    parser.add_argument("--max-session-minutes", type=float, default=120)
+    parser.add_argument("--request-interval", type=float, default=45, help="mean seconds between requests")
+    parser.add_argument("--logout-rate", type=float, default=0.1, help="share of sessions ended by logging out")
+    parser.add_argument("--denylist", type=int, default=500_000, help="entries for the lookup timing")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ["STATE_DIR"] = tempfile.mkdtemp()
+    os.environ["MOOD_STORE_DIR"] = tempfile.mkdtemp()
+    os.environ["JOURNAL_FSYNC"] = "0"
+    os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+    os.chdir(tempfile.mkdtemp())
+    import main as app
+    from revocation import TokenDenylist
+
+    app.state_journal.start()
+    user = app.user_from_row((
+        "bench-user", "Bench Student", "bench@example.com", app.hash_password("123456"),
+        "student", 20, "STU000001", "active", app.to_epoch_us(app.datetime.utcnow()), None
+    ))
+    app.index_user(user)
+    login_cpu = cpu_time(lambda: app.issue_tokens(app.authenticate_user("bench@example.com", "123456")), 9)
+    tokens = {"refresh_token": app.issue_tokens(user)["refresh_token"]}
+
+    def refresh():
+        tokens.update(app.refresh_tokens(tokens["refresh_token"]))
+
+    refresh_cpu = cpu_time(refresh, 201)
+    print(f"bcrypt cost {app.BCRYPT_ROUNDS}: password login {login_cpu * 1000:.1f} ms CPU, "
+          f"refresh {refresh_cpu * 1000:.3f} ms CPU")
+
+    plain_logins, refresh_logins, refreshes = simulate_day(args, app.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    plain_cpu = plain_logins * login_cpu
+    refresh_total = refresh_logins * login_cpu + refreshes * refresh_cpu
+    print(f"\n{args.students} students, a simulated day:")
+    print(f"  access tokens only  {plain_logins:7d} password logins                   "
+          f"{plain_cpu:8.1f} s CPU")
+    print(f"  refresh tokens      {refresh_logins:7d} password logins, {refreshes:7d} refreshes "
+          f"{refresh_total:8.1f} s CPU")
+    print(f"  saved {plain_cpu - refresh_total:.1f} s of CPU ({1 - refresh_total / plain_cpu:.0%})")
+
+    # Spent refresh tokens stay denied until they expire, so the list holds
+    # about REFRESH_TOKEN_EXPIRE_DAYS days of refreshes and logouts
+    entries = (refreshes + refresh_logins) * app.REFRESH_TOKEN_EXPIRE_DAYS
+    access_token = app.issue_tokens(user)["access_token"]
+    check = lambda: app.user_from_token(access_token)  # noqa: E731
+    empty = cpu_time(lambda: [check() for _ in range(1000)], 5) / 1000
+    tracemalloc.start()
+    denylist = TokenDenylist()
+    now = time.time()
+    for i in range(args.denylist):
+        denylist.revoke(os.urandom(16).hex(), now + (i % 20_000) * 60)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    app.token_denylist = denylist
+    full = cpu_time(lambda: [check() for _ in range(1000)], 5) / 1000
+    print(f"\nper-request token check: {empty * 1e6:.1f} us with an empty denylist, "
+          f"{full * 1e6:.1f} us with {args.denylist} entries "
+          f"({size / args.denylist:.0f} B each; steady state here is about {entries} entries)")
+    app.state_journal.close(snapshot=False)
+
+
+if __name__ == "__main__":
+    main()
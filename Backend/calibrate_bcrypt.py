@@ -0,0 +1,63 @@
+"""
+bcrypt work factor calibration for the Mental Health Support API
+Run on the deployment host and export the result as BCRYPT_ROUNDS
+
+    python calibrate_bcrypt.py --target-ms 250
+"""
+
+import argparse
+import statistics
+import time
+from typing import Dict, Tuple
+
+import bcrypt
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 16
+
+
+def measure_hash_ms(rounds: int, samples: int = 3) -> float:
+    """Median wall time of one bcrypt hash at the given cost, in milliseconds"""
+    password = b"calibration-password"
+    timings = []
+    for _ in range(samples):
+        salt = bcrypt.gensalt(rounds=rounds)
+        start = time.perf_counter()
+        bcrypt.hashpw(password, salt)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, samples: int = 3) -> Tuple[int, Dict[int, float]]:
+    """Return the highest cost whose hash time stays within target_ms"""
+    timings = {}
+    chosen = MIN_ROUNDS
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        timings[rounds] = measure_hash_ms(rounds, samples)
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+        # Each extra round doubles the cost, so don't time one that must overshoot
+        if timings[rounds] * 2 > target_ms:
+            break
+    return chosen, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick a bcrypt cost for a target per-hash latency")
+    parser.add_argument("--target-ms", type=float, default=250.0,
+                        help="maximum time one password hash may take (default: 250)")
+    parser.add_argument("--samples", type=int, default=3,
+                        help="hashes to time per cost (default: 3)")
+    args = parser.parse_args()
+
+    chosen, timings = calibrate(args.target_ms, args.samples)
+
+    for rounds, elapsed in timings.items():
+        marker = " <-" if rounds == chosen else ""
+        print(f"cost {rounds:2d}: {elapsed:8.1f} ms{marker}")
+    print(f"\nBCRYPT_ROUNDS={chosen}")
+
+
+if __name__ == "__main__":
+    main()
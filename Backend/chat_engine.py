@@ -0,0 +1,159 @@
+"""
+Chat engines for the Mental Health Support API
+Both engines expose warm_up / start_session / assess_risk / process_message / end_session / close;
+the API picks one by name and keeps a single warmed instance per worker process
+"""
+
+import os
+from functools import cached_property, lru_cache
+from typing import Any, Callable, Deque, Dict, Optional, Protocol, Union
+
+from chatbot import CrisisDetector, MentalHealthChatbot, RequestDeadline, SeverityLevel
+
+
+def parse_keep_alive(value: str) -> Union[float, str]:
+    """Ollama takes a duration ("30m") or seconds as a number; negative means forever"""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class ChatEngine(Protocol):
+    """What the API needs from a chat implementation"""
+    
+    def warm_up(self) -> None:
+        ...
+    
+    def load_model(self) -> bool:
+        ...
+    
+    def model_status(self) -> Dict[str, Any]:
+        ...
+    
+    def start_session(self, user_id: str, session_id: Optional[str] = None) -> str:
+        ...
+    
+    def assess_risk(self, message: str) -> str:
+        ...
+    
+    def process_message(self, user_id: str, message: str,
+                        deadline: Optional[RequestDeadline] = None,
+                        on_chunk: Optional[Callable[[str], None]] = None,
+                        session_id: Optional[str] = None,
+                        degraded: bool = False,
+                        history: Optional[Deque[Dict]] = None) -> Dict[str, Any]:
+        ...
+    
+    def end_session(self, user_id: str) -> str:
+        ...
+    
+    def close(self) -> None:
+        ...
+
+
+class SimpleChatbot:
+    """Keyword-matching engine with canned replies (no model required)"""
+    
+    # Risk is assessed exactly as in the LLM engine, so admission control
+    # never sheds a crisis message
+    @cached_property
+    def crisis_detector(self) -> CrisisDetector:
+        return CrisisDetector()
+    
+    def warm_up(self):
+        pass
+    
+    def load_model(self):
+        return True
+    
+    def model_status(self):
+        return {'name': None, 'ready': True}
+    
+    def start_session(self, user_id, session_id=None):
+        return "Hello! I'm your mental health support assistant. I'm here to listen and help you with stress, anxiety, or any concerns you might have. What's on your mind today?"
+    
+    def end_session(self, user_id):
+        return "Thank you for talking with me today. Take care of yourself, and come back whenever you need to."
+    
+    def close(self):
+        pass
+    
+    def assess_risk(self, message):
+        return self.crisis_detector.assess_risk_level(message)[0].value
+    
+    def process_message(self, user_id, message, deadline=None, on_chunk=None, session_id=None,
+                        degraded=False, history=None):
+        # Replies are canned already, so degraded changes nothing
+        severity, crisis_keywords = self.crisis_detector.assess_risk_level(message)
+        message_lower = message.lower()
+        
+        if severity in (SeverityLevel.CRITICAL, SeverityLevel.HIGH):
+            resources = self.crisis_detector.get_crisis_resources(severity)
+            helplines = "\n".join(f"• {helpline['name']}: {helpline['number']}"
+                                   for helpline in resources['helplines'])
+            response = f"{resources['message']}\n\n{helplines}"
+        elif any(word in message_lower for word in ['stress', 'stressed', 'pressure']):
+            response = "I understand you're feeling stressed. Try taking deep breaths and breaking tasks into smaller steps. Would you like to try a quick relaxation exercise?"
+        elif any(word in message_lower for word in ['anxious', 'anxiety', 'worry', 'nervous']):
+            response = "Anxiety can be challenging. Remember that these feelings are temporary. Let's practice some grounding techniques together."
+        elif any(word in message_lower for word in ['sad', 'depressed', 'hopeless']):
+            response = "I hear that you're going through a tough time. It's okay to feel this way. Would you like to talk about what's been bothering you?"
+        else:
+            response = "Thank you for sharing. I'm here to listen and support you. Can you tell me more about how you're feeling?"
+        
+        return {
+            'response': response,
+            'emotion_detected': 'neutral',
+            'emotion_confidence': 0.7,
+            'risk_level': severity.value,
+            'crisis_keywords': crisis_keywords,
+            'emotion_trend': {},
+            'degraded': False
+        }
+
+
+class LLMChatEngine(MentalHealthChatbot):
+    """Ollama-backed MentalHealthChatbot with JSON-friendly results"""
+    
+    def __init__(self):
+        super().__init__(
+            model_name=os.getenv("OLLAMA_MODEL", "llama3.1:8b"),
+            keep_alive=parse_keep_alive(os.getenv("OLLAMA_KEEP_ALIVE", "-1")),
+            deadline_seconds=float(os.getenv("CHAT_DEADLINE_SECONDS", "20")),
+            fast_model_name=os.getenv("OLLAMA_FAST_MODEL", "") or None,
+            fast_deadline_seconds=float(os.getenv("CHAT_FAST_DEADLINE_SECONDS", "4")),
+            short_message_chars=int(os.getenv("CHAT_SHORT_MESSAGE_CHARS", "160"))
+        )
+    
+    def process_message(self, user_id: str, message: str,
+                        deadline: Optional[RequestDeadline] = None,
+                        on_chunk: Optional[Callable[[str], None]] = None,
+                        session_id: Optional[str] = None,
+                        degraded: bool = False,
+                        history: Optional[Deque[Dict]] = None) -> Dict[str, Any]:
+        result = super().process_message(user_id, message, deadline, on_chunk, session_id, degraded,
+                                         history)
+        result['emotion_trend'] = {
+            emotion.value: count for emotion, count in result['emotion_trend'].items()
+        }
+        return result
+
+
+CHAT_ENGINES = {
+    "simple": SimpleChatbot,
+    "llm": LLMChatEngine,
+}
+
+
+@lru_cache(maxsize=None)
+def get_chat_engine(name: str) -> ChatEngine:
+    """Create (once per process) and warm the named engine"""
+    try:
+        engine_class = CHAT_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown chat engine {name!r}; expected one of {sorted(CHAT_ENGINES)}")
+    
+    engine = engine_class()
+    engine.warm_up()
+    return engine
@@ -5,31 +5,32 @@ Author: SIH Team
 Version: 1.0.0
 """
 
-import ollama
 import json
 import datetime
 import re
 import time
 import sqlite3
 import hashlib
-from typing import Dict, List, Tuple, Optional
+import random
+import threading
+import math
+from array import array
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
+from functools import cached_property
 import logging
-from collections import deque
-import numpy as np
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('mental_health_chatbot.log'),
-        logging.StreamHandler()
-    ]
-)
+from collections import OrderedDict, deque
+
+# The ollama client (and httpx beneath it) is imported on first use, and the
+# log file is only opened by the CLI, so importing this module stays cheap
 logger = logging.getLogger(__name__)
 
+def configure_logging():
+    """Log to mental_health_chatbot.log and the console (CLI only)"""
+    from logging_config import setup_logging
+    setup_logging(log_file='mental_health_chatbot.log')
+
 # Mental health severity levels
 class SeverityLevel(Enum):
     LOW = "low"
@@ -48,6 +49,9 @@ class EmotionCategory(Enum):
     HOPEFUL = "hopeful"
     NEUTRAL = "neutral"
 
+# Small integer codes for compact storage: EMOTION_CODES[code] is the emotion
+EMOTION_CODES: List[EmotionCategory] = list(EmotionCategory)
+
 @dataclass
 class UserProfile:
     """User profile for personalized support"""
@@ -207,8 +211,6 @@ class EmotionAnalyzer:
                 'improving', 'confident', 'motivated', 'encouraged'
             ]
         }
-        
-        self.emotion_history = deque(maxlen=10)
     
     def analyze_emotion(self, text: str) -> Tuple[EmotionCategory, float]:
         """Analyze the primary emotion in text"""
@@ -226,15 +228,409 @@ class EmotionAnalyzer:
         primary_emotion = max(emotion_scores, key=emotion_scores.get)
         confidence = emotion_scores[primary_emotion] / sum(emotion_scores.values())
         
-        self.emotion_history.append(primary_emotion)
         return primary_emotion, confidence
     
-    def get_emotion_trend(self) -> Dict[EmotionCategory, int]:
-        """Get emotion trends from history"""
+    @cached_property
+    def _keyword_index(self):
+        """Lexicon compiled for analyze_batch
+        
+        Returns (keywords, W, column codes): W is the (keywords x emotions)
+        count matrix, and column codes map its columns to EMOTION_CODES.
+        """
+        import numpy as np
+        
+        emotions = list(self.emotion_lexicon)
+        keywords = sorted({keyword for words in self.emotion_lexicon.values() for keyword in words})
+        column = {keyword: j for j, keyword in enumerate(keywords)}
+        
+        weights = np.zeros((len(keywords), len(emotions)), dtype=np.float32)
+        for i, emotion in enumerate(emotions):
+            for keyword in self.emotion_lexicon[emotion]:
+                weights[column[keyword], i] += 1
+        codes = np.array([EMOTION_CODES.index(emotion) for emotion in emotions], dtype=np.uint8)
+        
+        return keywords, weights, codes
+    
+    @cached_property
+    def _keyword_automaton(self):
+        """Aho-Corasick automaton over the keywords' UTF-8 bytes, for _keyword_hits
+        
+        Returns (byte classes, ASCII classes, transitions, first terminal,
+        output offsets, output keywords, longest keyword). Bytes that occur
+        in no keyword share class 0; the others get a class each, and
+        `bytes.translate` with the byte classes table maps lower-cased text
+        onto them. The ASCII classes table also lower-cases ASCII letters,
+        so ASCII text can skip lower(). States are stored
+        premultiplied by the number of classes, so transitions[state + class]
+        is the next state. States where a keyword ends are numbered last, from
+        first terminal on, and the keywords ending at state s are output
+        keywords[output offsets[s // classes]:output offsets[s // classes + 1]].
+        """
+        import numpy as np
+        
+        keywords = self._keyword_index[0]
+        encoded = [keyword.encode('utf-8') for keyword in keywords]
+        alphabet = sorted({byte for word in encoded for byte in word})
+        byte_classes = bytearray(256)
+        for number, byte in enumerate(alphabet, 1):
+            byte_classes[byte] = number
+        classes = len(alphabet) + 1
+        
+        # Trie, then failure links breadth first, completing every state's
+        # transitions and outputs from its failure state as we go
+        children: List[Dict[int, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for j, word in enumerate(encoded):
+            state = 0
+            for byte in word:
+                symbol = byte_classes[byte]
+                if symbol not in children[state]:
+                    children.append({})
+                    outputs.append([])
+                    children[state][symbol] = len(children) - 1
+                state = children[state][symbol]
+            outputs[state].append(j)
+        
+        delta = np.zeros((len(children), classes), dtype=np.int64)
+        failure = [0] * len(children)
+        queue = deque()
+        for symbol, child in children[0].items():
+            delta[0, symbol] = child
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[failure[state]]
+            for symbol in range(classes):
+                child = children[state].get(symbol)
+                if child is None:
+                    delta[state, symbol] = delta[failure[state], symbol]
+                else:
+                    failure[child] = delta[failure[state], symbol]
+                    delta[state, symbol] = child
+                    queue.append(child)
+        
+        # Renumber so that "a keyword ends here" is one comparison; the root stays 0
+        order = sorted(range(len(children)), key=lambda state: bool(outputs[state]))
+        renumber = np.empty(len(children), dtype=np.int64)
+        renumber[order] = np.arange(len(children))
+        outputs = [outputs[state] for state in order]
+        first_terminal = sum(1 for found in outputs if not found) * classes
+        
+        size = len(children) * classes
+        transitions = (renumber[delta[order]] * classes).astype(
+            np.int16 if size <= np.iinfo(np.int16).max else np.int32
+        )
+        offsets = np.zeros(len(children) + 1, dtype=np.int64)
+        np.cumsum([len(found) for found in outputs], out=offsets[1:])
+        output_keywords = np.array([j for found in outputs for j in found], dtype=np.int64)
+        
+        ascii_classes = bytes(byte_classes[ord(chr(byte).lower())] if byte < 128 else 0 for byte in range(256))
+        return (bytes(byte_classes), ascii_classes, transitions.ravel(), first_terminal, offsets,
+                output_keywords, max(map(len, encoded)))
+    
+    def analyze_batch(self, texts: List[str], chunk_size: int = 50_000):
+        """Classify many texts at once; returns (codes, confidences) NumPy arrays
+        
+        codes index EMOTION_CODES. Each result equals analyze_emotion on the
+        same text.
+        """
+        import numpy as np
+        
+        weights, column_codes = self._keyword_index[1:]
+        codes = np.full(len(texts), EMOTION_CODES.index(EmotionCategory.NEUTRAL), dtype=np.uint8)
+        confidences = np.zeros(len(texts), dtype=np.float64)
+        
+        for offset in range(0, len(texts), chunk_size):
+            rows, columns = self._keyword_hits(texts[offset:offset + chunk_size])
+            if not rows.size:
+                continue
+            
+            # rows and columns are the sparse (texts x keywords) presence
+            # matrix in CSR form, minus its empty rows; its product with W
+            # sums W's rows for each text's keywords
+            row_starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+            scores = np.add.reduceat(weights[columns], row_starts, axis=0).astype(np.float64)
+            best = scores.argmax(axis=1)
+            
+            matched = offset + rows[row_starts]
+            codes[matched] = column_codes[best]
+            confidences[matched] = scores[np.arange(len(best)), best] / scores.sum(axis=1)
+        
+        return codes, confidences
+    
+    # Bytes each automaton lane scans; fewer lanes mean more NumPy steps
+    LANE_BYTES = 256
+    
+    def _keyword_hits(self, texts: List[str]):
+        """(rows, columns): keyword columns[k] is a substring of texts[rows[k]].lower()
+        
+        Each (text, keyword) pair appears once, in sorted order. The texts
+        are lower-cased as one NUL-separated UTF-8 byte string, which the
+        keyword automaton scans in a single pass. UTF-8 is self-synchronising,
+        so a byte match is exactly a character match. The string is cut into
+        equal lanes that are run in lockstep, one NumPy step per byte; matches
+        that straddle two lanes are found by a second, short run over the
+        bytes around each cut.
+        """
+        import numpy as np
+        
+        (byte_classes, ascii_classes, transitions, first_terminal, offsets, output_keywords,
+         longest) = self._keyword_automaton
+        keywords = self._keyword_index[0]
+        classes = len(transitions) // (len(offsets) - 1)
+        count = len(texts)
+        
+        # Byte offset of each text. ASCII text keeps its length through
+        # lower() and encode(); anything else is measured after conversion.
+        joined = "\0".join(texts)
+        if joined.isascii():
+            corpus = joined.encode('ascii').translate(ascii_classes)
+            lengths = np.fromiter(map(len, texts), dtype=np.int64, count=count)
+        else:
+            corpus = joined.lower().encode('utf-8').translate(byte_classes)
+            lengths = np.fromiter((len(text.lower().encode('utf-8')) for text in texts),
+                                  dtype=np.int64, count=count)
+        size = len(corpus)
+        starts = np.zeros(count, dtype=np.int64)
+        np.cumsum(lengths[:-1] + 1, out=starts[1:])
+        
+        lane = max(self.LANE_BYTES, longest)
+        lanes = max(1, size // lane)
+        lane = -(-size // lanes)
+        # A multiple of 8, for the transpose below
+        lane += -lane % 8
+        symbols = np.frombuffer(corpus + bytes(lanes * lane + longest - size), dtype=np.uint8)
+        
+        def run(steps, width: int, base: int):
+            """Run the automaton over width lanes, a row of steps at a time; end positions of matches"""
+            state = np.zeros(width, dtype=transitions.dtype)
+            ended = np.empty(width, dtype=bool)
+            ends, states = [], []
+            for i, column in enumerate(steps):
+                np.add(state, column, out=state)
+                # mode='clip' skips the bounds check, and the buffering it needs with out=
+                np.take(transitions, state, out=state, mode='clip')
+                np.greater_equal(state, first_terminal, out=ended)
+                if ended.any():
+                    found = np.flatnonzero(ended)
+                    ends.append(found * lane + (base + i))
+                    states.append(state[found])
+            if not ends:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+            return np.concatenate(ends), np.concatenate(states).astype(np.int64) // classes
+        
+        # Lanes side by side, so each step reads one row. Only 8-byte words
+        # are transposed (far faster than bytes); a step then reads every
+        # 8th byte of one block of words.
+        words = np.ascontiguousarray(symbols[:lanes * lane].view(np.uint64).reshape(lanes, lane // 8).T)
+        blocks = words.view(np.uint8).reshape(lane // 8, lanes, 8)
+        ends, states = run((blocks[i // 8, :, i % 8] for i in range(lane)), lanes, 0)
+        if lanes > 1:
+            around = (np.arange(1, lanes) * lane)[None, :] + np.arange(1 - longest, longest - 1)[:, None]
+            cut_ends, cut_states = run(symbols[around], lanes - 1, lane + 1 - longest)
+            ends = np.concatenate((ends, cut_ends))
+            states = np.concatenate((states, cut_states))
+        
+        # Each end state can close several keywords (one inside another)
+        firsts, lasts = offsets[states], offsets[states + 1]
+        repeats = lasts - firsts
+        # Sorted ends make the lookup of their texts cache-friendly
+        order = np.argsort(ends)
+        ends, firsts, repeats = ends[order], firsts[order], repeats[order]
+        rows = np.repeat(np.searchsorted(starts, ends, side='right') - 1, repeats)
+        within = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        columns = output_keywords[np.repeat(firsts, repeats) + within]
+        
+        pairs = np.sort(rows * len(keywords) + columns)
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+        return pairs // len(keywords), pairs % len(keywords)
+
+class EmotionTrendStore:
+    """Per-user emotion trends in fixed-size arrays, persisted to SQLite
+    
+    Every cached user owns one slot: a decayed score per emotion, the time
+    the scores were last decayed, and a ring of their most recent emotion
+    codes with timestamps. Slots are recycled least recently used first, so
+    memory is fixed by max_users; an evicted user is reloaded from the
+    emotion_trends table on their next message.
+    
+    Writes are batched: a recorded slot is marked dirty, and dirty slots
+    are written in one transaction every flush_seconds, before their slot
+    is reused, and on close().
+    """
+    
+    RECENT = 10
+    # Decayed scores below this are left out of the reported trend
+    MIN_SCORE = 0.01
+    
+    def __init__(self, db_path: str = "mental_health_chat.db", max_users: int = 100_000,
+                 half_life_hours: float = 72.0, flush_seconds: float = 5.0):
+        self.db_path = db_path
+        self.flush_seconds = flush_seconds
+        self.max_users = max_users
+        self.decay_rate = math.log(2) / (half_life_hours * 3600)
+        self.width = len(EMOTION_CODES)
+        self._codes = {emotion: code for code, emotion in enumerate(EMOTION_CODES)}
+        
+        # Zero-filled up front; bytes() of this size costs no more than a calloc
+        self._scores = array('f', bytes(4 * max_users * self.width))
+        self._updated = array('d', bytes(8 * max_users))
+        self._recent_codes = array('B', bytes(max_users * self.RECENT))
+        self._recent_times = array('d', bytes(8 * max_users * self.RECENT))
+        self._recent_counts = array('I', bytes(4 * max_users))
+        
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free = list(range(max_users - 1, -1, -1))
+        self._dirty: Dict[str, int] = {}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        
+        # One connection, used only under the lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS emotion_trends (
+                user_id TEXT PRIMARY KEY,
+                scores BLOB,
+                updated_at REAL,
+                recent_codes BLOB,
+                recent_times BLOB,
+                recent_count INTEGER
+            )
+        ''')
+        self._conn.commit()
+    
+    def record(self, user_id: str, emotion: EmotionCategory,
+               now: Optional[float] = None) -> Dict[EmotionCategory, float]:
+        """Add one message's emotion and return the user's decayed trend"""
+        now = time.time() if now is None else now
+        code = self._codes[emotion]
+        with self._lock:
+            slot = self._slot(user_id)
+            self._decay(slot, now)
+            self._scores[slot * self.width + code] += 1.0
+            
+            count = self._recent_counts[slot]
+            ring = slot * self.RECENT + count % self.RECENT
+            self._recent_codes[ring] = code
+            self._recent_times[ring] = now
+            self._recent_counts[slot] = count + 1
+            
+            self._dirty[user_id] = slot
+            if time.monotonic() - self._flushed_at >= self.flush_seconds:
+                self._flush()
+            return self._trend(slot, 1.0)
+    
+    def trend(self, user_id: str, now: Optional[float] = None) -> Dict[EmotionCategory, float]:
+        """The user's scores decayed to now, without recording anything"""
+        now = time.time() if now is None else now
+        with self._lock:
+            slot = self._slot(user_id)
+            return self._trend(slot, math.exp(-self.decay_rate * max(0.0, now - self._updated[slot])))
+    
+    def recent(self, user_id: str) -> List[Tuple[EmotionCategory, float]]:
+        """The user's last RECENT emotions with their timestamps, oldest first"""
+        with self._lock:
+            slot = self._slot(user_id)
+            count = self._recent_counts[slot]
+            base = slot * self.RECENT
+            return [
+                (EMOTION_CODES[self._recent_codes[base + i % self.RECENT]],
+                 self._recent_times[base + i % self.RECENT])
+                for i in range(max(0, count - self.RECENT), count)
+            ]
+    
+    def flush(self):
+        """Write every dirty slot to the emotion_trends table"""
+        with self._lock:
+            self._flush()
+    
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def _slot(self, user_id: str) -> int:
+        slot = self._slots.get(user_id)
+        if slot is not None:
+            self._slots.move_to_end(user_id)
+            return slot
+        
+        if self._free:
+            slot = self._free.pop()
+        else:
+            # The coldest slot is reused once its pending write is out
+            coldest, slot = self._slots.popitem(last=False)
+            if coldest in self._dirty:
+                self._flush()
+        self._slots[user_id] = slot
+        self._load(user_id, slot)
+        return slot
+    
+    def _decay(self, slot: int, now: float):
+        elapsed = now - self._updated[slot]
+        if elapsed > 0:
+            factor = math.exp(-self.decay_rate * elapsed)
+            base = slot * self.width
+            for i in range(base, base + self.width):
+                self._scores[i] *= factor
+        self._updated[slot] = now
+    
+    def _trend(self, slot: int, factor: float) -> Dict[EmotionCategory, float]:
+        base = slot * self.width
         trend = {}
-        for emotion in self.emotion_history:
-            trend[emotion] = trend.get(emotion, 0) + 1
+        for code in range(self.width):
+            score = self._scores[base + code] * factor
+            if score >= self.MIN_SCORE:
+                trend[EMOTION_CODES[code]] = round(score, 3)
         return trend
+    
+    def _load(self, user_id: str, slot: int):
+        row = self._conn.execute('''
+            SELECT scores, updated_at, recent_codes, recent_times, recent_count
+            FROM emotion_trends WHERE user_id = ?
+        ''', (user_id,)).fetchone()
+        
+        scores = slice(slot * self.width, (slot + 1) * self.width)
+        recent = slice(slot * self.RECENT, (slot + 1) * self.RECENT)
+        if row is None:
+            self._scores[scores] = array('f', bytes(4 * self.width))
+            self._updated[slot] = 0.0
+            self._recent_codes[recent] = array('B', bytes(self.RECENT))
+            self._recent_times[recent] = array('d', bytes(8 * self.RECENT))
+            self._recent_counts[slot] = 0
+        else:
+            self._scores[scores] = array('f', row[0])
+            self._updated[slot] = row[1]
+            self._recent_codes[recent] = array('B', row[2])
+            self._recent_times[recent] = array('d', row[3])
+            self._recent_counts[slot] = row[4]
+    
+    def _row(self, user_id: str, slot: int) -> Tuple:
+        scores = slice(slot * self.width, (slot + 1) * self.width)
+        recent = slice(slot * self.RECENT, (slot + 1) * self.RECENT)
+        return (
+            user_id,
+            self._scores[scores].tobytes(),
+            self._updated[slot],
+            self._recent_codes[recent].tobytes(),
+            self._recent_times[recent].tobytes(),
+            self._recent_counts[slot]
+        )
+    
+    def _flush(self):
+        self._flushed_at = time.monotonic()
+        if not self._dirty:
+            return
+        self._conn.executemany('''
+            INSERT OR REPLACE INTO emotion_trends
+            (user_id, scores, updated_at, recent_codes, recent_times, recent_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [self._row(user_id, slot) for user_id, slot in self._dirty.items()])
+        self._conn.commit()
+        self._dirty.clear()
 
 class TherapeuticInterventions:
     """Provides evidence-based therapeutic interventions"""
@@ -317,12 +713,25 @@ class TherapeuticInterventions:
         Small actions can create positive momentum."""
 
 class ConversationManager:
-    """Manages conversation flow and context"""
+    """Manages conversation flow and context
+    
+    conversations.timestamp is naive UTC in ISO-8601, stamped when the row
+    is inserted, so ids follow timestamps; search relies on that to turn a
+    date range into an id range.
+    """
+    
+    # Most matches a search ranks when it isn't limited to one user
+    SEARCH_WINDOW = 5000
+    # Exchanges kept per conversation, and conversations kept for callers
+    # that don't hold their own history
+    HISTORY_TURNS = 20
+    MAX_HISTORIES = 1000
     
     def __init__(self, db_path: str = "mental_health_chat.db"):
         self.db_path = db_path
         self.init_database()
-        self.conversation_history = deque(maxlen=20)
+        self._histories: "OrderedDict[str, deque]" = OrderedDict()
+        self._histories_lock = threading.Lock()
         self.current_session_id = None
     
     def init_database(self):
@@ -343,6 +752,45 @@ class ConversationManager:
             )
         ''')
         
+        # Transcript lookups read one user's or one session's rows in order
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_conversations_user_timestamp
+            ON conversations (user_id, timestamp)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_conversations_session
+            ON conversations (session_id)
+        ''')
+        
+        # Search turns a date range into an id range through this one
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_conversations_timestamp
+            ON conversations (timestamp)
+        ''')
+        
+        self._init_search_index(cursor)
+        
+        # One row per ended chat session, written by the API's session registry
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id TEXT,
+                started_at DATETIME,
+                ended_at DATETIME,
+                end_reason TEXT,
+                turns INTEGER,
+                active_seconds REAL,
+                max_risk TEXT,
+                emotions TEXT
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_started
+            ON chat_sessions (user_id, started_at)
+        ''')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
                 user_id TEXT PRIMARY KEY,
@@ -355,9 +803,57 @@ class ConversationManager:
         conn.commit()
         conn.close()
     
+    def _init_search_index(self, cursor: sqlite3.Cursor):
+        """Full-text index over both sides of every conversation
+
+        An external-content FTS5 table: it stores only the index and reads
+        the text back from conversations. Triggers keep it in step with every
+        insert, delete and text update, whoever makes them. user_id is
+        indexed too (with no weight in the ranking) so that a search within
+        one user's conversations intersects two posting lists instead of
+        probing the index once per row.
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'conversations_fts'"
+        ).fetchone()
+        
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+                user_message, bot_response, user_id,
+                content='conversations', content_rowid='id',
+                tokenize='porter unicode61'
+            )
+        ''')
+        cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS conversations_fts_insert AFTER INSERT ON conversations BEGIN
+                INSERT INTO conversations_fts (rowid, user_message, bot_response, user_id)
+                VALUES (new.id, new.user_message, new.bot_response, new.user_id);
+            END;
+            CREATE TRIGGER IF NOT EXISTS conversations_fts_delete AFTER DELETE ON conversations BEGIN
+                INSERT INTO conversations_fts (conversations_fts, rowid, user_message, bot_response, user_id)
+                VALUES ('delete', old.id, old.user_message, old.bot_response, old.user_id);
+            END;
+            CREATE TRIGGER IF NOT EXISTS conversations_fts_update
+            AFTER UPDATE OF user_message, bot_response, user_id ON conversations BEGIN
+                INSERT INTO conversations_fts (conversations_fts, rowid, user_message, bot_response, user_id)
+                VALUES ('delete', old.id, old.user_message, old.bot_response, old.user_id);
+                INSERT INTO conversations_fts (rowid, user_message, bot_response, user_id)
+                VALUES (new.id, new.user_message, new.bot_response, new.user_id);
+            END;
+        ''')
+        
+        if not exists:
+            # What the student wrote matters more than the bot's reply
+            cursor.execute(
+                "INSERT INTO conversations_fts (conversations_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0, 0.0)')"
+            )
+            # Index conversations saved before the index existed
+            cursor.execute("INSERT INTO conversations_fts (conversations_fts) VALUES ('rebuild')")
+    
     def save_conversation(self, user_id: str, user_message: str, 
-                         bot_response: str, emotion: str, risk_level: str):
-        """Save conversation to database"""
+                         bot_response: str, emotion: str, risk_level: str,
+                         session_id: Optional[str] = None):
+        """Save conversation to database (under the current session unless one is given)"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
@@ -366,9 +862,9 @@ class ConversationManager:
             (session_id, user_id, timestamp, user_message, bot_response, emotion_detected, risk_level)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (
-            self.current_session_id,
+            session_id or self.current_session_id,
             user_id,
-            datetime.datetime.now().isoformat(),
+            datetime.datetime.utcnow().isoformat(),
             user_message,
             bot_response,
             emotion,
@@ -378,20 +874,333 @@ class ConversationManager:
         conn.commit()
         conn.close()
     
-    def get_conversation_context(self, limit: int = 5) -> List[Dict]:
+    def iter_history(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                     since: Optional[str] = None, until: Optional[str] = None,
+                     page_size: int = 100) -> Iterator[List[Dict]]:
+        """Yield a user's or session's transcript in pages of at most page_size rows"""
+        if user_id is None and session_id is None:
+            raise ValueError("user_id or session_id is required")
+        
+        clauses = []
+        params = []
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        
+        # A session is written in insertion order; a user's rows span sessions.
+        # Each page is its own short keyset query that resumes after the last
+        # row sent, so no cursor (or read lock) is held while a slow client
+        # reads the stream.
+        key = "id" if session_id is not None else "timestamp, id"
+        where = " AND ".join(clauses)
+        after = None
+        
+        # The generator may be resumed from different worker threads
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            while True:
+                page_clauses = where
+                page_params = list(params)
+                if after is not None:
+                    page_clauses += f" AND ({key}) > ({', '.join('?' * len(after))})"
+                    page_params.extend(after)
+                rows = conn.execute(f'''
+                    SELECT id, session_id, user_id, timestamp, user_message,
+                           bot_response, emotion_detected, risk_level
+                    FROM conversations
+                    WHERE {page_clauses}
+                    ORDER BY {key}
+                    LIMIT ?
+                ''', page_params + [page_size]).fetchall()
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+                last = rows[-1]
+                after = (last['id'],) if session_id is not None else (last['timestamp'], last['id'])
+        finally:
+            conn.close()
+    
+    def save_session_summaries(self, summaries: List[Dict]):
+        """Record ended chat sessions, all in one transaction"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO chat_sessions
+                    (session_id, user_id, started_at, ended_at, end_reason, turns,
+                     active_seconds, max_risk, emotions)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(
+                    summary["session_id"],
+                    summary["user_id"],
+                    summary["started_at"],
+                    summary["ended_at"],
+                    summary["end_reason"],
+                    summary["turns"],
+                    summary["active_seconds"],
+                    summary["max_risk"],
+                    json.dumps(summary["emotions"])
+                ) for summary in summaries])
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _quote(text: str) -> str:
+        return '"' + text.replace('"', '""') + '"'
+    
+    @classmethod
+    def _match_expression(cls, query: str, user_id: Optional[str] = None) -> Optional[str]:
+        """FTS5 query matching every word of free text; a trailing * is a prefix search"""
+        terms = []
+        for word in query.split():
+            prefix = word.endswith("*")
+            word = word.rstrip("*")
+            if word:
+                terms.append(cls._quote(word) + ("*" if prefix else ""))
+        if not terms:
+            return None
+        expression = f"{{user_message bot_response}} : ({' '.join(terms)})"
+        if user_id is not None:
+            expression = f"{{user_id}} : {cls._quote(user_id)} AND {expression}"
+        return expression
+    
+    def search(self, query: str, user_id: Optional[str] = None,
+               since: Optional[str] = None, until: Optional[str] = None,
+               risk_levels: Optional[List[str]] = None,
+               page: int = 1, page_size: int = 20) -> Dict:
+        """One page of conversations matching query, best match first
+
+        Only the newest SEARCH_WINDOW matches (in the date range, for the
+        user) are ranked and filtered, so a common word costs the same on ten
+        million rows as on ten thousand; "exhaustive" says whether the window
+        held every match.
+        """
+        empty = {"results": [], "page": page, "has_more": False, "exhaustive": True}
+        match = self._match_expression(query, user_id)
+        if match is None:
+            return empty
+        
+        clauses = ["conversations_fts MATCH ?"]
+        params: List = [match]
+        filters = []
+        filter_params: List = []
+        if user_id is not None:
+            filters.append("c.user_id = ?")
+            filter_params.append(user_id)
+        if since is not None:
+            filters.append("c.timestamp >= ?")
+            filter_params.append(since)
+        if until is not None:
+            filters.append("c.timestamp < ?")
+            filter_params.append(until)
+        if risk_levels:
+            filters.append(f"c.risk_level IN ({', '.join('?' * len(risk_levels))})")
+            filter_params.extend(risk_levels)
+        
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            # Rows are stamped in UTC as they are saved, so ids follow
+            # timestamps and a date range is also a rowid range the index can
+            # seek to; the final query still checks the timestamps themselves
+            for bound, op, value in (("since", ">=", since), ("until", "<", until)):
+                if value is None:
+                    continue
+                row = conn.execute(
+                    "SELECT id FROM conversations WHERE timestamp >= ? ORDER BY timestamp LIMIT 1",
+                    (value,)
+                ).fetchone()
+                if row is None:
+                    if bound == "since":
+                        return empty
+                    continue
+                clauses.append(f"conversations_fts.rowid {op} ?")
+                params.append(row[0])
+            
+            # Walking matches newest first is cheap; ranking them is not
+            oldest, found = conn.execute(f'''
+                SELECT min(rowid), count(*) FROM (
+                    SELECT rowid FROM conversations_fts
+                    WHERE {" AND ".join(clauses)}
+                    ORDER BY rowid DESC
+                    LIMIT ?
+                )
+            ''', params + [self.SEARCH_WINDOW]).fetchone()
+            exhaustive = found < self.SEARCH_WINDOW
+            if not exhaustive:
+                clauses.append("conversations_fts.rowid >= ?")
+                params.append(oldest)
+            
+            # One extra row says whether there is a next page without
+            # counting every match
+            rows = conn.execute(f'''
+                SELECT c.id, c.session_id, c.user_id, c.timestamp, c.emotion_detected,
+                       c.risk_level, conversations_fts.rank AS score,
+                       snippet(conversations_fts, 0, '**', '**', '…', 16) AS user_snippet,
+                       snippet(conversations_fts, 1, '**', '**', '…', 16) AS bot_snippet
+                FROM conversations_fts
+                JOIN conversations c ON c.id = conversations_fts.rowid
+                WHERE {" AND ".join(clauses + filters)}
+                ORDER BY conversations_fts.rank
+                LIMIT ? OFFSET ?
+            ''', params + filter_params + [page_size + 1, (page - 1) * page_size]).fetchall()
+        finally:
+            conn.close()
+        
+        return {
+            "results": [dict(row) for row in rows[:page_size]],
+            "page": page,
+            "has_more": len(rows) > page_size,
+            "exhaustive": exhaustive
+        }
+    
+    def history_for(self, key: str) -> deque:
+        """Recent exchanges of one conversation (least recently used ones are dropped)"""
+        with self._histories_lock:
+            history = self._histories.pop(key, None)
+            if history is None:
+                history = deque(maxlen=self.HISTORY_TURNS)
+            self._histories[key] = history
+            while len(self._histories) > self.MAX_HISTORIES:
+                self._histories.popitem(last=False)
+            return history
+    
+    def get_conversation_context(self, history: deque, limit: int = 5) -> List[Dict]:
         """Get recent conversation context"""
-        return list(self.conversation_history)[-limit:]
+        return list(history)[-limit:]
+
+class GenerationCancelled(Exception):
+    """The request was abandoned (e.g. the client disconnected) mid-generation"""
+
+class DeadlineExceeded(Exception):
+    """The reply could not be generated within the request's deadline"""
+
+class RequestDeadline:
+    """Absolute deadline for one request plus a flag to abandon it early
+    
+    Created by the API per request and carried through process_message into
+    the model call, which checks it between streamed chunks.
+    """
+    
+    def __init__(self, timeout_seconds: Optional[float] = None):
+        self.expires_at = time.monotonic() + timeout_seconds if timeout_seconds is not None else None
+        self.cancel_reason: Optional[str] = None
+    
+    def cancel(self, reason: str = "client_disconnected"):
+        self.cancel_reason = reason
+    
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_reason is not None
+    
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+@dataclass
+class ModelRoute:
+    """A model and the latency budget for replies generated with it"""
+    name: str
+    model_name: str
+    deadline_seconds: float
+
+class ModelRouter:
+    """Routes messages between a small fast model and the primary model
+    
+    Short LOW-risk messages go to the fast route when one is configured;
+    everything else goes to the primary route. Hits, deadline fallbacks,
+    errors and cancellations are counted per route, along with an estimate of
+    the generation time saved by stopping abandoned or late generations.
+    """
+    
+    # Smoothing factor for the running average of full generation times
+    DURATION_ALPHA = 0.2
+    
+    def __init__(self, primary: ModelRoute, fast: Optional[ModelRoute] = None,
+                 short_message_chars: int = 160):
+        self.primary = primary
+        self.fast = fast
+        self.short_message_chars = short_message_chars
+        self.counters = {
+            route.name: {'hits': 0, 'fallbacks': 0, 'errors': 0, 'cancelled': 0, 'reclaimed_seconds': 0.0}
+            for route in (primary, fast) if route is not None
+        }
+        self._average_seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def routes(self) -> List[ModelRoute]:
+        return [route for route in (self.primary, self.fast) if route is not None]
+    
+    def choose(self, message: str, severity: SeverityLevel) -> ModelRoute:
+        if (self.fast is not None and severity == SeverityLevel.LOW
+                and len(message) <= self.short_message_chars):
+            return self.fast
+        return self.primary
+    
+    def record(self, route: ModelRoute, outcome: str, elapsed: float = 0.0):
+        """Count a 'hits', 'fallbacks', 'errors' or 'cancelled' outcome
+        
+        For completed generations elapsed feeds the running average; for
+        stopped ones, whatever of that average was left counts as reclaimed.
+        """
+        with self._lock:
+            counters = self.counters[route.name]
+            counters[outcome] += 1
+            average = self._average_seconds.get(route.name)
+            if outcome == 'hits':
+                self._average_seconds[route.name] = elapsed if average is None else (
+                    average + self.DURATION_ALPHA * (elapsed - average)
+                )
+            elif outcome in ('fallbacks', 'cancelled') and average is not None:
+                counters['reclaimed_seconds'] += max(0.0, average - elapsed)
+    
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                route.name: {
+                    'model': route.model_name,
+                    'deadline_seconds': route.deadline_seconds,
+                    'average_seconds': self._average_seconds.get(route.name),
+                    **self.counters[route.name]
+                }
+                for route in self.routes
+            }
 
 class MentalHealthChatbot:
     """Main chatbot class integrating all components"""
     
-    def __init__(self, model_name: str = "llama3.1:8b"):
+    # A chat whose reply reports a model load slower than this was a cold reload
+    COLD_LOAD_SECONDS = 1.0
+    
+    def __init__(self, model_name: str = "llama3.1:8b", keep_alive: Union[float, str] = "30m",
+                 deadline_seconds: float = 20.0, fast_model_name: Optional[str] = None,
+                 fast_deadline_seconds: float = 4.0, short_message_chars: int = 160):
         self.model_name = model_name
-        self.crisis_detector = CrisisDetector()
-        self.emotion_analyzer = EmotionAnalyzer()
-        self.interventions = TherapeuticInterventions()
-        self.conversation_manager = ConversationManager()
+        self.keep_alive = keep_alive
         self.current_user = None
+        self.router = ModelRouter(
+            primary=ModelRoute("primary", model_name, deadline_seconds),
+            fast=ModelRoute("fast", fast_model_name, fast_deadline_seconds) if fast_model_name else None,
+            short_message_chars=short_message_chars
+        )
+        self._clients = {}
+        
+        # Model readiness, reported by the API's health checks
+        self.model_ready = False
+        self.last_load_seconds: Optional[float] = None
+        self.last_loaded_at: Optional[str] = None
         
         # System prompt for mental health support
         self.system_prompt = """You are a compassionate and professional mental health support assistant. Your role is to:
@@ -415,8 +1224,102 @@ Guidelines:
 
 Remember: You're a support tool, not a therapist. Always encourage professional help when appropriate."""
     
-    def generate_response(self, user_input: str, context: List[Dict] = None) -> str:
-        """Generate empathetic response using Ollama"""
+    # Subsystems are built on first use so constructing the chatbot is cheap
+    @cached_property
+    def crisis_detector(self) -> CrisisDetector:
+        return CrisisDetector()
+    
+    @cached_property
+    def emotion_analyzer(self) -> EmotionAnalyzer:
+        return EmotionAnalyzer()
+    
+    @cached_property
+    def emotion_trends(self) -> EmotionTrendStore:
+        return EmotionTrendStore(self.conversation_manager.db_path)
+    
+    @cached_property
+    def interventions(self) -> TherapeuticInterventions:
+        return TherapeuticInterventions()
+    
+    @cached_property
+    def conversation_manager(self) -> ConversationManager:
+        return ConversationManager()
+    
+    def warm_up(self):
+        """Build every subsystem now instead of on the first message"""
+        self.crisis_detector
+        self.emotion_analyzer
+        self.interventions
+        self.conversation_manager
+        self.emotion_trends
+    
+    def close(self):
+        """Write out pending emotion trends; call once, when shutting down"""
+        if 'emotion_trends' in self.__dict__:
+            self.emotion_trends.close()
+    
+    def load_model(self) -> bool:
+        """Load the model into Ollama's memory and pin it there for keep_alive
+        
+        Readiness follows the primary model only; the fast model is warmed
+        too, but without it short messages simply go to the primary model.
+        """
+        start = time.perf_counter()
+        try:
+            import ollama
+            
+            # An empty prompt loads a model without generating anything
+            ollama.generate(model=self.model_name, prompt="", keep_alive=self.keep_alive)
+        except Exception as e:
+            self.model_ready = False
+            logger.error("Failed to load model %s: %s", self.model_name, e)
+            return False
+        
+        self._record_model_load(time.perf_counter() - start)
+        if self.router.fast is not None:
+            try:
+                ollama.generate(model=self.router.fast.model_name, prompt="", keep_alive=self.keep_alive)
+            except Exception as e:
+                logger.warning("Failed to load fast model %s: %s", self.router.fast.model_name, e)
+        return True
+    
+    def _record_model_load(self, seconds: float):
+        self.model_ready = True
+        self.last_load_seconds = round(seconds, 3)
+        self.last_loaded_at = datetime.datetime.now().isoformat()
+        logger.info("Model %s loaded in %.2fs", self.model_name, seconds)
+    
+    def model_status(self) -> Dict[str, any]:
+        """Readiness of the configured model and the latency of its last load"""
+        return {
+            'name': self.model_name,
+            'ready': self.model_ready,
+            'keep_alive': self.keep_alive,
+            'last_load_seconds': self.last_load_seconds,
+            'last_loaded_at': self.last_loaded_at,
+            'routes': self.router.stats()
+        }
+    
+    def _client(self, route: ModelRoute):
+        # One client per route; its read timeout bounds the wait for any chunk,
+        # including the first one while the model is still loading
+        client = self._clients.get(route.name)
+        if client is None:
+            import ollama
+            client = ollama.Client(timeout=route.deadline_seconds)
+            self._clients[route.name] = client
+        return client
+    
+    def generate_response(self, user_input: str, context: List[Dict] = None,
+                          severity: SeverityLevel = SeverityLevel.LOW,
+                          emotion: EmotionCategory = EmotionCategory.NEUTRAL,
+                          deadline: Optional[RequestDeadline] = None,
+                          on_chunk: Optional[Callable[[str], None]] = None) -> str:
+        """Generate empathetic response using Ollama, within the request's deadline
+        
+        on_chunk, if given, receives each piece of model output as it arrives.
+        Raises GenerationCancelled if the request is abandoned mid-generation.
+        """
         
         # Build conversation context
         messages = [
@@ -430,23 +1333,95 @@ Remember: You're a support tool, not a therapist. Always encourage professional
         
         messages.append({"role": "user", "content": user_input})
         
-        try:
-            # Generate response using Ollama
-            response = ollama.chat(
-                model=self.model_name,
-                messages=messages,
-                options={
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "max_tokens": 500
-                }
-            )
-            
-            return response['message']['content']
+        route = self.router.choose(user_input, severity)
+        while True:
+            # The route's latency budget caps whatever time the request has left
+            budget = route.deadline_seconds
+            if deadline is not None and deadline.remaining() is not None:
+                budget = min(budget, deadline.remaining())
             
-        except Exception as e:
-            logger.error(f"Error generating response: {e}")
+            start = time.monotonic()
+            try:
+                import httpx
+                
+                if budget <= 0:
+                    raise DeadlineExceeded()
+                reply = self._stream_reply(route, messages, deadline, start + budget, on_chunk)
+                self.router.record(route, 'hits', time.monotonic() - start)
+                return reply
+                
+            except GenerationCancelled:
+                self.router.record(route, 'cancelled', time.monotonic() - start)
+                logger.info("Generation on %s cancelled: %s", route.model_name, deadline.cancel_reason)
+                raise
+            except (DeadlineExceeded, httpx.TimeoutException):
+                self.router.record(route, 'fallbacks', time.monotonic() - start)
+                logger.warning("Model %s missed its %.1fs deadline, using template reply",
+                               route.model_name, budget)
+                return self.fallback_response(severity, emotion)
+            except Exception as e:
+                self.router.record(route, 'errors')
+                if route is not self.router.primary:
+                    # The fast model is optional; when it fails the primary model answers
+                    logger.warning("Fast model %s failed (%s), using %s",
+                                   route.model_name, e, self.router.primary.model_name)
+                    route = self.router.primary
+                    continue
+                self.model_ready = False
+                logger.error("Error generating response: %s", e)
+                return self.fallback_response(severity, emotion)
+    
+    def _stream_reply(self, route: ModelRoute, messages: List[Dict],
+                      deadline: Optional[RequestDeadline], expires_at: float,
+                      on_chunk: Optional[Callable[[str], None]] = None) -> str:
+        # Streaming lets us stop between chunks; closing the stream drops the
+        # connection, which makes Ollama abort the generation and free the slot
+        stream = self._client(route).chat(
+            model=route.model_name,
+            messages=messages,
+            options={
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "max_tokens": 500
+            },
+            keep_alive=self.keep_alive,
+            stream=True
+        )
+        
+        parts = []
+        try:
+            for chunk in stream:
+                parts.append(chunk['message']['content'])
+                if on_chunk is not None and parts[-1]:
+                    on_chunk(parts[-1])
+                
+                if chunk.get('done'):
+                    # Ollama reports load_duration in nanoseconds; a long one means
+                    # the model had been unloaded and this request paid to reload it
+                    load_seconds = chunk.get('load_duration', 0) / 1e9
+                    if route is self.router.primary and load_seconds > self.COLD_LOAD_SECONDS:
+                        self._record_model_load(load_seconds)
+                    break
+                
+                if deadline is not None and deadline.cancelled:
+                    raise GenerationCancelled(deadline.cancel_reason)
+                if time.monotonic() >= expires_at:
+                    raise DeadlineExceeded()
+        finally:
+            stream.close()
+        
+        return "".join(parts)
+    
+    def fallback_response(self, severity: SeverityLevel, emotion: EmotionCategory) -> str:
+        """Canned reply used when the model can't answer in time"""
+        reframes = self.interventions.interventions.get(emotion, {}).get('cognitive_reframes')
+        if severity == SeverityLevel.LOW and not reframes:
             return "I'm here to listen and support you. Could you tell me more about what you're experiencing?"
+        
+        response = self.crisis_detector.get_crisis_resources(severity)['message']
+        if reframes:
+            response += f" {random.choice(reframes)}"
+        return response
     
     def handle_crisis_response(self, severity: SeverityLevel, user_input: str) -> str:
         """Handle crisis situations with appropriate response"""
@@ -485,8 +1460,28 @@ Remember: You're a support tool, not a therapist. Always encourage professional
         else:
             return ""
     
-    def process_message(self, user_id: str, message: str) -> Dict[str, any]:
-        """Process user message and generate appropriate response"""
+    def assess_risk(self, message: str) -> str:
+        """Risk level of a message, without the rest of process_message"""
+        return self.crisis_detector.assess_risk_level(message)[0].value
+    
+    def process_message(self, user_id: str, message: str,
+                        deadline: Optional[RequestDeadline] = None,
+                        on_chunk: Optional[Callable[[str], None]] = None,
+                        session_id: Optional[str] = None,
+                        degraded: bool = False,
+                        history: Optional[deque] = None) -> Dict[str, any]:
+        """Process user message and generate appropriate response
+        
+        Model output is passed to on_chunk as it streams in; the returned
+        'response' is authoritative, since a fallback may replace it.
+        The prompt's context comes from history, the conversation's recent
+        exchanges, which this turn is appended to; callers that don't keep
+        one get a history per session (or per user without a session).
+        With degraded set (the model host is overloaded) a LOW message gets
+        a template reply without calling the model; admission control
+        always admits MODERATE and above.
+        Raises GenerationCancelled if the deadline is cancelled mid-generation.
+        """
         
         # Analyze risk level
         severity, crisis_keywords = self.crisis_detector.assess_risk_level(message)
@@ -495,15 +1490,23 @@ Remember: You're a support tool, not a therapist. Always encourage professional
         emotion, confidence = self.emotion_analyzer.analyze_emotion(message)
         
         # Get conversation context
-        context = self.conversation_manager.get_conversation_context()
+        if history is None:
+            history = self.conversation_manager.history_for(
+                session_id or self.conversation_manager.current_session_id or user_id
+            )
+        context = self.conversation_manager.get_conversation_context(history)
         
         # Generate response based on severity
         if severity in [SeverityLevel.CRITICAL, SeverityLevel.HIGH]:
             primary_response = self.handle_crisis_response(severity, message)
-            ai_response = self.generate_response(message, context)
+            ai_response = self.generate_response(message, context, severity, emotion, deadline, on_chunk)
             response = f"{primary_response}\n\n{ai_response}"
         else:
-            response = self.generate_response(message, context)
+            if degraded:
+                # The model host is overloaded; answer from the templates
+                response = self.fallback_response(severity, emotion)
+            else:
+                response = self.generate_response(message, context, severity, emotion, deadline, on_chunk)
             
             # Add intervention if appropriate
             if confidence > 0.6:
@@ -518,11 +1521,11 @@ Remember: You're a support tool, not a therapist. Always encourage professional
         # Save conversation
         self.conversation_manager.save_conversation(
             user_id, message, response, 
-            emotion.value, severity.value
+            emotion.value, severity.value, session_id
         )
         
         # Update conversation history
-        self.conversation_manager.conversation_history.append({
+        history.append({
             'user': message,
             'assistant': response,
             'emotion': emotion.value,
@@ -535,14 +1538,21 @@ Remember: You're a support tool, not a therapist. Always encourage professional
             'emotion_confidence': confidence,
             'risk_level': severity.value,
             'crisis_keywords': crisis_keywords,
-            'emotion_trend': self.emotion_analyzer.get_emotion_trend()
+            'emotion_trend': self.emotion_trends.record(user_id, emotion),
+            'degraded': degraded and severity not in [SeverityLevel.CRITICAL, SeverityLevel.HIGH]
         }
     
-    def start_session(self, user_id: str) -> str:
-        """Start a new chat session"""
-        self.conversation_manager.current_session_id = hashlib.md5(
-            f"{user_id}_{datetime.datetime.now().isoformat()}".encode()
-        ).hexdigest()
+    def start_session(self, user_id: str, session_id: Optional[str] = None) -> str:
+        """Start a new chat session
+        
+        Callers that track sessions themselves pass session_id (and then to
+        process_message too); otherwise, as in the CLI, one is made up and
+        becomes the current session.
+        """
+        if session_id is None:
+            self.conversation_manager.current_session_id = hashlib.md5(
+                f"{user_id}_{datetime.datetime.now().isoformat()}".encode()
+            ).hexdigest()
         
         welcome_message = """Hello! I'm here to provide emotional support and help you navigate whatever you're going through. 
         
@@ -614,7 +1624,7 @@ class ChatInterface:
         if analysis['emotion_trend']:
             print("\nEmotion Trend:")
             for emotion, count in analysis['emotion_trend'].items():
-                print(f"  • {emotion.value}: {count}")
+                print(f"  • {emotion.value}: {count:.2f}")
         print("-"*40 + "\n")
     
     def run(self):
@@ -695,9 +1705,11 @@ Mental Health Resources:
         except KeyboardInterrupt:
             print("\n\nSession interrupted. Take care!")
         except Exception as e:
-            logger.error(f"Error in chat interface: {e}")
+            logger.error("Error in chat interface: %s", e)
             print(f"\nAn error occurred: {e}")
             print("Please restart the application.")
+        finally:
+            self.chatbot.close()
 
 def main():
     """Main entry point"""
@@ -712,8 +1724,11 @@ def main():
 ╚══════════════════════════════════════════════════════╝
     """)
     
+    configure_logging()
+    
     # Check if Ollama is available
     try:
+        import ollama
         ollama.list()
         print("✓ Ollama connection successful")
     except Exception as e:
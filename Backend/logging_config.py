@@ -0,0 +1,105 @@
+"""
+Non-blocking logging for the Mental Health Support API and chatbot
+Request threads only enqueue records; a background listener formats them and
+does the console/file I/O
+"""
+
+import atexit
+import hashlib
+import logging
+import logging.handlers
+import queue
+import random
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Structured fields callers may pass via `extra=`; they are appended as key=value
+STRUCTURED_FIELDS = ("route", "user", "risk_level", "status_code", "duration_ms")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def hash_user_id(user_id: Optional[str]) -> Optional[str]:
+    """Short stable pseudonym so logs can correlate a user without naming them"""
+    if user_id is None:
+        return None
+    return hashlib.sha256(user_id.encode('utf-8')).hexdigest()[:12]
+
+
+class StructuredFormatter(logging.Formatter):
+    """Standard log line followed by any structured fields on the record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = [
+            f"{name}={getattr(record, name)}"
+            for name in STRUCTURED_FIELDS
+            if getattr(record, name, None) is not None
+        ]
+        return f"{line} | {' '.join(fields)}" if fields else line
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of INFO-and-below records marked `sampled`
+
+    High-volume call sites log with extra={"sampled": True}; warnings and
+    unmarked records always pass.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not getattr(record, "sampled", False):
+            return True
+        return random.random() < self.rate
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread
+
+    The stock handler renders the message before enqueueing, which puts the
+    formatting cost back on the request path. Records never leave the
+    process here, so the listener can render them itself.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level: int = logging.INFO, log_file: Optional[str] = None,
+                  sample_rate: float = 1.0) -> logging.handlers.QueueListener:
+    """Route all logging through a queue drained by a background listener"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = StructuredFormatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,28 +1,61 @@
 # main.py (Fully Corrected Version)
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from starlette.websockets import WebSocketState
 from pydantic import BaseModel, EmailStr, validator
 from typing import Dict, List, Optional, Union
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 import bcrypt
 import uuid
+from collections import deque
+from itertools import islice
+import json
+import asyncio
+import gc
 import logging
 import os
+import time
 from enum import Enum
+from admission import DEGRADE, SHED, AdmissionController
+from alerts import CrisisAlertBus, format_sse
+from chat_engine import get_chat_engine
+from chatbot import ConversationManager, GenerationCancelled, RequestDeadline, SeverityLevel
+from logging_config import hash_user_id, setup_logging
+from ratelimit import InMemoryRateLimiter, RateLimit, RedisRateLimiter, retry_after_header
+from sessions import ChatSession, SessionRegistry
+from mood_store import DAY_US, MoodStore
+# Threadpool work started through this run_in_threadpool shows up in request profiles
+from profiler import ProfilingMiddleware, SamplingProfiler, run_in_threadpool
+from records import BookingRecord, booking_key, from_epoch_us, to_epoch_us, user_refs
+from revocation import TokenDenylist
+from state_journal import StateJournal
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; records are written by a background listener thread.
+# LOG_SAMPLE_RATE thins out the per-request access lines.
+setup_logging(
+    log_file=os.getenv("LOG_FILE"),
+    sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+)
 logger = logging.getLogger(__name__)
 
 # Security settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Refresh tokens renew the access token without a password; each one is good
+# for a single use and REFRESH_TOKEN_EXPIRE_DAYS
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+# bcrypt work factor; pick one for this host with `python calibrate_bcrypt.py`
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
+# Same scheme for endpoints that also accept the token as a query parameter
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
 
 app = FastAPI(
     title="Mental Health Support API",
@@ -46,6 +79,78 @@ app.add_middleware(
 )
 
 
+class RequestTimingMiddleware:
+    '''Log method, path, status and duration of every HTTP request
+    
+    Plain ASGI rather than @app.middleware("http"): BaseHTTPMiddleware hides
+    client disconnects from endpoints, and /chat/message needs to see them.
+    '''
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status_code = 500
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            logger.info(
+                "%s %s", scope["method"], scope["path"],
+                extra={
+                    "route": scope["path"],
+                    "status_code": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    "sampled": True
+                }
+            )
+
+app.add_middleware(RequestTimingMiddleware)
+
+# Opt-in request profiling: a PROFILE_SAMPLE_RATE share of requests, plus
+# admin requests sent with an X-Profile header if PROFILE_ON_HEADER=1. Each
+# profile is written to PROFILE_DIR as collapsed stacks for flame graph tools.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_ON_HEADER = os.getenv("PROFILE_ON_HEADER", "0") == "1"
+request_profiler = SamplingProfiler(
+    os.getenv("PROFILE_DIR", "profiles"),
+    interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+    max_files=int(os.getenv("PROFILE_MAX_FILES", "200"))
+)
+
+def profile_authorized(headers: list) -> bool:
+    '''Only admins may ask for a profile by header'''
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            try:
+                return user_from_token(token).role == UserRole.ADMIN
+            except HTTPException:
+                return False
+    return False
+
+# Not installed at all unless enabled, so it costs nothing when off
+if PROFILE_SAMPLE_RATE > 0 or PROFILE_ON_HEADER:
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=request_profiler,
+        sample_rate=PROFILE_SAMPLE_RATE,
+        authorize=profile_authorized if PROFILE_ON_HEADER else None
+    )
+
 # Enums
 class UserRole(str, Enum):
     STUDENT = "student"
@@ -56,16 +161,76 @@ class UserStatus(str, Enum):
     INACTIVE = "inactive"
     SUSPENDED = "suspended"
 
-# Database schemas (in-memory for demo)
+class BookingStatus(str, Enum):
+    PENDING = "pending"
+    CONFIRMED = "confirmed"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+# Allowed booking status transitions (terminal states map to an empty set)
+BOOKING_TRANSITIONS = {
+    BookingStatus.PENDING: {BookingStatus.CONFIRMED, BookingStatus.CANCELLED},
+    BookingStatus.CONFIRMED: {BookingStatus.COMPLETED, BookingStatus.CANCELLED},
+    BookingStatus.COMPLETED: set(),
+    BookingStatus.CANCELLED: set(),
+}
+
+# Rate limits per route and role; unauthenticated routes use the "anonymous" role
+RATE_LIMITS = {
+    "chat": {
+        UserRole.STUDENT.value: RateLimit.per_minute(20, burst=5),
+        UserRole.ADMIN.value: RateLimit.per_minute(60, burst=10),
+    },
+    "login": {
+        "anonymous": RateLimit.per_minute(10, burst=5),
+    },
+    "refresh": {
+        "anonymous": RateLimit.per_minute(30, burst=10),
+    },
+}
+
+# Set RATE_LIMIT_REDIS_URL to share buckets between workers
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+rate_limiter = RedisRateLimiter(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else InMemoryRateLimiter()
+
+# Revoked token ids and token families (logouts, spent refresh tokens), kept
+# until those tokens expire; journalled with the rest of the state
+token_denylist = TokenDenylist()
+
+# Database schemas (in memory; users and bookings are journalled to STATE_DIR)
 users_db = {}
-sessions_db = {}
-bookings_db = []
-mood_entries_db = []
+# The same users by email, for logins and token lookups
+users_by_email = {}
+# Mood entries persist in a memory-mapped column store (one writer process)
+mood_log = MoodStore(os.getenv("MOOD_STORE_DIR", "mood_store"))
+
+# Booking indexes: key -> booking and status -> {key: booking}, keyed by the
+# UUID as an int. Dicts keep insertion order, so every listing is oldest first.
+bookings_by_id: Dict[int, BookingRecord] = {}
+bookings_by_status = {booking_status.value: {} for booking_status in BookingStatus}
+
+# Running user counts and the newest records for the admin dashboard, kept up
+# to date on insert so the dashboard never scans or sorts the collections
+RECENT_ACTIVITY_SIZE = 20
+user_counts = {"active": 0, UserRole.STUDENT.value: 0, UserRole.ADMIN.value: 0}
+recent_registrations = deque(maxlen=RECENT_ACTIVITY_SIZE)
+recent_bookings = deque(maxlen=RECENT_ACTIVITY_SIZE)
+
+# Data versions for conditional GETs: bumped on every write to a collection,
+# both overall and for the user the record belongs to. The epoch keeps ETags
+# from a previous process (whose in-memory data is gone) from matching.
+DATA_EPOCH = uuid.uuid4().hex[:8]
+data_versions: Dict[tuple, int] = {}
 
 # Pydantic models
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -129,37 +294,54 @@ class BookingRequest(BaseModel):
     time: str
     concerns: Optional[str] = None
 
+class BookingStatusUpdate(BaseModel):
+    status: BookingStatus
+    version: int
+
 class MoodEntry(BaseModel):
     mood: str
     note: Optional[str] = None
 
-# Simple mock chatbot for demo
-class SimpleChatbot:
-    def start_session(self, user_id):
-        return "Hello! I'm your mental health support assistant. I'm here to listen and help you with stress, anxiety, or any concerns you might have. What's on your mind today?"
-    
-    def process_message(self, user_id, message):
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ['stress', 'stressed', 'pressure']):
-            response = "I understand you're feeling stressed. Try taking deep breaths and breaking tasks into smaller steps. Would you like to try a quick relaxation exercise?"
-        elif any(word in message_lower for word in ['anxious', 'anxiety', 'worry', 'nervous']):
-            response = "Anxiety can be challenging. Remember that these feelings are temporary. Let's practice some grounding techniques together."
-        elif any(word in message_lower for word in ['sad', 'depressed', 'hopeless']):
-            response = "I hear that you're going through a tough time. It's okay to feel this way. Would you like to talk about what's been bothering you?"
-        else:
-            response = "Thank you for sharing. I'm here to listen and support you. Can you tell me more about how you're feeling?"
-        
-        return {
-            'response': response,
-            'emotion_detected': 'neutral',
-            'emotion_confidence': 0.7,
-            'risk_level': 'low',
-            'crisis_keywords': [],
-            'emotion_trend': {}
-        }
+# Chat engine (one shared instance per worker); CHAT_ENGINE is "simple" or "llm"
+CHAT_ENGINE = os.getenv("CHAT_ENGINE", "simple")
+chatbot = get_chat_engine(CHAT_ENGINE)
+
+# Overall budget for one /chat/message request, carried into the model call
+CHAT_REQUEST_TIMEOUT_SECONDS = float(os.getenv("CHAT_REQUEST_TIMEOUT_SECONDS", "30"))
+DISCONNECT_POLL_SECONDS = 0.25
 
-chatbot = SimpleChatbot()
+# Admission control: while the model host is overloaded, LOW-risk turns get a
+# template reply (CHAT_SHED_MODE=degrade) or a 503 (reject) instead of queueing
+chat_admission = AdmissionController(
+    max_in_flight=int(os.getenv("CHAT_MAX_IN_FLIGHT", "16")),
+    latency_target=float(os.getenv("CHAT_LATENCY_TARGET_SECONDS", "10")),
+    mode=os.getenv("CHAT_SHED_MODE", DEGRADE)
+)
+
+# Chat sockets: server ping interval, and how many turns may wait behind the current one
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "20"))
+WS_MAX_QUEUED_TURNS = 4
+
+# Read access to the stored chat transcripts
+conversation_manager = ConversationManager()
+
+# Live chat sessions: idle ones are ended by a background sweep, and every
+# ended session's summary is written to the chat_sessions table
+SESSION_SWEEP_SECONDS = 60
+SESSION_SWEEP_BATCH = 1000
+chat_sessions = SessionRegistry(
+    idle_timeout=float(os.getenv("CHAT_SESSION_IDLE_SECONDS", "1800")),
+    max_per_user=int(os.getenv("CHAT_SESSIONS_PER_USER", "5")),
+    max_sessions=int(os.getenv("CHAT_MAX_SESSIONS", "50000"))
+)
+
+# Crisis alerts pushed to counselors; ALERT_BUFFER_SIZE events are kept for replay
+ALERT_RISK_LEVELS = {"critical"}
+ALERT_HEARTBEAT_SECONDS = 15.0
+crisis_alerts = CrisisAlertBus(
+    buffer_size=int(os.getenv("ALERT_BUFFER_SIZE", "500")),
+    max_pending=int(os.getenv("ALERT_MAX_PENDING", "100"))
+)
 
 # Password hashing functions using bcrypt directly
 def hash_password(password: str) -> str:
@@ -173,13 +355,13 @@ def hash_password(password: str) -> str:
             raise ValueError("Password too long for bcrypt (max 72 bytes)")
         
         # Generate salt and hash password
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
         hashed_password = bcrypt.hashpw(password=pwd_bytes, salt=salt)
         
         # Return as string for storage
         return hashed_password.decode('utf-8')
     except Exception as e:
-        logger.error(f"Password hashing error: {e}")
+        logger.error("Password hashing error: %s", e)
         raise ValueError("Failed to hash password")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -192,25 +374,250 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         # Verify password
         return bcrypt.checkpw(password=password_bytes, hashed_password=hash_bytes)
     except Exception as e:
-        logger.error(f"Password verification error: {e}")
+        logger.error("Password verification error: %s", e)
         return False
 
+def bcrypt_cost(hashed_password: str) -> int:
+    '''Read the work factor from a "$2b$<cost>$..." hash'''
+    try:
+        return int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return -1
+
 # Utility functions
 def get_user_by_email(email: str):
-    for user in users_db.values():
-        if user.email == email:
-            return user
-    return None
+    return users_by_email.get(email)
 
 def get_user_by_id(user_id: str):
     return users_db.get(user_id)
 
+def bump_version(collection: str, user_id: Optional[str] = None):
+    data_versions[(collection,)] = data_versions.get((collection,), 0) + 1
+    if user_id is not None:
+        data_versions[(collection, user_id)] = data_versions.get((collection, user_id), 0) + 1
+
+def data_etag(*keys: tuple, window: Optional[str] = None) -> str:
+    '''ETag for a response built only from the given (collection[, user_id]) keys
+    
+    A response over a time window that moves with the clock also passes the
+    window's start, so the tag changes when the window does.
+    '''
+    versions = "-".join(str(data_versions.get(key, 0)) for key in keys)
+    scope = "-".join(key[1] for key in keys if len(key) > 1)
+    if window is not None:
+        versions = f"{versions}-{window}"
+    return f'"{DATA_EPOCH}-{scope}-{versions}"' if scope else f'"{DATA_EPOCH}-{versions}"'
+
+def conditional_get(request: Request, response: Response, etag: str) -> Optional[Response]:
+    '''Return a 304 if the client already has this version, else tag the response'''
+    # Browsers revalidate on every fetch; nothing is cached by shared proxies
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or
+                          etag in (tag.strip() for tag in if_none_match.split(","))):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def index_user(user: UserInDB):
+    users_db[user.user_id] = user
+    users_by_email[user.email] = user
+    user_counts[user.role.value] += 1
+    if user.status == UserStatus.ACTIVE:
+        user_counts["active"] += 1
+    if user.role == UserRole.STUDENT:
+        recent_registrations.append(user)
+    bump_version("users")
+
+def record_login(user: UserInDB):
+    user.last_login = datetime.utcnow()
+    bump_version("users")
+    state_journal.append("login", user.user_id, to_epoch_us(user.last_login), user.hashed_password)
+
+def user_ref(user: UserInDB) -> int:
+    '''Interned code that records store in place of the user's id and name'''
+    return user_refs.code((user.user_id, user.name))
+
+def index_booking(booking: BookingRecord):
+    recent_bookings.append(booking)
+    bookings_by_id[booking.key] = booking
+    bookings_by_status[booking.status][booking.key] = booking
+    bump_version("bookings", booking.user_id)
+
+def index_restored_bookings(rows: List[tuple], codes: List[int]):
+    '''index_booking for snapshot rows, with one version bump for the lot'''
+    for row in rows:
+        key, status_value = row[0], row[5]
+        if key in bookings_by_id:
+            continue
+        booking = BookingRecord.from_row(row, codes[row[1]])
+        recent_bookings.append(booking)
+        bookings_by_id[key] = booking
+        bookings_by_status[status_value][key] = booking
+    # Per-user versions start from zero; DATA_EPOCH already changed
+    bump_version("bookings")
+
+def set_booking_status(booking: BookingRecord, new_status: str, version: int, updated_at: int):
+    del bookings_by_status[booking.status][booking.key]
+    booking.status = new_status
+    booking.version = version
+    booking.updated_at = updated_at
+    bookings_by_status[new_status][booking.key] = booking
+    bump_version("bookings", booking.user_id)
+
+def transition_booking(booking_id: str, new_status: BookingStatus, expected_version: int) -> BookingRecord:
+    '''Move a booking to a new status if the caller saw the current version'''
+    key = booking_key(booking_id)
+    booking = bookings_by_id.get(key) if key is not None else None
+    if booking is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Booking not found"
+        )
+    
+    if booking.version != expected_version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Booking was modified (current version {booking.version})"
+        )
+    
+    current_status = BookingStatus(booking.status)
+    if new_status not in BOOKING_TRANSITIONS[current_status]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot change booking from {current_status.value} to {new_status.value}"
+        )
+    
+    set_booking_status(booking, new_status.value, booking.version + 1, to_epoch_us(datetime.utcnow()))
+    state_journal.append("booking_status", key, booking.status, booking.version, booking.updated_at)
+    return booking
+
+# Persistence: every mutation above is journalled as an operation that is
+# harmless to apply twice, and the journal snapshots the whole state every
+# JOURNAL_SNAPSHOT_EVERY operations. Startup loads the newest snapshot and
+# replays the journal after it.
+def user_row(user: UserInDB) -> tuple:
+    return (user.user_id, user.name, user.email, user.hashed_password, user.role.value,
+            user.age, user.student_id, user.status.value, to_epoch_us(user.created_at),
+            to_epoch_us(user.last_login) if user.last_login else None)
+
+def user_from_row(row: tuple) -> UserInDB:
+    (user_id, name, email, hashed_password, role, age, student_id,
+     user_status, created_at, last_login) = row
+    # Rows were validated when the user registered
+    return UserInDB.model_construct(
+        user_id=user_id,
+        name=name,
+        email=email,
+        hashed_password=hashed_password,
+        role=UserRole(role),
+        age=age,
+        student_id=student_id,
+        status=UserStatus(user_status),
+        created_at=from_epoch_us(created_at),
+        last_login=from_epoch_us(last_login) if last_login is not None else None
+    )
+
+def capture_state():
+    '''Grab the live records now; the journal thread encodes them later'''
+    users = list(users_db.values())
+    refs = user_refs.values()
+    bookings = list(bookings_by_id.values())
+    revoked = token_denylist.items()
+    return lambda: {
+        "users": [user_row(user) for user in users],
+        "user_refs": refs,
+        "bookings": [booking.to_row() for booking in bookings],
+        "revoked": revoked
+    }
+
+def apply_operation(kind: str, *args):
+    '''Redo one journalled mutation'''
+    if kind == "user":
+        row, = args
+        if row[0] not in users_db:
+            index_user(user_from_row(row))
+    elif kind == "login":
+        user_id, last_login, hashed_password = args
+        user = users_db.get(user_id)
+        if user is not None:
+            user.last_login = from_epoch_us(last_login)
+            user.hashed_password = hashed_password
+    elif kind == "booking":
+        ref, row = args
+        if row[0] not in bookings_by_id:
+            index_booking(BookingRecord.from_row(row, user_refs.code(ref)))
+    elif kind == "booking_status":
+        key, new_status, version, updated_at = args
+        booking = bookings_by_id.get(key)
+        if booking is not None:
+            set_booking_status(booking, new_status, version, updated_at)
+    elif kind == "revoke":
+        key, expires_at = args
+        token_denylist.revoke(key, expires_at)
+    else:
+        logger.warning("Skipping unknown journal operation %r", kind)
+
+def restore_state():
+    '''Load the newest snapshot, replay the journal tail, then start journalling'''
+    start = time.perf_counter()
+    # A million new objects would set off the cyclic GC over and over, and
+    # none of them are garbage
+    gc.disable()
+    try:
+        state, operations = state_journal.load()
+        if state is not None:
+            # Bookings in the snapshot hold codes into its own list of refs
+            codes = [user_refs.code(ref) for ref in state["user_refs"]]
+            for row in state["users"]:
+                if row[0] not in users_db:
+                    index_user(user_from_row(row))
+            index_restored_bookings(state["bookings"], codes)
+            for key, expires_at in state.get("revoked", ()):
+                token_denylist.revoke(key, expires_at)
+            del state
+        replayed = 0
+        for operation in operations:
+            apply_operation(*operation)
+            replayed += 1
+    finally:
+        gc.enable()
+    # Later collections needn't keep scanning the restored records
+    gc.freeze()
+    state_journal.start()
+    logger.info("Restored %d users and %d bookings (%d journal operations) in %.2f s",
+                len(users_db), len(bookings_by_id), replayed, time.perf_counter() - start)
+    # Spare the next restart from replaying a long tail again
+    if replayed >= state_journal.snapshot_every:
+        state_journal.snapshot()
+
+state_journal = StateJournal(
+    os.getenv("STATE_DIR", "state"),
+    capture=capture_state,
+    snapshot_every=int(os.getenv("JOURNAL_SNAPSHOT_EVERY", "100000")),
+    fsync=os.getenv("JOURNAL_FSYNC", "1") == "1"
+)
+
 def authenticate_user(email: str, password: str):
+    '''Check a password, rehashing it if the work factor changed
+    
+    bcrypt takes tens of milliseconds at the default cost, so async routes
+    run this through run_in_threadpool.
+    '''
     user = get_user_by_email(email)
     if not user:
         return False
     if not verify_password(password, user.hashed_password):
         return False
+    
+    # Upgrade (or downgrade) the stored hash to the configured work factor
+    if bcrypt_cost(user.hashed_password) != BCRYPT_ROUNDS:
+        try:
+            user.hashed_password = hash_password(password)
+            logger.info("Rehashed password at cost %d", BCRYPT_ROUNDS,
+                        extra={"user": hash_user_id(user.user_id)})
+        except ValueError:
+            pass
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -223,24 +630,63 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def issue_tokens(user: UserInDB, family: Optional[str] = None) -> Dict:
+    '''A fresh access and refresh token pair
+    
+    A password login starts a new token family; refreshing continues the
+    family, so logging out (or a replayed refresh token) can end every
+    token descended from that login at once.
+    '''
+    family = family or uuid.uuid4().hex
+    access_token = create_access_token(
+        data={"sub": user.email, "jti": uuid.uuid4().hex, "fam": family},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_access_token(
+        data={"sub": user.email, "jti": uuid.uuid4().hex, "fam": family, "type": "refresh"},
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
+def revoke_token(key: str, expires_at: float) -> bool:
+    '''Deny a token id or family until expires_at; False if it already was'''
+    if not token_denylist.revoke(key, expires_at):
+        return False
+    state_journal.append("revoke", key, expires_at)
+    return True
+
+def revoke_token_family(family: str):
+    '''Revoke every token from one login; none outlives its newest refresh token'''
+    revoke_token(family, time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+
+def credentials_error() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def token_claims(token: str, token_type: str = "access") -> Dict:
+    '''Verify a token's signature, expiry, type and family, or raise 401'''
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
     except JWTError:
-        raise credentials_exception
-    
-    user = get_user_by_email(username)
+        raise credentials_error()
+    # Tokens issued before refresh tokens existed have no type, id or family
+    if (payload.get("sub") is None or payload.get("type", "access") != token_type
+            or token_denylist.is_revoked(payload.get("fam"))):
+        raise credentials_error()
+    return payload
+
+def user_from_claims(payload: Dict) -> UserInDB:
+    user = get_user_by_email(payload["sub"])
     if user is None:
-        raise credentials_exception
+        raise credentials_error()
     
     if user.status != UserStatus.ACTIVE:
         raise HTTPException(
@@ -250,11 +696,38 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     
     return user
 
+def user_from_token(token: str) -> UserInDB:
+    '''Resolve a bearer token to an active user, or raise 401'''
+    payload = token_claims(token)
+    if token_denylist.is_revoked(payload.get("jti")):
+        raise credentials_error()
+    return user_from_claims(payload)
+
+def refresh_tokens(refresh_token: str) -> Dict:
+    '''Trade a refresh token for a new token pair; the old one is spent
+    
+    A refresh token used twice means two parties hold it, so the whole
+    family is revoked and both have to log in again.
+    '''
+    payload = token_claims(refresh_token, "refresh")
+    user = user_from_claims(payload)
+    if not revoke_token(payload["jti"], payload["exp"]):
+        revoke_token_family(payload["fam"])
+        logger.warning("Refresh token reused; revoked its token family",
+                       extra={"user": hash_user_id(user.user_id)})
+        raise credentials_error()
+    return issue_tokens(user, payload["fam"])
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    return user_from_token(token)
+
 async def get_current_active_user(current_user: UserInDB = Depends(get_current_user)):
     return current_user
 
+# Auth dependencies are async so they run on the request's own task, not a
+# threadpool hop (which also keeps them inside its profile)
 def require_role(allowed_roles: List[UserRole]):
-    def role_checker(current_user: UserInDB = Depends(get_current_active_user)):
+    async def role_checker(current_user: UserInDB = Depends(get_current_active_user)):
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -263,51 +736,135 @@ def require_role(allowed_roles: List[UserRole]):
         return current_user
     return role_checker
 
+async def enforce_rate_limit(route: str, role: str, client_key: str):
+    limit = RATE_LIMITS.get(route, {}).get(role)
+    if limit is None:
+        return
+    
+    allowed, retry_after = await rate_limiter.hit(f"{route}:{client_key}", limit)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please slow down",
+            headers={"Retry-After": retry_after_header(retry_after)}
+        )
+
+def rate_limited(route: str):
+    async def limiter(current_user: UserInDB = Depends(get_current_active_user)):
+        await enforce_rate_limit(route, current_user.role.value, current_user.user_id)
+        return current_user
+    return limiter
+
+def client_address(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
 # Demo users initialization
-def init_demo_users():
-    if not users_db:  # Only initialize if empty
-        demo_users = [
-            {
-                "name": "Demo Student",
-                "email": "student@demo.com",
-                "password": "123456",
-                "role": UserRole.STUDENT,
-                "age": 21,
-                "student_id": "STU12345"
-            },
-            {
-                "name": "Demo Admin",
-                "email": "admin@demo.com",
-                "password": "123456",
-                "role": UserRole.ADMIN,
-                "age": 30,
-                "student_id": None
-            }
-        ]
-        
-        for user_data in demo_users:
-            try:
-                user_id = str(uuid.uuid4())
-                user = UserInDB(
-                    user_id=user_id,
-                    name=user_data["name"],
-                    email=user_data["email"],
-                    hashed_password=hash_password(user_data["password"]),
-                    role=user_data["role"],
-                    age=user_data["age"],
-                    student_id=user_data["student_id"],
-                    status=UserStatus.ACTIVE,
-                    created_at=datetime.utcnow()
-                )
-                users_db[user_id] = user
-                logger.info(f"Demo user created: {user_data['email']}")
-            except Exception as e:
-                logger.error(f"Failed to create demo user {user_data['email']}: {e}")
+DEMO_USERS = [
+    {
+        "name": "Demo Student",
+        "email": "student@demo.com",
+        "password": "123456",
+        "role": UserRole.STUDENT,
+        "age": 21,
+        "student_id": "STU12345"
+    },
+    {
+        "name": "Demo Admin",
+        "email": "admin@demo.com",
+        "password": "123456",
+        "role": UserRole.ADMIN,
+        "age": 30,
+        "student_id": None
+    }
+]
+
+def build_demo_user(user_data: dict) -> Optional[UserInDB]:
+    try:
+        return UserInDB(
+            user_id=str(uuid.uuid4()),
+            name=user_data["name"],
+            email=user_data["email"],
+            hashed_password=hash_password(user_data["password"]),
+            role=user_data["role"],
+            age=user_data["age"],
+            student_id=user_data["student_id"],
+            status=UserStatus.ACTIVE,
+            created_at=datetime.utcnow()
+        )
+    except Exception as e:
+        logger.error("Failed to create demo user %s: %s", user_data['email'], e)
+        return None
+
+async def init_demo_users():
+    if users_db:  # Only initialize if empty
+        return
+    
+    # bcrypt releases the GIL, so the demo hashes run in parallel worker
+    # threads; users_db itself is only touched back on the event loop
+    loop = asyncio.get_running_loop()
+    demo_users = await asyncio.gather(*(
+        loop.run_in_executor(None, build_demo_user, user_data) for user_data in DEMO_USERS
+    ))
+    
+    for user in demo_users:
+        if user is not None and get_user_by_email(user.email) is None:
+            index_user(user)
+            state_journal.append("user", user_row(user))
+            logger.info("Demo user created: %s", user.email)
+
+# How often to retry loading the chat model while it is not resident
+MODEL_RETRY_SECONDS = 5
+
+async def keep_model_warm():
+    # Load the model in the background and reload it whenever a generation
+    # fails, so /ready only passes while the model is resident
+    while True:
+        if not chatbot.model_status()['ready']:
+            await run_in_threadpool(chatbot.load_model)
+        await asyncio.sleep(MODEL_RETRY_SECONDS)
+
+async def save_session_summaries():
+    summaries = chat_sessions.drain_ended()
+    if not summaries:
+        return
+    try:
+        await run_in_threadpool(conversation_manager.save_session_summaries, summaries)
+    except Exception:
+        logger.exception("Failed to save %d chat session summaries", len(summaries))
+
+async def sweep_chat_sessions():
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_SECONDS)
+        # In batches, so a mass timeout doesn't stall the event loop
+        swept = 0
+        while True:
+            batch = chat_sessions.sweep(limit=SESSION_SWEEP_BATCH)
+            swept += batch
+            if batch < SESSION_SWEEP_BATCH:
+                break
+            await asyncio.sleep(0)
+        if swept:
+            logger.info("Ended %d idle chat sessions", swept)
+        await save_session_summaries()
 
 # Routes
 @app.on_event("startup")
 async def startup_event():
-    init_demo_users()
+    restore_state()
+    # Don't hold up readiness on bcrypt; demo logins work once this finishes
+    app.state.demo_users_ready = asyncio.create_task(init_demo_users())
+    app.state.model_warmer = asyncio.create_task(keep_model_warm())
+    app.state.session_sweeper = asyncio.create_task(sweep_chat_sessions())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.model_warmer.cancel()
+    app.state.session_sweeper.cancel()
+    chat_sessions.end_all("shutdown")
+    await save_session_summaries()
+    chatbot.close()
+    mood_log.flush()
+    state_journal.close()
 
 @app.post("/auth/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate):
@@ -333,23 +890,25 @@ async def register(user_data: UserCreate):
             created_at=datetime.utcnow()
         )
         
-        users_db[user_id] = user
-        logger.info(f"New user registered: {user_data.email}")
+        index_user(user)
+        state_journal.append("user", user_row(user))
+        logger.info("New user registered", extra={"user": hash_user_id(user_id)})
         
         return UserResponse(**user.dict())
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Registration error: {e}")
+        logger.error("Registration error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
 @app.post("/auth/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    await enforce_rate_limit("login", "anonymous", client_address(request))
+    user = await run_in_threadpool(authenticate_user, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -357,77 +916,419 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    
-    # Update last login
-    user.last_login = datetime.utcnow()
+    record_login(user)
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return issue_tokens(user)
 
 @app.post("/auth/login", response_model=Token)
-async def login(login_data: UserLogin):
-    user = authenticate_user(login_data.email, login_data.password)
+async def login(request: Request, login_data: UserLogin):
+    await enforce_rate_limit("login", "anonymous", client_address(request))
+    user = await run_in_threadpool(authenticate_user, login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    
-    # Update last login
-    user.last_login = datetime.utcnow()
+    record_login(user)
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return issue_tokens(user)
+
+@app.post("/auth/refresh", response_model=Token)
+async def refresh_access_token(request: Request, refresh_data: RefreshRequest):
+    '''Renew a session without the password (and without bcrypt)'''
+    await enforce_rate_limit("refresh", "anonymous", client_address(request))
+    return refresh_tokens(refresh_data.refresh_token)
 
 @app.get("/auth/me", response_model=UserResponse)
 async def read_users_me(current_user: UserInDB = Depends(get_current_active_user)):
     return UserResponse(**current_user.dict())
 
 @app.post("/auth/logout")
-async def logout(current_user: UserInDB = Depends(get_current_active_user)):
+async def logout(
+    logout_data: Optional[RefreshRequest] = None,
+    token: Optional[str] = Depends(optional_oauth2_scheme)
+):
+    '''End this login's access and refresh tokens; other devices stay signed in
+    
+    The refresh token identifies the login even after its access token has
+    expired, so clients send it when they have it; a bearer access token
+    alone also works.
+    '''
+    if logout_data is not None:
+        payload = token_claims(logout_data.refresh_token, "refresh")
+    elif token:
+        payload = token_claims(token)
+    else:
+        raise credentials_error()
+    
+    if payload.get("fam"):
+        revoke_token_family(payload["fam"])
+    elif payload.get("jti"):
+        revoke_token(payload["jti"], payload["exp"])
     return {"message": "Successfully logged out"}
 
 # Chat endpoints
 @app.post("/chat/start")
 async def start_chat(current_user: UserInDB = Depends(get_current_active_user)):
     try:
-        welcome_message = chatbot.start_session(current_user.user_id)
-        session_id = str(uuid.uuid4())
+        session = chat_sessions.create(current_user.user_id)
+        welcome_message = await run_in_threadpool(
+            chatbot.start_session, current_user.user_id, session.session_id
+        )
         
         return {
             "success": True,
             "message": welcome_message,
-            "session_id": session_id
+            "session_id": session.session_id,
+            "idle_timeout_seconds": chat_sessions.idle_timeout
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to start chat")
 
+@app.get("/chat/sessions")
+async def list_chat_sessions(current_user: UserInDB = Depends(get_current_active_user)):
+    sessions = chat_sessions.user_sessions(current_user.user_id)
+    return {"success": True, "sessions": [session.summary() for session in sessions]}
+
+@app.post("/chat/sessions/{session_id}/resume")
+async def resume_chat_session(
+    session_id: str,
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    session = chat_sessions.resume(current_user.user_id, session_id)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session has ended"
+        )
+    return {"success": True, "session": session.summary()}
+
+@app.post("/chat/sessions/{session_id}/end")
+async def end_chat_session(
+    session_id: str,
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    summary = chat_sessions.end(current_user.user_id, session_id)
+    if summary is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session has ended"
+        )
+    await save_session_summaries()
+    message = await run_in_threadpool(chatbot.end_session, current_user.user_id)
+    return {"success": True, "message": message, "session": summary}
+
+async def run_until_disconnect(request: Request, deadline: RequestDeadline, func, *args):
+    '''Run a blocking call in the threadpool, cancelling its deadline if the client goes away'''
+    task = asyncio.ensure_future(run_in_threadpool(func, *args))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if not deadline.cancelled and await request.is_disconnected():
+            deadline.cancel("client_disconnected")
+
+def admit_chat_turn(message: str) -> bool:
+    '''Admission decision for one chat turn; True means answer from the templates
+    
+    Raises a 503 when the turn is shed.
+    '''
+    decision = chat_admission.admit(chatbot.assess_risk(message))
+    if decision == SHED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The chat service is busy, please try again shortly",
+            headers={"Retry-After": retry_after_header(chat_admission.retry_after())}
+        )
+    return decision == DEGRADE
+
+async def run_admitted(degraded: bool, generation) -> Dict:
+    '''Await a process_message call, holding its admission slot unless degraded'''
+    if degraded:
+        return await generation
+    start = time.perf_counter()
+    elapsed = None
+    try:
+        result = await generation
+        elapsed = time.perf_counter() - start
+        return result
+    finally:
+        chat_admission.release(elapsed)
+
+def publish_crisis_alert(user: UserInDB, session_id: str, result: Dict):
+    crisis_alerts.publish("crisis", {
+        "user_id": user.user_id,
+        "name": user.name,
+        "email": user.email,
+        "session_id": session_id,
+        "risk_level": result['risk_level'],
+        "crisis_keywords": result.get('crisis_keywords', [])
+    })
+
+def chat_reply(user: UserInDB, session: ChatSession, result: Dict, route: str, start: float) -> Dict:
+    '''Log a finished chat turn, raise a crisis alert if needed, and build the reply'''
+    chat_sessions.record_turn(session, result['emotion_detected'], result['risk_level'])
+    # Elevated-risk turns are always logged; routine ones are sampled
+    logger.info(
+        "Chat message processed",
+        extra={
+            "route": route,
+            "user": hash_user_id(user.user_id),
+            "risk_level": result['risk_level'],
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            "sampled": result['risk_level'] == 'low'
+        }
+    )
+    
+    if result['risk_level'] in ALERT_RISK_LEVELS:
+        publish_crisis_alert(user, session.session_id, result)
+    
+    return {
+        "success": True,
+        "response": result['response'],
+        "session_id": session.session_id,
+        "emotion_detected": result['emotion_detected'],
+        "emotion_confidence": result['emotion_confidence'],
+        "risk_level": result['risk_level'],
+        "degraded": result.get('degraded', False)
+    }
+
 @app.post("/chat/message")
 async def send_message(
+    request: Request,
     chat_data: ChatMessage,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: UserInDB = Depends(rate_limited("chat"))
 ):
+    degraded = admit_chat_turn(chat_data.message)
     try:
-        result = chatbot.process_message(current_user.user_id, chat_data.message)
-        
-        return {
-            "success": True,
-            "response": result['response'],
-            "session_id": chat_data.session_id or str(uuid.uuid4()),
-            "emotion_detected": result['emotion_detected'],
-            "emotion_confidence": result['emotion_confidence'],
-            "risk_level": result['risk_level']
-        }
+        start = time.perf_counter()
+        # An ended or unknown session is replaced; the reply carries the new id
+        session = chat_sessions.resume_or_create(current_user.user_id, chat_data.session_id)
+        deadline = RequestDeadline(CHAT_REQUEST_TIMEOUT_SECONDS)
+        result = await run_admitted(degraded, run_until_disconnect(
+            request, deadline, chatbot.process_message,
+            current_user.user_id, chat_data.message, deadline, None, session.session_id, degraded,
+            session.history
+        ))
+        return chat_reply(current_user, session, result, "/chat/message", start)
+    except GenerationCancelled:
+        # Nobody is listening any more; 499 is the conventional "client closed request"
+        return Response(status_code=499)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to process message")
 
+class ChatConnection:
+    '''One authenticated chat WebSocket
+    
+    Every outgoing frame (replies, streamed chunks, heartbeats, pushed
+    notifications) goes through the outbox and a single sender task, so
+    writers never interleave on the socket.
+    '''
+    
+    def __init__(self, websocket: WebSocket, user: UserInDB, expires_at: float,
+                 session: ChatSession):
+        self.websocket = websocket
+        self.user = user
+        self.expires_at = expires_at
+        self.session_id = session.session_id
+        self.outbox: "asyncio.Queue[Dict]" = asyncio.Queue()
+        self.last_seen = time.monotonic()
+        self.deadline: Optional[RequestDeadline] = None
+    
+    def send(self, payload: Dict):
+        '''Queue a frame; must be called on the event loop'''
+        self.outbox.put_nowait(payload)
+    
+    async def sender(self):
+        while True:
+            await self.websocket.send_text(json.dumps(await self.outbox.get()))
+    
+    async def heartbeat(self):
+        '''Ping the client and give up on it once it has been silent too long'''
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_SECONDS)
+            if time.monotonic() - self.last_seen > WS_HEARTBEAT_SECONDS * 2.5:
+                return
+            self.send({"type": "ping"})
+    
+    async def run_turns(self, turns: "asyncio.Queue[Dict]"):
+        '''Answer chat messages one at a time, in the order they arrived'''
+        while True:
+            frame = await turns.get()
+            await self.run_turn(frame)
+    
+    async def run_turn(self, frame: Dict):
+        turn = frame.get("turn")
+        try:
+            chat_data = ChatMessage(message=frame.get("message"), session_id=frame.get("session_id"))
+        except ValueError:
+            self.send({"type": "error", "turn": turn, "status": 422, "detail": "message must be a string"})
+            return
+        
+        try:
+            await enforce_rate_limit("chat", self.user.role.value, self.user.user_id)
+            degraded = admit_chat_turn(chat_data.message)
+        except HTTPException as e:
+            self.send({"type": "error", "turn": turn, "status": e.status_code, "detail": e.detail,
+                       "retry_after": int(e.headers["Retry-After"])})
+            return
+        
+        start = time.perf_counter()
+        session = chat_sessions.resume_or_create(self.user.user_id, chat_data.session_id or self.session_id)
+        self.session_id = session.session_id
+        loop = asyncio.get_running_loop()
+        self.deadline = RequestDeadline(CHAT_REQUEST_TIMEOUT_SECONDS)
+        
+        def on_chunk(content: str):
+            # Called on the worker thread as the model streams
+            loop.call_soon_threadsafe(self.send, {"type": "chunk", "turn": turn, "content": content})
+        
+        try:
+            result = await run_admitted(degraded, run_in_threadpool(
+                chatbot.process_message, self.user.user_id, chat_data.message, self.deadline,
+                on_chunk, session.session_id, degraded, session.history
+            ))
+        except GenerationCancelled:
+            return
+        except Exception:
+            logger.exception("WebSocket chat turn failed")
+            self.send({"type": "error", "turn": turn, "status": 500, "detail": "Failed to process message"})
+            return
+        finally:
+            self.deadline = None
+        
+        reply = chat_reply(self.user, session, result, "/chat/ws", start)
+        self.send({"type": "reply", "turn": turn, **reply})
+
+# Open chat sockets by user id, for server-initiated messages
+chat_connections: Dict[str, set] = {}
+
+def notify_user(user_id: str, payload: Dict) -> int:
+    '''Push a frame to every chat socket the user has open; returns how many'''
+    connections = chat_connections.get(user_id, ())
+    for connection in connections:
+        connection.send(payload)
+    return len(connections)
+
+@app.websocket("/chat/ws")
+async def chat_socket(websocket: WebSocket, token: Optional[str] = None,
+                      session_id: Optional[str] = None):
+    '''Multi-turn chat over one socket, authenticated once when it opens
+    
+    Browsers can't set headers on a WebSocket, so the token may also be
+    passed as ?token=. ?session_id= resumes a live session. The connection
+    closes when the token expires; the session lives on until it idles out.
+    '''
+    authorization = websocket.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    try:
+        current_user = user_from_token(token or "")
+        expires_at = float(jwt.get_unverified_claims(token)["exp"])
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    session = chat_sessions.resume_or_create(current_user.user_id, session_id)
+    connection = ChatConnection(websocket, current_user, expires_at, session)
+    chat_connections.setdefault(current_user.user_id, set()).add(connection)
+    connection.send({
+        "type": "ready",
+        "user_id": current_user.user_id,
+        "session_id": connection.session_id,
+        "heartbeat_seconds": WS_HEARTBEAT_SECONDS
+    })
+    
+    turns: "asyncio.Queue[Dict]" = asyncio.Queue(maxsize=WS_MAX_QUEUED_TURNS)
+    background = [
+        asyncio.create_task(connection.sender()),
+        asyncio.create_task(connection.heartbeat()),
+        asyncio.create_task(connection.run_turns(turns))
+    ]
+    receiver = asyncio.create_task(websocket.receive_text())
+    close_code, close_reason = status.WS_1000_NORMAL_CLOSURE, None
+    try:
+        while True:
+            done, _ = await asyncio.wait({receiver, *background}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver not in done:
+                # The heartbeat gave up or the sender hit a dead socket
+                break
+            
+            raw = receiver.result()
+            receiver = asyncio.create_task(websocket.receive_text())
+            connection.last_seen = time.monotonic()
+            if time.time() >= connection.expires_at:
+                close_code, close_reason = status.WS_1008_POLICY_VIOLATION, "Token expired"
+                break
+            
+            try:
+                frame = json.loads(raw)
+            except ValueError:
+                frame = None
+            if not isinstance(frame, dict):
+                connection.send({"type": "error", "status": 400, "detail": "Frames must be JSON objects"})
+                continue
+            
+            if frame.get("type") == "ping":
+                connection.send({"type": "pong"})
+            elif frame.get("type") == "message":
+                try:
+                    turns.put_nowait(frame)
+                except asyncio.QueueFull:
+                    connection.send({"type": "error", "turn": frame.get("turn"), "status": 429,
+                                     "detail": "Too many messages waiting for a reply"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if connection.deadline is not None:
+            connection.deadline.cancel("client_disconnected")
+        for task in (receiver, *background):
+            task.cancel()
+        await asyncio.gather(receiver, *background, return_exceptions=True)
+        chat_connections[current_user.user_id].discard(connection)
+        if not chat_connections[current_user.user_id]:
+            del chat_connections[current_user.user_id]
+        if websocket.client_state == WebSocketState.CONNECTED:
+            try:
+                await websocket.close(code=close_code, reason=close_reason)
+            except RuntimeError:
+                # The client's close frame is already on its way
+                pass
+
+@app.get("/chat/history")
+async def get_chat_history(
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    page_size: int = Query(200, ge=1, le=1000),
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    # Students may only read their own transcripts; admins may read anyone's
+    if current_user.role != UserRole.ADMIN:
+        if user_id is not None and user_id != current_user.user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        user_id = current_user.user_id
+    elif user_id is None and session_id is None:
+        user_id = current_user.user_id
+    
+    pages = conversation_manager.iter_history(
+        user_id=user_id, session_id=session_id,
+        since=since, until=until, page_size=page_size
+    )
+    
+    def stream_transcript():
+        # One JSON object per line, read from the cursor a page at a time
+        for page in pages:
+            yield "".join(json.dumps(row) + "\n" for row in page)
+    
+    return StreamingResponse(stream_transcript(), media_type="application/x-ndjson")
+
 # Booking endpoints (student only)
 @app.post("/bookings/create")
 async def create_booking(
@@ -435,31 +1336,67 @@ async def create_booking(
     current_user: UserInDB = Depends(require_role([UserRole.STUDENT]))
 ):
     try:
-        booking_id = str(uuid.uuid4())
-        booking_data = {
-            "id": booking_id,
-            "user_id": current_user.user_id,
-            "user_name": current_user.name,
-            "date": booking.date,
-            "time": booking.time,
-            "concerns": booking.concerns,
-            "status": "pending",
-            "created_at": datetime.utcnow().isoformat()
-        }
+        record = BookingRecord(
+            user=user_ref(current_user),
+            date=booking.date,
+            time=booking.time,
+            concerns=booking.concerns,
+            status=BookingStatus.PENDING.value,
+            created_at=to_epoch_us(datetime.utcnow())
+        )
         
-        bookings_db.append(booking_data)
-        return {"success": True, "booking_id": booking_id}
+        index_booking(record)
+        state_journal.append("booking", user_refs.value(record.user), record.to_row())
+        return {"success": True, "booking_id": record.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to create booking")
 
 @app.get("/bookings/my")
-async def get_my_bookings(current_user: UserInDB = Depends(get_current_active_user)):
-    user_bookings = [b for b in bookings_db if b['user_id'] == current_user.user_id]
+async def get_my_bookings(
+    request: Request,
+    response: Response,
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    not_modified = conditional_get(request, response, data_etag(("bookings", current_user.user_id)))
+    if not_modified:
+        return not_modified
+    
+    ref = user_ref(current_user)
+    user_bookings = [b.to_dict() for b in bookings_by_id.values() if b.user == ref]
     return {"success": True, "bookings": user_bookings}
 
 @app.get("/bookings/all")
-async def get_all_bookings(current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))):
-    return {"success": True, "bookings": bookings_db}
+async def get_all_bookings(
+    request: Request,
+    response: Response,
+    current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))
+):
+    not_modified = conditional_get(request, response, data_etag(("bookings",)))
+    if not_modified:
+        return not_modified
+    
+    return {"success": True, "bookings": [b.to_dict() for b in bookings_by_id.values()]}
+
+@app.get("/bookings/status/{booking_status}")
+async def get_bookings_by_status(
+    booking_status: BookingStatus,
+    current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))
+):
+    bookings = [b.to_dict() for b in bookings_by_status[booking_status.value].values()]
+    return {"success": True, "status": booking_status.value, "bookings": bookings}
+
+@app.patch("/bookings/{booking_id}/status")
+async def update_booking_status(
+    booking_id: str,
+    update: BookingStatusUpdate,
+    current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))
+):
+    record = transition_booking(booking_id, update.status, update.version)
+    logger.info("Booking %s moved to %s", booking_id, record.status,
+                extra={"user": hash_user_id(current_user.user_id)})
+    booking = record.to_dict()
+    notify_user(record.user_id, {"type": "booking_status", "booking": booking})
+    return {"success": True, "booking": booking}
 
 # Mood endpoints (student only)
 @app.post("/mood/entry")
@@ -468,46 +1405,194 @@ async def add_mood_entry(
     current_user: UserInDB = Depends(require_role([UserRole.STUDENT]))
 ):
     try:
-        entry_id = str(uuid.uuid4())
-        entry = {
-            "id": entry_id,
-            "user_id": current_user.user_id,
-            "user_name": current_user.name,
-            "mood": mood_data.mood,
-            "note": mood_data.note,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        
-        mood_entries_db.append(entry)
+        entry_id = mood_log.append(
+            current_user.user_id, current_user.name, mood_data.mood, mood_data.note,
+            to_epoch_us(datetime.utcnow())
+        )
+        bump_version("mood", current_user.user_id)
         return {"success": True, "entry_id": entry_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to add mood entry")
 
+def query_epoch_us(moment: Optional[datetime]) -> Optional[int]:
+    '''Query-string datetime (naive means UTC) as epoch microseconds'''
+    if moment is None:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return to_epoch_us(moment)
+
 @app.get("/mood/history")
-async def get_mood_history(current_user: UserInDB = Depends(get_current_active_user)):
-    user_entries = [m for m in mood_entries_db if m['user_id'] == current_user.user_id]
+async def get_mood_history(
+    request: Request,
+    response: Response,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    not_modified = conditional_get(request, response, data_etag(("mood", current_user.user_id)))
+    if not_modified:
+        return not_modified
+    
+    user_entries = mood_log.history(
+        current_user.user_id, current_user.name,
+        since=query_epoch_us(since), until=query_epoch_us(until)
+    )
     return {"success": True, "entries": user_entries}
 
 # Admin endpoints
-@app.get("/admin/stats")
-async def get_admin_stats(current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))):
-    stats = {
+def admin_stats() -> Dict:
+    return {
         "total_users": len(users_db),
-        "active_users": len([u for u in users_db.values() if u.status == UserStatus.ACTIVE]),
-        "student_users": len([u for u in users_db.values() if u.role == UserRole.STUDENT]),
-        "admin_users": len([u for u in users_db.values() if u.role == UserRole.ADMIN]),
-        "total_bookings": len(bookings_db),
-        "total_mood_entries": len(mood_entries_db),
-        "pending_bookings": len([b for b in bookings_db if b['status'] == 'pending'])
+        "active_users": user_counts["active"],
+        "student_users": user_counts[UserRole.STUDENT.value],
+        "admin_users": user_counts[UserRole.ADMIN.value],
+        "total_bookings": len(bookings_by_id),
+        "total_mood_entries": len(mood_log),
+        "pending_bookings": len(bookings_by_status[BookingStatus.PENDING.value]),
+        "booking_status_counts": {
+            booking_status: len(bucket) for booking_status, bucket in bookings_by_status.items()
+        }
     }
+
+@app.get("/admin/stats")
+async def get_admin_stats(
+    request: Request,
+    response: Response,
+    current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))
+):
+    not_modified = conditional_get(request, response, data_etag(("users",), ("bookings",), ("mood",)))
+    if not_modified:
+        return not_modified
     
-    return {"success": True, "stats": stats}
+    return {"success": True, "stats": admin_stats()}
+
+@app.get("/admin/dashboard")
+async def get_admin_dashboard(
+    request: Request,
+    response: Response,
+    k: int = Query(5, ge=1, le=RECENT_ACTIVITY_SIZE),
+    current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))
+):
+    '''Counters plus the k newest student registrations and bookings, in one call'''
+    not_modified = conditional_get(request, response, data_etag(("users",), ("bookings",), ("mood",)))
+    if not_modified:
+        return not_modified
+    
+    # The deques are in insertion order, so the newest k are at the right end
+    return {
+        "success": True,
+        "stats": admin_stats(),
+        "recent_registrations": [
+            UserResponse(**user.dict()) for user in islice(reversed(recent_registrations), k)
+        ],
+        "recent_bookings": [b.to_dict() for b in islice(reversed(recent_bookings), k)]
+    }
+
+@app.get("/admin/mood/summary")
+async def get_mood_summary(
+    request: Request,
+    response: Response,
+    days: int = Query(30, ge=1, le=366),
+    current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))
+):
+    '''Platform-wide mood counts and entries per day over the last `days` UTC days'''
+    today = to_epoch_us(datetime.utcnow()) // DAY_US
+    since = (today - days + 1) * DAY_US
+    until = (today + 1) * DAY_US
+    start_date = datetime.utcfromtimestamp(since // 1_000_000).date().isoformat()
+    
+    # The window moves at midnight UTC even when no mood entry changes
+    not_modified = conditional_get(request, response, data_etag(("mood",), window=start_date))
+    if not_modified:
+        return not_modified
+    
+    return {
+        "success": True,
+        "start_date": start_date,
+        "mood_counts": mood_log.mood_counts(since, until),
+        "daily_counts": mood_log.daily_counts(since, until)
+    }
 
 @app.get("/admin/users")
-async def get_all_users(current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))):
+async def get_all_users(
+    request: Request,
+    response: Response,
+    current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))
+):
+    not_modified = conditional_get(request, response, data_etag(("users",)))
+    if not_modified:
+        return not_modified
+    
     users_list = [UserResponse(**user.dict()) for user in users_db.values()]
     return {"success": True, "users": users_list}
 
+@app.get("/admin/chat/sessions")
+async def get_chat_session_stats(
+    current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))
+):
+    return {"success": True, **chat_sessions.status()}
+
+@app.get("/admin/conversations/search")
+async def search_conversations(
+    q: str = Query(..., min_length=1, max_length=200),
+    user_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    risk_level: Optional[List[SeverityLevel]] = Query(None),
+    page: int = Query(1, ge=1, le=500),
+    page_size: int = Query(20, ge=1, le=100),
+    current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))
+):
+    # Ranked full-text search; ** marks the matched words in each snippet.
+    # since and until are UTC ISO-8601 dates or times, as stored
+    results = await run_in_threadpool(
+        conversation_manager.search, q,
+        user_id=user_id, since=since, until=until,
+        risk_levels=[level.value for level in risk_level] if risk_level else None,
+        page=page, page_size=page_size
+    )
+    return {"success": True, "query": q, **results}
+
+# Server-sent events, so the browser's EventSource reconnects and resumes by
+# itself. EventSource can't set headers, hence the access_token fallback.
+@app.get("/admin/alerts/stream")
+async def stream_crisis_alerts(
+    request: Request,
+    access_token: Optional[str] = None,
+    last_event_id: Optional[int] = None,
+    token: Optional[str] = Depends(optional_oauth2_scheme)
+):
+    current_user = user_from_token(token or access_token or "")
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
+    
+    async def event_stream():
+        # Ask the browser to reconnect quickly after an overflow disconnect
+        yield "retry: 1000\n\n"
+        async for event in crisis_alerts.subscribe(last_event_id, ALERT_HEARTBEAT_SECONDS):
+            yield format_sse(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/admin/alerts")
+async def get_crisis_alerts(
+    last_event_id: Optional[int] = None,
+    current_user: UserInDB = Depends(require_role([UserRole.ADMIN]))
+):
+    return {"success": True, "alerts": crisis_alerts.replay(last_event_id), **crisis_alerts.stats()}
+
 # Health check
 @app.get("/")
 async def root():
@@ -520,7 +1605,24 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "model": chatbot.model_status(),
+        "chat_admission": chat_admission.status()
+    }
+
+# Readiness probe: only route traffic here once the chat model is warm
+@app.get("/ready")
+async def readiness_check():
+    model = chatbot.model_status()
+    if not model['ready']:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Chat model is not loaded yet",
+            headers={"Retry-After": str(MODEL_RETRY_SECONDS)}
+        )
+    return {"status": "ready", "model": model}
 
 if __name__ == "__main__":
     import uvicorn
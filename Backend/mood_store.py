@@ -0,0 +1,253 @@
+"""
+Memory-mapped columnar mood store for the Mental Health Support API
+Entries are appended to fixed-width column files that are mapped straight
+into NumPy arrays, so reopening the store parses nothing and range queries
+and aggregations run on views of the mapped pages.
+
+    <directory>/count           uint64   committed rows
+    <directory>/ids.bin         16 bytes entry UUID
+    <directory>/timestamps.bin  int64    epoch microseconds, non-decreasing
+    <directory>/users.bin       uint32   code in users.jsonl
+    <directory>/moods.bin       uint16   code in moods.jsonl
+    <directory>/note_starts.bin int64    offset into notes.bin, -1 for no note
+    <directory>/note_lengths.bin uint32  note length in bytes
+    <directory>/notes.bin       UTF-8 note text
+"""
+
+import os
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from records import Codebook, iso_from_epoch_us
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DAY_US = 86_400_000_000
+
+# NumPy dtype strings; numpy itself is imported where it is used
+COLUMNS = {
+    "ids": "V16",
+    "timestamps": "<i8",
+    "users": "<u4",
+    "moods": "<u2",
+    "note_starts": "<i8",
+    "note_lengths": "<u4",
+}
+
+
+class MoodStore:
+    """Append-only mood entries in memory-mapped column files
+
+    A row is written to every column first and only then counted, so a crash
+    mid-append leaves at most an uncounted row that the next append
+    overwrites. Pages are flushed by the OS; flush() forces them out.
+    Not thread-safe: the API only touches it from the event loop.
+
+    Each user's rows are found through a CSR-style index (rows sorted by user,
+    plus per-user offsets) built with one stable argsort when the store opens.
+    Rows appended later are kept in small per-user tails; once there are
+    REINDEX_ROWS of them they are merged into the index in one linear pass,
+    sorting only the tail rows, so the event loop never re-sorts the store.
+    """
+
+    INITIAL_CAPACITY = 65_536
+    REINDEX_ROWS = 65_536
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.users = Codebook(path=os.path.join(directory, "users.jsonl"))
+        self.moods = Codebook(limit=2 ** 16, path=os.path.join(directory, "moods.jsonl"))
+
+        self._count = self._map("count", "<u8", 1)
+        rows = int(self._count[0])
+        self.capacity = max(self.INITIAL_CAPACITY, self._existing_capacity())
+        while self.capacity < rows:
+            self.capacity *= 2
+        self._columns = {name: self._map(name + ".bin", dtype, self.capacity)
+                         for name, dtype in COLUMNS.items()}
+        self._notes = open(os.path.join(directory, "notes.bin"), "a+b")
+        self._build_index()
+
+    def _existing_capacity(self) -> int:
+        path = os.path.join(self.directory, "timestamps.bin")
+        if not os.path.exists(path):
+            return 0
+        import numpy as np
+        return os.path.getsize(path) // np.dtype(COLUMNS["timestamps"]).itemsize
+
+    def _map(self, filename: str, dtype: str, length: int) -> "np.memmap":
+        import numpy as np
+        dtype = np.dtype(dtype)
+        path = os.path.join(self.directory, filename)
+        with open(path, "ab") as f:
+            if f.tell() < length * dtype.itemsize:
+                f.truncate(length * dtype.itemsize)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=(length,))
+
+    def _grow(self):
+        for column in self._columns.values():
+            column.flush()
+        self.capacity *= 2
+        self._columns = {name: self._map(name + ".bin", dtype, self.capacity)
+                         for name, dtype in COLUMNS.items()}
+
+    def _build_index(self):
+        import numpy as np
+        users = self.column("users")
+        # A stable sort keeps each user's rows in append (and so time) order
+        self._order = np.argsort(users, kind="stable").astype(np.uint32)
+        counts = np.bincount(users, minlength=len(self.users))
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        self._indexed_rows = len(self)
+        self._tails: Dict[int, List[int]] = {}
+
+    def _merge_tails(self):
+        import numpy as np
+        users = self.column("users")[self._indexed_rows:]
+        # The stable sort keeps each user's tail rows in append order
+        tail_order = np.argsort(users, kind="stable")
+        tail_users = users[tail_order]
+        tail_counts = np.bincount(users, minlength=len(self.users))
+        indexed_counts = np.zeros(len(self.users), dtype=np.int64)
+        indexed_counts[:len(self._offsets) - 1] = np.diff(self._offsets)
+        offsets = np.concatenate(([0], np.cumsum(indexed_counts + tail_counts)))
+
+        # A user's tail rows go right after their indexed rows; the indexed
+        # rows keep their relative order and fill every other position
+        rank = np.arange(len(users)) - (np.cumsum(tail_counts) - tail_counts)[tail_users]
+        positions = offsets[tail_users] + indexed_counts[tail_users] + rank
+        order = np.empty(len(self), dtype=np.uint32)
+        indexed = np.ones(len(self), dtype=bool)
+        indexed[positions] = False
+        order[indexed] = self._order
+        order[positions] = self._indexed_rows + tail_order
+
+        self._order, self._offsets = order, offsets
+        self._indexed_rows = len(self)
+        self._tails = {}
+
+    def __len__(self) -> int:
+        return int(self._count[0])
+
+    def column(self, name: str) -> "np.ndarray":
+        """Zero-copy view of the committed rows of one column"""
+        return self._columns[name][:len(self)]
+
+    def append(self, user_id: str, user_name: str, mood: str, note: Optional[str],
+               timestamp: int) -> str:
+        """Add an entry and return its id"""
+        import numpy as np
+        user = self.users.code((user_id, user_name))
+        mood_code = self.moods.code(mood)
+        row = len(self)
+        if row == self.capacity:
+            self._grow()
+
+        note_start, note_length = -1, 0
+        if note is not None:
+            encoded = note.encode("utf-8")
+            self._notes.seek(0, os.SEEK_END)
+            note_start, note_length = self._notes.tell(), len(encoded)
+            self._notes.write(encoded)
+            self._notes.flush()
+
+        # Timestamps never go backwards, so time ranges are a binary search
+        if row:
+            timestamp = max(timestamp, int(self._columns["timestamps"][row - 1]))
+
+        entry_id = uuid.uuid4()
+        columns = self._columns
+        columns["ids"][row] = np.void(entry_id.bytes)
+        columns["timestamps"][row] = timestamp
+        columns["users"][row] = user
+        columns["moods"][row] = mood_code
+        columns["note_starts"][row] = note_start
+        columns["note_lengths"][row] = note_length
+        self._count[0] = row + 1
+
+        self._tails.setdefault(user, []).append(row)
+        if len(self) - self._indexed_rows >= self.REINDEX_ROWS:
+            self._merge_tails()
+        return str(entry_id)
+
+    def rows_for(self, user_id: str, user_name: str) -> "np.ndarray":
+        """Row numbers of one user's entries, oldest first"""
+        import numpy as np
+        user = self.users.find((user_id, user_name))
+        if user is None:
+            return np.empty(0, dtype=np.uint32)
+        rows = self._order[self._offsets[user]:self._offsets[user + 1]] \
+            if user + 1 < len(self._offsets) else self._order[:0]
+        tail = self._tails.get(user)
+        if tail:
+            rows = np.concatenate((rows, np.asarray(tail, dtype=np.uint32)))
+        return rows
+
+    def row_range(self, since: Optional[int] = None, until: Optional[int] = None) -> Tuple[int, int]:
+        """[start, stop) rows with since <= timestamp < until"""
+        import numpy as np
+        timestamps = self.column("timestamps")
+        start = int(np.searchsorted(timestamps, since, "left")) if since is not None else 0
+        stop = int(np.searchsorted(timestamps, until, "left")) if until is not None else len(timestamps)
+        return start, stop
+
+    def history(self, user_id: str, user_name: str, since: Optional[int] = None,
+                until: Optional[int] = None) -> List[Dict]:
+        import numpy as np
+        rows = self.rows_for(user_id, user_name)
+        if since is not None or until is not None:
+            timestamps = self._columns["timestamps"][rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if since is not None:
+                keep &= timestamps >= since
+            if until is not None:
+                keep &= timestamps < until
+            rows = rows[keep]
+        return [self.entry(int(row)) for row in rows]
+
+    def entry(self, row: int) -> Dict:
+        columns = self._columns
+        user_id, user_name = self.users.value(int(columns["users"][row]))
+        return {
+            "id": str(uuid.UUID(bytes=columns["ids"][row].tobytes())),
+            "user_id": user_id,
+            "user_name": user_name,
+            "mood": self.moods.value(int(columns["moods"][row])),
+            "note": self._read_note(int(columns["note_starts"][row]), int(columns["note_lengths"][row])),
+            "timestamp": iso_from_epoch_us(int(columns["timestamps"][row]))
+        }
+
+    def _read_note(self, start: int, length: int) -> Optional[str]:
+        if start < 0:
+            return None
+        self._notes.seek(start)
+        return self._notes.read(length).decode("utf-8")
+
+    def mood_counts(self, since: Optional[int] = None, until: Optional[int] = None) -> Dict[str, int]:
+        """Entries per mood in a time range"""
+        import numpy as np
+        start, stop = self.row_range(since, until)
+        counts = np.bincount(self.column("moods")[start:stop], minlength=len(self.moods))
+        return {self.moods.value(code): int(count) for code, count in enumerate(counts) if count}
+
+    def daily_counts(self, since: int, until: Optional[int] = None) -> List[int]:
+        """Entries per UTC day from the day containing since up to until"""
+        import numpy as np
+        start, stop = self.row_range(since, until)
+        first_day = since // DAY_US
+        days = self.column("timestamps")[start:stop] // DAY_US - first_day
+        last_day = ((until - 1) // DAY_US if until is not None else
+                    (int(days[-1]) + first_day if len(days) else first_day))
+        return np.bincount(days, minlength=last_day - first_day + 1).tolist()
+
+    def flush(self):
+        for column in self._columns.values():
+            column.flush()
+        self._count.flush()
+        self._notes.flush()
+
+    def close(self):
+        self.flush()
+        self._notes.close()
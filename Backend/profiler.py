@@ -0,0 +1,226 @@
+"""
+Opt-in sampling profiler for the Mental Health Support API
+While a chosen request runs, a background thread samples its stacks (on the
+event loop while the request's task is running, and in any threadpool worker
+running on its behalf) and writes them out in the collapsed-stack format
+that flamegraph.pl, inferno and speedscope read:
+
+    <directory>/<time>-<method>-<path>-<ms>ms.folded    "frame;frame;frame <samples>" lines
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from fastapi.concurrency import run_in_threadpool as _run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("current_profile", default=None)
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class RequestProfile:
+    """Samples collected for one request"""
+
+    __slots__ = ("label", "file_stem", "loop", "loop_thread", "task", "threads",
+                 "samples", "started", "elapsed")
+
+    def __init__(self, label: str, file_stem: str, loop, task):
+        self.label = label
+        self.file_stem = file_stem
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        self.task = task
+        # Worker threads currently running code for this request
+        self.threads: set = set()
+        self.samples: Counter = Counter()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+
+def profiled(func: Callable) -> Callable:
+    """func, made visible to the profile of the request calling this (if any)
+
+    Call on the event loop; the returned function may run on another thread.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return func
+
+    @functools.wraps(func)
+    def run_profiled(*args, **kwargs):
+        ident = threading.get_ident()
+        profile.threads.add(ident)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.threads.discard(ident)
+    return run_profiled
+
+
+async def run_in_threadpool(func: Callable, *args, **kwargs):
+    """fastapi.concurrency.run_in_threadpool, with the work included in request profiles"""
+    return await _run_in_threadpool(profiled(func), *args, **kwargs)
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler shared by all profiled requests
+
+    The sampling thread only runs while at least one request is being
+    profiled. Finished profiles are written by the same thread, and only the
+    newest max_files are kept.
+    """
+
+    def __init__(self, directory: str, interval: float = 0.005, max_files: int = 200):
+        self.directory = directory
+        self.interval = interval
+        self.max_files = max_files
+        self._active: List[RequestProfile] = []
+        self._finished: "queue.SimpleQueue[RequestProfile]" = queue.SimpleQueue()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"profiled": 0, "written": 0, "samples": 0}
+
+    def start(self, label: str, file_stem: str) -> RequestProfile:
+        """Begin profiling the calling task; must be called on the event loop"""
+        profile = RequestProfile(label, file_stem, asyncio.get_running_loop(), asyncio.current_task())
+        with self._lock:
+            self._active.append(profile)
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        self.stats["profiled"] += 1
+        return profile
+
+    def stop(self, profile: RequestProfile):
+        profile.elapsed = time.perf_counter() - profile.started
+        with self._lock:
+            self._active.remove(profile)
+        self._finished.put(profile)
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = list(self._active)
+            while True:
+                try:
+                    self._write(self._finished.get_nowait())
+                except queue.Empty:
+                    break
+            if not active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            frames = sys._current_frames()
+            for profile in active:
+                # The loop thread runs every request; count it only while this one's task is on it
+                if asyncio.current_task(profile.loop) is profile.task:
+                    self._sample(profile, frames.get(profile.loop_thread))
+                for ident in list(profile.threads):
+                    self._sample(profile, frames.get(ident))
+            del frames
+            time.sleep(self.interval)
+
+    def _sample(self, profile: RequestProfile, frame):
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        if stack:
+            profile.samples[tuple(stack)] += 1
+            self.stats["samples"] += 1
+
+    def _write(self, profile: RequestProfile):
+        if not profile.samples:
+            return
+        path = os.path.join(self.directory, f"{profile.file_stem}-{profile.elapsed * 1000:.0f}ms.folded")
+        lines = []
+        for stack, count in profile.samples.items():
+            # Root first, under the request itself so files can be merged
+            names = [profile.label] + [
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                for code in reversed(stack)
+            ]
+            lines.append(f"{';'.join(name.replace(';', ':') for name in names)} {count}\n")
+        try:
+            with open(path, "w") as f:
+                f.writelines(lines)
+            self.stats["written"] += 1
+            self._rotate()
+        except OSError:
+            logger.exception("Failed to write request profile %s", path)
+
+    def _rotate(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".folded"))
+        for name in names[:max(0, len(names) - self.max_files)]:
+            os.remove(os.path.join(self.directory, name))
+
+
+class ProfilingMiddleware:
+    """Profile a random sample_rate of HTTP requests, plus any carrying header
+
+    authorize(headers) decides whether a request asking for a profile by
+    header may have one; without it the header is ignored. Profiled
+    responses carry the start of their profile's file name in that header.
+    """
+
+    def __init__(self, app, profiler: SamplingProfiler, sample_rate: float = 0.0,
+                 header: str = "x-profile", authorize: Optional[Callable[[list], bool]] = None):
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode("latin-1")
+        self.authorize = authorize
+
+    def _wanted(self, scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if self.authorize is not None:
+            for name, _ in scope["headers"]:
+                if name == self.header:
+                    return self.authorize(scope["headers"])
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope['method']} {scope['path']}"
+        file_stem = "-".join((
+            datetime.utcnow().strftime("%Y%m%dT%H%M%S.%f"),
+            scope["method"],
+            _UNSAFE.sub("_", scope["path"].strip("/"))[:80] or "root"
+        ))
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (self.header, file_stem.encode("latin-1"))
+                ]
+            await send(message)
+
+        profile = self.profiler.start(label, file_stem)
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _current_profile.reset(token)
+            self.profiler.stop(profile)
@@ -0,0 +1,131 @@
+"""
+Per-client rate limiting for the Mental Health Support API
+Token buckets keyed by route and client, kept in memory or in Redis
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Sustained rate (requests per second) and burst size for one bucket"""
+    rate: float
+    burst: int
+
+    @classmethod
+    def per_minute(cls, requests: int, burst: Optional[int] = None) -> "RateLimit":
+        return cls(rate=requests / 60.0, burst=burst if burst is not None else requests)
+
+
+class InMemoryRateLimiter:
+    """Token bucket limiter for a single worker process
+
+    Buckets live in an LRU-ordered dict. Every call touches one bucket and
+    evicts at most a few idle ones from the cold end, so both the per-request
+    cost and the memory (max_keys buckets) stay bounded.
+    """
+
+    def __init__(self, max_keys: int = 100_000, idle_ttl: float = 600.0):
+        self.max_keys = max_keys
+        self.idle_ttl = idle_ttl
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, limit: RateLimit, cost: float = 1.0) -> Tuple[bool, float]:
+        """Consume tokens from a bucket; returns (allowed, retry_after_seconds)"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(limit.burst), now]
+                self._buckets[key] = bucket
+            else:
+                self._buckets.move_to_end(key)
+                elapsed = now - bucket[1]
+                bucket[0] = min(float(limit.burst), bucket[0] + elapsed * limit.rate)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - bucket[0]) / limit.rate
+
+            self._evict(now)
+
+        return allowed, retry_after
+
+    def _evict(self, now: float):
+        # The oldest entry is always at the front, so stop at the first live one
+        for _ in range(2):
+            if not self._buckets:
+                return
+            oldest_key = next(iter(self._buckets))
+            if len(self._buckets) > self.max_keys or now - self._buckets[oldest_key][1] > self.idle_ttl:
+                del self._buckets[oldest_key]
+            else:
+                return
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RedisRateLimiter:
+    """Token bucket limiter shared by all workers through Redis
+
+    The refill-and-take step runs as one Lua script so concurrent workers see
+    a consistent bucket. Idle buckets expire on their own via key TTLs. The
+    client is redis.asyncio's, so waiting on Redis never blocks the event loop.
+    """
+
+    SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+    local updated = tonumber(redis.call('HGET', KEYS[1], 'updated'))
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    if tokens == nil then
+        tokens = burst
+    else
+        tokens = math.min(burst, tokens + (now - updated) * rate)
+    end
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    else
+        retry_after = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+    return {allowed, tostring(retry_after)}
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio
+        except ImportError as e:
+            raise RuntimeError("The redis package (4.2 or newer) is required for a shared rate limit backend") from e
+
+        self.prefix = prefix
+        self._client = redis.asyncio.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def hit(self, key: str, limit: RateLimit, cost: float = 1.0) -> Tuple[bool, float]:
+        allowed, retry_after = await self._script(
+            keys=[self.prefix + key],
+            args=[limit.rate, limit.burst, time.time(), cost]
+        )
+        return bool(allowed), float(retry_after)
+
+
+def retry_after_header(retry_after: float) -> str:
+    """Format a wait time for the Retry-After header (whole seconds, at least 1)"""
+    return str(max(1, math.ceil(retry_after)))
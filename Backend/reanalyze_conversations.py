@@ -0,0 +1,198 @@
+"""
+Offline re-analysis of stored conversations for the Mental Health Support API
+Recomputes emotion_detected and risk_level with the current lexicons after
+CrisisDetector or EmotionAnalyzer keywords change
+
+    python reanalyze_conversations.py --db mental_health_chat.db --workers 4
+
+The table is read in id order, one chunk at a time, and chunks are analysed by
+a process pool. Results are written in one transaction per chunk together with
+a checkpoint, so an interrupted run resumes where it stopped.
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from chatbot import EMOTION_CODES, CrisisDetector, EmotionAnalyzer
+
+JOB_NAME = "conversation_reanalysis"
+
+# Set in each worker process by init_worker
+_detector: Optional[CrisisDetector] = None
+_analyzer: Optional[EmotionAnalyzer] = None
+
+Row = Tuple[int, Optional[str], Optional[str], Optional[str]]
+
+
+def lexicon_version() -> str:
+    """Fingerprint of the keyword lists; a new value invalidates old checkpoints"""
+    lexicons = {
+        "crisis": CrisisDetector().crisis_keywords,
+        "emotion": {emotion.value: words for emotion, words in EmotionAnalyzer().emotion_lexicon.items()},
+    }
+    encoded = json.dumps(lexicons, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def init_worker():
+    global _detector, _analyzer
+    _detector = CrisisDetector()
+    _analyzer = EmotionAnalyzer()
+
+
+def analyze_chunk(rows: List[Row]) -> Tuple[int, int, List[Tuple[str, str, int]]]:
+    """Return (last id, rows seen, updates) where updates only covers changed rows"""
+    messages = [message or "" for _, message, _, _ in rows]
+    codes, _ = _analyzer.analyze_batch(messages)
+
+    updates = []
+    for (row_id, _, old_emotion, old_risk), message, code in zip(rows, messages, codes):
+        severity, _ = _detector.assess_risk_level(message)
+        emotion = EMOTION_CODES[code].value
+        if emotion != old_emotion or severity.value != old_risk:
+            updates.append((emotion, severity.value, row_id))
+    return rows[-1][0], len(rows), updates
+
+
+class ReanalysisJob:
+    """Checkpointed pass over the conversations table"""
+
+    def __init__(self, db_path: str, chunk_size: int = 5000):
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.version = lexicon_version()
+        # Writes wait for the API's own short transactions instead of failing
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS reanalysis_checkpoints (
+                job TEXT PRIMARY KEY,
+                lexicon_version TEXT,
+                last_id INTEGER,
+                rows_seen INTEGER,
+                rows_updated INTEGER,
+                updated_at DATETIME
+            )
+        ''')
+        self.conn.commit()
+
+    def checkpoint(self) -> Tuple[int, int, int]:
+        """(last id, rows seen, rows updated) to resume from for this lexicon version"""
+        row = self.conn.execute(
+            "SELECT lexicon_version, last_id, rows_seen, rows_updated FROM reanalysis_checkpoints WHERE job = ?",
+            (JOB_NAME,)
+        ).fetchone()
+        if row is None or row[0] != self.version:
+            return 0, 0, 0
+        return row[1], row[2], row[3]
+
+    def reset(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM reanalysis_checkpoints WHERE job = ?", (JOB_NAME,))
+
+    def iter_chunks(self, after_id: int) -> Iterator[List[Row]]:
+        """Keyset pagination by id, so each chunk is one short indexed read"""
+        while True:
+            rows = self.conn.execute('''
+                SELECT id, user_message, emotion_detected, risk_level
+                FROM conversations
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (after_id, self.chunk_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1][0]
+
+    def write(self, last_id: int, rows_seen: int, rows_updated: int,
+              updates: List[Tuple[str, str, int]]):
+        """Apply one chunk's updates and advance the checkpoint atomically"""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE conversations SET emotion_detected = ?, risk_level = ? WHERE id = ?",
+                updates
+            )
+            self.conn.execute('''
+                INSERT INTO reanalysis_checkpoints
+                (job, lexicon_version, last_id, rows_seen, rows_updated, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(job) DO UPDATE SET
+                    lexicon_version = excluded.lexicon_version,
+                    last_id = excluded.last_id,
+                    rows_seen = excluded.rows_seen,
+                    rows_updated = excluded.rows_updated,
+                    updated_at = excluded.updated_at
+            ''', (JOB_NAME, self.version, last_id, rows_seen, rows_updated,
+                  datetime.datetime.now().isoformat()))
+
+    def run(self, workers: int, max_pending: Optional[int] = None, progress=print) -> Tuple[int, int]:
+        """Re-analyse every row after the checkpoint; returns (rows seen, rows updated)"""
+        last_id, rows_seen, rows_updated = self.checkpoint()
+        if last_id:
+            progress(f"resuming after id {last_id} ({rows_seen} rows already checked)")
+
+        # Only this many chunks are read ahead, which bounds memory use
+        max_pending = max_pending or workers * 2
+        pending = deque()
+        chunks = self.iter_chunks(last_id)
+        started = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            for rows in chunks:
+                pending.append(pool.submit(analyze_chunk, rows))
+                if len(pending) >= max_pending:
+                    rows_seen, rows_updated = self._drain_one(pending, rows_seen, rows_updated,
+                                                              started, progress)
+            while pending:
+                rows_seen, rows_updated = self._drain_one(pending, rows_seen, rows_updated,
+                                                          started, progress)
+
+        return rows_seen, rows_updated
+
+    def _drain_one(self, pending: deque, rows_seen: int, rows_updated: int,
+                   started: float, progress) -> Tuple[int, int]:
+        # Chunks are written in submission order so the checkpoint only moves forward
+        last_id, seen, updates = pending.popleft().result()
+        rows_seen += seen
+        rows_updated += len(updates)
+        self.write(last_id, rows_seen, rows_updated, updates)
+        rate = rows_seen / max(time.perf_counter() - started, 1e-9)
+        progress(f"checked up to id {last_id}: {rows_seen} rows, {rows_updated} updated ({rate:.0f} rows/s)")
+        return rows_seen, rows_updated
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute stored emotion and risk labels")
+    parser.add_argument("--db", default="mental_health_chat.db",
+                        help="SQLite database (default: mental_health_chat.db)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="analysis processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=5000,
+                        help="rows per chunk and per write transaction (default: 5000)")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore any saved checkpoint and start from the first row")
+    args = parser.parse_args()
+
+    job = ReanalysisJob(args.db, args.chunk_size)
+    try:
+        if args.restart:
+            job.reset()
+        rows_seen, rows_updated = job.run(args.workers)
+    finally:
+        job.close()
+    print(f"\ndone: {rows_seen} rows checked, {rows_updated} updated (lexicon {job.version})")
+
+
+if __name__ == "__main__":
+    main()
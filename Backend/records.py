@@ -0,0 +1,169 @@
+"""
+Compact in-memory records for the Mental Health Support API
+Bookings are slotted objects; users and statuses are stored as small integer
+codes, ids as 128-bit integers and times as epoch microseconds. to_dict()
+rebuilds the JSON shape the API has always returned. Mood entries live in
+the on-disk columnar store in mood_store.py.
+"""
+
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+EPOCH = datetime(1970, 1, 1)
+
+T = TypeVar("T", bound=Hashable)
+
+
+def to_epoch_us(moment: datetime) -> int:
+    """Naive UTC datetime to integer microseconds since the epoch (exact)"""
+    delta = moment - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_epoch_us(micros: int) -> datetime:
+    return EPOCH + timedelta(microseconds=micros)
+
+
+def iso_from_epoch_us(micros: int) -> str:
+    return from_epoch_us(micros).isoformat()
+
+
+class Codebook(Generic[T]):
+    """Interns repeated values as small integer codes
+
+    With a path, each new value is appended to that file as a JSON line, so
+    codes stored on disk keep their meaning across restarts.
+    """
+
+    def __init__(self, limit: Optional[int] = None, path: Optional[str] = None):
+        self.limit = limit
+        self.path = path
+        self._values: List[T] = []
+        self._codes: Dict[T, int] = {}
+        if path is not None:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        value = json.loads(line)
+                        self._add(tuple(value) if isinstance(value, list) else value)
+            except FileNotFoundError:
+                pass
+
+    def _add(self, value: T) -> int:
+        code = len(self._values)
+        self._values.append(value)
+        self._codes[value] = code
+        return code
+
+    def code(self, value: T) -> int:
+        try:
+            return self._codes[value]
+        except KeyError:
+            pass
+        if self.limit is not None and len(self._values) >= self.limit:
+            raise ValueError(f"Codebook is full ({self.limit} values)")
+        if self.path is not None:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(value) + "\n")
+        return self._add(value)
+
+    def find(self, value: T) -> Optional[int]:
+        """Code of a value that has been seen, without adding it"""
+        return self._codes.get(value)
+
+    def value(self, code: int) -> T:
+        return self._values[code]
+
+    def values(self) -> List[T]:
+        """Copy of every value, in code order"""
+        return list(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+# (user_id, user_name) per user; records keep only the code
+user_refs: "Codebook[Tuple[str, str]]" = Codebook()
+booking_statuses: "Codebook[str]" = Codebook()
+
+
+class BookingRecord:
+    """One counselling booking"""
+
+    __slots__ = ("key", "user", "date", "time", "concerns", "status_code",
+                 "version", "created_at", "updated_at")
+
+    def __init__(self, user: int, date: str, time: str, concerns: Optional[str], status: str,
+                 created_at: int, key: Optional[int] = None):
+        self.key = key if key is not None else uuid.uuid4().int
+        self.user = user
+        # Many bookings share a date and a slot, so those strings are interned
+        self.date = sys.intern(date)
+        self.time = sys.intern(time)
+        self.concerns = concerns
+        self.status_code = booking_statuses.code(status)
+        self.version = 1
+        self.created_at = created_at
+        self.updated_at: Optional[int] = None
+
+    @property
+    def id(self) -> str:
+        return str(uuid.UUID(int=self.key))
+
+    @property
+    def user_id(self) -> str:
+        return user_refs.value(self.user)[0]
+
+    @property
+    def status(self) -> str:
+        return booking_statuses.value(self.status_code)
+
+    @status.setter
+    def status(self, value: str):
+        self.status_code = booking_statuses.code(value)
+
+    def to_row(self) -> tuple:
+        """Plain tuple of the fields, for snapshots and the state journal"""
+        return (self.key, self.user, self.date, self.time, self.concerns, self.status,
+                self.version, self.created_at, self.updated_at)
+
+    @classmethod
+    def from_row(cls, row: tuple, user: int) -> "BookingRecord":
+        """Rebuild a record from to_row(), owned by this process's code for its user"""
+        # Restores build a million of these, so skip __init__
+        booking = cls.__new__(cls)
+        (booking.key, _, date, time, booking.concerns, status,
+         booking.version, booking.created_at, booking.updated_at) = row
+        booking.user = user
+        booking.date = sys.intern(date)
+        booking.time = sys.intern(time)
+        booking.status_code = booking_statuses.code(status)
+        return booking
+
+    def to_dict(self) -> Dict:
+        user_id, user_name = user_refs.value(self.user)
+        booking = {
+            "id": self.id,
+            "user_id": user_id,
+            "user_name": user_name,
+            "date": self.date,
+            "time": self.time,
+            "concerns": self.concerns,
+            "status": self.status,
+            "version": self.version,
+            "created_at": iso_from_epoch_us(self.created_at)
+        }
+        if self.updated_at is not None:
+            booking["updated_at"] = iso_from_epoch_us(self.updated_at)
+        return booking
+
+
+def booking_key(booking_id: str) -> Optional[int]:
+    """The integer key for an id from a URL, or None if it isn't a UUID"""
+    try:
+        return uuid.UUID(booking_id).int
+    except ValueError:
+        return None
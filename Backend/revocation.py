@@ -0,0 +1,75 @@
+"""
+Token revocation for the Mental Health Support API
+A denylist of token ids (jti) and token families, each kept only until the
+tokens it covers would have expired anyway
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class TokenDenylist:
+    """Revoked keys with per-key expiry and bucketed eviction
+
+    Keys are filed in buckets by expiry time, granularity seconds wide.
+    Every call first drops at most max_evict_buckets buckets that are wholly
+    in the past, so a lookup is a dict probe plus a bounded amount of
+    eviction, and memory only holds keys whose tokens are still live. Times
+    are Unix timestamps, as in a JWT's exp. Must only be used from the event
+    loop.
+    """
+
+    def __init__(self, granularity: float = 60.0, max_evict_buckets: int = 2):
+        self.granularity = granularity
+        self.max_evict_buckets = max_evict_buckets
+        self._expires: Dict[str, float] = {}
+        self._buckets: Dict[int, List[str]] = {}
+        self._next_bucket = self._bucket(time.time())
+        self.stats = {"revoked": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def _bucket(self, moment: float) -> int:
+        return math.floor(moment / self.granularity)
+
+    def revoke(self, key: str, expires_at: float) -> bool:
+        """Deny key until expires_at; False if that adds nothing"""
+        now = time.time()
+        self._evict(now)
+        if expires_at <= now or self._expires.get(key, 0.0) >= expires_at:
+            return False
+        self._expires[key] = expires_at
+        self._buckets.setdefault(self._bucket(expires_at), []).append(key)
+        self.stats["revoked"] += 1
+        return True
+
+    def is_revoked(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        now = time.time()
+        self._evict(now)
+        expires_at = self._expires.get(key)
+        return expires_at is not None and expires_at > now
+
+    def _evict(self, now: float):
+        due = self._bucket(now)
+        if not self._buckets:
+            self._next_bucket = due
+            return
+        for _ in range(self.max_evict_buckets):
+            if self._next_bucket >= due:
+                return
+            for key in self._buckets.pop(self._next_bucket, ()):
+                # A key revoked again later is filed under its new expiry too
+                if self._expires.get(key, math.inf) <= now:
+                    del self._expires[key]
+                    self.stats["evicted"] += 1
+            self._next_bucket += 1
+
+    def items(self) -> List[Tuple[str, float]]:
+        return list(self._expires.items())
+
+    def status(self) -> Dict:
+        return {"entries": len(self._expires), **self.stats}
@@ -0,0 +1,202 @@
+"""
+Chat session registry for the Mental Health Support API
+Tracks live chat sessions per user, ends the ones left idle, and hands the
+summaries of ended sessions back for persistence
+"""
+
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+RISK_ORDER = {"low": 0, "moderate": 1, "high": 2, "critical": 3}
+# Recent exchanges kept as prompt context for each session
+HISTORY_TURNS = 20
+
+
+class ChatSession:
+    """One live conversation and its running stats"""
+
+    __slots__ = ("session_id", "user_id", "started_at", "started", "last_active",
+                 "turns", "max_risk", "emotions", "history")
+
+    def __init__(self, user_id: str, now: float):
+        self.session_id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.started_at = datetime.utcnow()
+        self.started = now
+        self.last_active = now
+        self.turns = 0
+        self.max_risk = "low"
+        self.emotions: Counter = Counter()
+        # The engine's prompt context; goes when the registry drops the session
+        self.history: "deque[Dict]" = deque(maxlen=HISTORY_TURNS)
+
+    def record_turn(self, emotion: str, risk_level: str):
+        self.turns += 1
+        self.emotions[emotion] += 1
+        if RISK_ORDER.get(risk_level, 0) > RISK_ORDER.get(self.max_risk, 0):
+            self.max_risk = risk_level
+
+    def summary(self, end_reason: Optional[str] = None) -> Dict:
+        summary = {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "started_at": self.started_at.isoformat(),
+            "active_seconds": round(self.last_active - self.started, 1),
+            "turns": self.turns,
+            "max_risk": self.max_risk,
+            "emotions": dict(self.emotions)
+        }
+        if end_reason is not None:
+            summary["ended_at"] = datetime.utcnow().isoformat()
+            summary["end_reason"] = end_reason
+        return summary
+
+
+class SessionRegistry:
+    """Live chat sessions, bounded per user and overall
+
+    Sessions are kept in least-recently-active order, so the idle sweep and
+    capacity eviction only ever look at the front. A user who opens more than
+    max_per_user sessions loses their least recently active one, and once
+    max_sessions are live the least recently active session anywhere goes.
+    Ended sessions' summaries wait in `ended` until drain_ended() collects
+    them. Must only be used from the event loop.
+    """
+
+    def __init__(self, idle_timeout: float = 1800.0, max_per_user: int = 5,
+                 max_sessions: int = 50_000, max_pending_summaries: int = 10_000):
+        self.idle_timeout = idle_timeout
+        self.max_per_user = max_per_user
+        self.max_sessions = max_sessions
+        self.max_pending_summaries = max_pending_summaries
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._by_user: Dict[str, "OrderedDict[str, ChatSession]"] = {}
+        self.ended: "deque[Dict]" = deque()
+        self.stats = {"created": 0, "resumed": 0, "ended": Counter(), "summaries_dropped": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, user_id: str) -> ChatSession:
+        now = time.monotonic()
+        user_sessions = self._by_user.setdefault(user_id, OrderedDict())
+        while len(user_sessions) >= self.max_per_user:
+            self._end(next(iter(user_sessions.values())), "replaced")
+        while len(self._sessions) >= self.max_sessions:
+            self._end(next(iter(self._sessions.values())), "capacity")
+
+        session = ChatSession(user_id, now)
+        self._sessions[session.session_id] = session
+        self._by_user.setdefault(user_id, OrderedDict())[session.session_id] = session
+        self.stats["created"] += 1
+        return session
+
+    def get(self, user_id: str, session_id: str) -> Optional[ChatSession]:
+        """The user's live session with that id; None if it is gone, idle or someone else's"""
+        session = self._sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return None
+        if time.monotonic() - session.last_active > self.idle_timeout:
+            # Idle past the timeout but not swept yet
+            self._end(session, "idle")
+            return None
+        return session
+
+    def resume(self, user_id: str, session_id: str) -> Optional[ChatSession]:
+        session = self.get(user_id, session_id)
+        if session is not None:
+            self.touch(session)
+            self.stats["resumed"] += 1
+        return session
+
+    def resume_or_create(self, user_id: str, session_id: Optional[str] = None) -> ChatSession:
+        """The named session if it is still live, else a new one
+
+        Without an id, the user's most recently active session is used if
+        there is one.
+        """
+        if session_id is not None:
+            session = self.resume(user_id, session_id)
+        else:
+            user_sessions = self._by_user.get(user_id)
+            session = None
+            if user_sessions:
+                session = self.resume(user_id, next(reversed(user_sessions)))
+        return session or self.create(user_id)
+
+    def touch(self, session: ChatSession):
+        session.last_active = time.monotonic()
+        self._sessions.move_to_end(session.session_id)
+        self._by_user[session.user_id].move_to_end(session.session_id)
+
+    def record_turn(self, session: ChatSession, emotion: str, risk_level: str):
+        """Count a finished turn; a session that ended meanwhile is left alone"""
+        if self._sessions.get(session.session_id) is not session:
+            return
+        session.record_turn(emotion, risk_level)
+        self.touch(session)
+
+    def user_sessions(self, user_id: str) -> List[ChatSession]:
+        return list(self._by_user.get(user_id, {}).values())
+
+    def end(self, user_id: str, session_id: str, reason: str = "ended") -> Optional[Dict]:
+        """End one of the user's sessions and return its summary"""
+        session = self.get(user_id, session_id)
+        if session is None:
+            return None
+        return self._end(session, reason)
+
+    def sweep(self, limit: Optional[int] = None) -> int:
+        """End up to limit sessions idle for longer than idle_timeout; returns how many"""
+        cutoff = time.monotonic() - self.idle_timeout
+        swept = 0
+        while self._sessions and swept != limit:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_active > cutoff:
+                break
+            self._end(oldest, "idle")
+            swept += 1
+        return swept
+
+    def end_all(self, reason: str = "shutdown"):
+        while self._sessions:
+            self._end(next(iter(self._sessions.values())), reason)
+
+    def drain_ended(self) -> List[Dict]:
+        ended = list(self.ended)
+        self.ended.clear()
+        return ended
+
+    def _end(self, session: ChatSession, reason: str) -> Dict:
+        del self._sessions[session.session_id]
+        user_sessions = self._by_user[session.user_id]
+        del user_sessions[session.session_id]
+        if not user_sessions:
+            del self._by_user[session.user_id]
+
+        summary = session.summary(reason)
+        self.stats["ended"][reason] += 1
+        # Sessions with no turns aren't worth a row
+        if session.turns:
+            if len(self.ended) >= self.max_pending_summaries:
+                self.ended.popleft()
+                self.stats["summaries_dropped"] += 1
+            self.ended.append(summary)
+        return summary
+
+    def status(self) -> Dict:
+        return {
+            "active": len(self._sessions),
+            "users": len(self._by_user),
+            "pending_summaries": len(self.ended),
+            "created": self.stats["created"],
+            "resumed": self.stats["resumed"],
+            "ended": dict(self.stats["ended"]),
+            "summaries_dropped": self.stats["summaries_dropped"],
+            "idle_timeout_seconds": self.idle_timeout,
+            "max_per_user": self.max_per_user,
+            "max_sessions": self.max_sessions
+        }
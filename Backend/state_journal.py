@@ -0,0 +1,199 @@
+"""
+Snapshot plus append-only journal for the API's in-memory state
+Request handlers only enqueue mutations; a background writer thread appends
+them to the current journal segment and, every so often, writes a compact
+binary snapshot so a restart replays only the journal tail.
+
+    <directory>/journal-<n>.log    framed mutations: uint32 length, uint32 crc32, pickle
+    <directory>/snapshot-<n>.bin   state as of the start of journal segment n
+
+Files are pickled, so the directory must be as trusted as the database.
+"""
+
+import logging
+import os
+import pickle
+import queue
+import re
+import struct
+import threading
+import zlib
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FRAME = struct.Struct("<II")
+SNAPSHOT_MAGIC = b"MHSNAP1\n"
+FILE_PATTERN = re.compile(r"^(journal|snapshot)-(\d+)\.(log|bin)$")
+
+_STOP = object()
+
+
+class StateJournal:
+    """Durable log of state mutations, written off the request path
+
+    capture() runs on the caller's thread when a snapshot is due. It should
+    grab references to the live records (cheap) and return a function that
+    the writer thread calls to turn them into a picklable value. Records may
+    change while that function runs; every such change was appended after
+    the snapshot point, so replaying the journal tail puts them right again.
+    That only holds if replaying an operation twice is harmless.
+    """
+
+    def __init__(self, directory: str, capture: Callable[[], Callable[[], Any]],
+                 snapshot_every: int = 100_000, fsync: bool = True):
+        self.directory = directory
+        self.capture = capture
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._segment: Optional[int] = None
+        self._file = None
+        self.since_snapshot = 0
+        self.stats = {"appended": 0, "written": 0, "snapshots": 0, "errors": 0}
+
+    def _files(self, kind: str) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = FILE_PATTERN.match(name)
+            if match and match.group(1) == kind:
+                numbers.append(int(match.group(2)))
+        return sorted(numbers)
+
+    def _path(self, kind: str, number: int) -> str:
+        extension = "log" if kind == "journal" else "bin"
+        return os.path.join(self.directory, f"{kind}-{number}.{extension}")
+
+    def load(self) -> Tuple[Optional[Any], Iterator[tuple]]:
+        """The newest snapshot (or None) and the operations journalled after it"""
+        snapshots = self._files("snapshot")
+        state, start = None, 0
+        if snapshots:
+            start = snapshots[-1]
+            with open(self._path("snapshot", start), "rb") as f:
+                if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                    raise ValueError(f"{f.name} is not a state snapshot")
+                state = pickle.load(f)
+        segments = [n for n in self._files("journal") if n >= start]
+        return state, self._replay(segments)
+
+    def _replay(self, segments: List[int]) -> Iterator[tuple]:
+        for number in segments:
+            with open(self._path("journal", number), "rb") as f:
+                data = f.read()
+            offset = 0
+            while offset + FRAME.size <= len(data):
+                length, crc = FRAME.unpack_from(data, offset)
+                payload = data[offset + FRAME.size:offset + FRAME.size + length]
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    # A crash mid-write leaves a torn frame at the very end
+                    logger.warning("Ignoring torn journal frame in segment %d at byte %d", number, offset)
+                    break
+                offset += FRAME.size + length
+                yield pickle.loads(payload)
+
+    def start(self):
+        """Open a fresh segment after load() and start the writer thread"""
+        if self._thread is not None:
+            return
+        existing = self._files("journal") + self._files("snapshot")
+        self._open_segment((existing[-1] if existing else 0) + 1)
+        self._thread = threading.Thread(target=self._run, name="state-journal", daemon=True)
+        self._thread.start()
+
+    def append(self, *operation):
+        """Queue one mutation; snapshots once enough have built up"""
+        self._queue.put(pickle.dumps(operation, pickle.HIGHEST_PROTOCOL))
+        self.stats["appended"] += 1
+        self.since_snapshot += 1
+        if self.since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        """Queue a snapshot of the state as of this call"""
+        self.since_snapshot = 0
+        self._queue.put(self.capture())
+
+    def close(self, snapshot: bool = True):
+        """Drain the queue, optionally write a final snapshot, and stop the writer"""
+        if self._thread is None:
+            return
+        if snapshot and self.since_snapshot:
+            self.snapshot()
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+    def _open_segment(self, number: int):
+        if self._file is not None:
+            self._file.close()
+        self._segment = number
+        self._file = open(self._path("journal", number), "ab")
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            # Write everything that queued up meanwhile in one go
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            frames = []
+            for item in items:
+                if isinstance(item, bytes):
+                    frames.append(FRAME.pack(len(item), zlib.crc32(item)))
+                    frames.append(item)
+                    continue
+                # Anything else ends the batch written so far
+                self._write(frames)
+                frames = []
+                if item is _STOP:
+                    return
+                self._write_snapshot(item)
+            self._write(frames)
+
+    def _write(self, frames: List[bytes]):
+        if not frames:
+            return
+        try:
+            self._file.write(b"".join(frames))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.stats["written"] += len(frames) // 2
+        except OSError:
+            self.stats["errors"] += 1
+            logger.exception("Failed to write the state journal")
+
+    def _write_snapshot(self, encode: Callable[[], Any]):
+        # Mutations queued after this point go to the next segment, which the
+        # snapshot file is named after
+        number = self._segment + 1
+        self._open_segment(number)
+        path = self._path("snapshot", number)
+        try:
+            state = encode()
+            with open(path + ".tmp", "wb") as f:
+                f.write(SNAPSHOT_MAGIC)
+                pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+        except Exception:
+            self.stats["errors"] += 1
+            logger.exception("Failed to write state snapshot %d", number)
+            return
+
+        # Only now is everything before this segment redundant
+        for kind in ("journal", "snapshot"):
+            for old in self._files(kind):
+                if old < number:
+                    os.remove(self._path(kind, old))
+        self.stats["snapshots"] += 1
+        logger.info("Wrote state snapshot %d", number)
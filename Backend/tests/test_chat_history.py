@@ -0,0 +1,44 @@
+"""
+Streaming a transcript must not hold the conversation database locked
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import ConversationManager  # noqa: E402
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = ConversationManager()
+    for turn in range(7):
+        manager.save_conversation("alice", f"message {turn}", "reply", "neutral", "low", "s1")
+        manager.save_conversation("bob", f"message {turn}", "reply", "neutral", "low", "s2")
+    return manager
+
+
+@pytest.mark.parametrize("scope", [{"user_id": "alice"}, {"session_id": "s1"}])
+def test_pages_cover_the_transcript_in_order(manager, scope):
+    pages = list(manager.iter_history(page_size=3, **scope))
+    assert [len(page) for page in pages] == [3, 3, 1]
+    messages = [row["user_message"] for page in pages for row in page]
+    assert messages == [f"message {turn}" for turn in range(7)]
+
+
+def test_writes_go_through_between_pages(manager):
+    pages = manager.iter_history(user_id="alice", page_size=3)
+    next(pages)
+
+    # A reader still holding a cursor would make this fail at once
+    writer = sqlite3.connect(manager.db_path, timeout=0)
+    with writer:
+        writer.execute("UPDATE conversations SET risk_level = 'moderate' WHERE user_id = 'bob'")
+    writer.close()
+
+    assert sum(len(page) for page in pages) == 4
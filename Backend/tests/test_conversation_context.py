@@ -0,0 +1,70 @@
+"""
+Prompt context must stay within one student's conversation
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import MentalHealthChatbot  # noqa: E402
+from sessions import SessionRegistry  # noqa: E402
+
+
+@pytest.fixture
+def chatbot(tmp_path, monkeypatch):
+    # The conversation database is created in the working directory
+    monkeypatch.chdir(tmp_path)
+    bot = MentalHealthChatbot()
+    bot.prompts = []
+
+    def stream_reply(route, messages, deadline, expires_at, on_chunk=None):
+        bot.prompts.append(messages)
+        return f"reply to: {messages[-1]['content']}"
+
+    bot._stream_reply = stream_reply
+    return bot
+
+
+def prompt_text(messages):
+    return " ".join(message["content"] for message in messages[1:])
+
+
+def test_interleaved_sessions_keep_their_own_context(chatbot):
+    registry = SessionRegistry()
+    alice = registry.create("alice")
+    bob = registry.create("bob")
+
+    turns = [
+        (alice, "I failed my chemistry exam today"),
+        (bob, "My roommate keeps playing loud music"),
+        (alice, "I don't know how to tell my parents"),
+        (bob, "I can't sleep before my lectures"),
+    ]
+    for session, message in turns:
+        chatbot.process_message(session.user_id, message, session_id=session.session_id,
+                                history=session.history)
+
+    alice_prompts = [prompt_text(chatbot.prompts[i]) for i in (0, 2)]
+    bob_prompts = [prompt_text(chatbot.prompts[i]) for i in (1, 3)]
+    for prompt in alice_prompts:
+        assert "roommate" not in prompt and "sleep" not in prompt
+    for prompt in bob_prompts:
+        assert "chemistry" not in prompt and "parents" not in prompt
+    # Each still sees its own earlier turn
+    assert "chemistry" in alice_prompts[1]
+    assert "roommate" in bob_prompts[1]
+    assert [turn["user"] for turn in alice.history] == [turns[0][1], turns[2][1]]
+
+
+def test_interleaved_users_without_history_are_kept_apart(chatbot):
+    chatbot.process_message("alice", "I failed my chemistry exam today", session_id="s-alice")
+    chatbot.process_message("bob", "My roommate keeps playing loud music", session_id="s-bob")
+    chatbot.process_message("bob", "I can't sleep before my lectures")
+    chatbot.process_message("alice", "I don't know how to tell my parents")
+
+    assert "chemistry" not in prompt_text(chatbot.prompts[1])
+    assert "chemistry" not in prompt_text(chatbot.prompts[2])
+    assert "roommate" not in prompt_text(chatbot.prompts[3])
@@ -0,0 +1,36 @@
+"""
+Search date ranges are UTC, whatever the server's local time zone
+"""
+
+import datetime
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import ConversationManager  # noqa: E402
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Far from UTC, so local timestamps would fall outside a UTC range
+    monkeypatch.setenv("TZ", "America/Los_Angeles")
+    time.tzset()
+    yield ConversationManager()
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_since_and_until_are_utc(manager):
+    before = (datetime.datetime.utcnow() - datetime.timedelta(minutes=1)).isoformat()
+    manager.save_conversation("alice", "I feel anxious about exams", "reply", "anxious", "moderate", "s1")
+    after = (datetime.datetime.utcnow() + datetime.timedelta(minutes=1)).isoformat()
+
+    found = manager.search("anxious", since=before, until=after)
+    assert [row["user_id"] for row in found["results"]] == ["alice"]
+    assert manager.search("anxious", since=after)["results"] == []
+    assert manager.search("anxious", until=before)["results"] == []
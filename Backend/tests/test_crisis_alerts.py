@@ -0,0 +1,47 @@
+"""
+A crisis message must raise a counselor alert with the default chat engine
+"""
+
+import importlib
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # State, mood logs and the conversation database go under the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BCRYPT_ROUNDS", "4")
+    monkeypatch.delenv("CHAT_ENGINE", raising=False)
+    main = importlib.import_module("main")
+    with TestClient(main.app) as client:
+        # Demo logins work once the startup task has hashed their passwords
+        async def demo_users_ready():
+            await main.app.state.demo_users_ready
+
+        client.portal.call(demo_users_ready)
+        yield client
+
+
+def login(client, email):
+    response = client.post("/auth/login", json={"email": email, "password": "123456"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_crisis_message_publishes_an_alert(client):
+    student = login(client, "student@demo.com")
+    admin = login(client, "admin@demo.com")
+    before = len(client.get("/admin/alerts", headers=admin).json()["alerts"])
+
+    reply = client.post("/chat/message", json={"message": "I want to end my life"}, headers=student)
+
+    assert reply.status_code == 200
+    assert reply.json()["risk_level"] == "critical"
+    alerts = client.get("/admin/alerts", headers=admin).json()["alerts"]
+    assert len(alerts) == before + 1
+    assert "end my life" in alerts[-1]["data"]["crisis_keywords"]
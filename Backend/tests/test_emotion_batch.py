@@ -0,0 +1,70 @@
+"""
+analyze_batch must agree with analyze_emotion, text for text
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import EMOTION_CODES, EmotionAnalyzer  # noqa: E402
+
+MIXED = [
+    "",
+    "I feel SAD and Alone tonight",
+    "Anxious, worried... and honestly a bit HOPEFUL?",
+    "I'm so stressed I made a mad dash",
+    "On Edge about the exam; burned out after it",
+    "on\nedge",
+    "nothing to report",
+    "\0lonely\0",
+    "TIRED tired tired",
+    "sadness and madness and hopelessness",
+]
+
+NON_ASCII = [
+    "Je suis très anxious aujourd'hui 😟",
+    "İstanbul made me feel lost",
+    "ΣΑΣ sad ΟΔΥΣΣΕΥΣ",
+    "Kelvin: Kind of numb",
+    "naïve and confused — really confused",
+    "日本語 stressed 日本語 overwhelmed",
+    "ﬁne but exhausted",
+    "İİİ empty",
+]
+
+
+def assert_matches(analyzer, texts):
+    codes, confidences = analyzer.analyze_batch(texts)
+    for text, code, confidence in zip(texts, codes, confidences):
+        emotion, expected = analyzer.analyze_emotion(text)
+        assert (EMOTION_CODES[code], confidence) == (emotion, expected), text
+
+
+@pytest.mark.parametrize("texts", [MIXED, NON_ASCII, MIXED + NON_ASCII], ids=["mixed", "non-ascii", "both"])
+def test_batch_matches_single_messages(texts):
+    assert_matches(EmotionAnalyzer(), texts)
+
+
+def test_keywords_across_lane_cuts():
+    # Short lanes put many keywords across the cuts between them
+    analyzer = EmotionAnalyzer()
+    analyzer.LANE_BYTES = 16
+    rng = random.Random(5)
+    keywords = [word for words in analyzer.emotion_lexicon.values() for word in words]
+    pieces = keywords + ["x", "é", "Ω", " ", "MAD", "Lonely", "😟"]
+    texts = [''.join(rng.choice(pieces) for _ in range(rng.randint(0, 12))) for _ in range(500)]
+    assert_matches(analyzer, texts + NON_ASCII + MIXED)
+
+
+def test_batch_chunks_and_empty_input():
+    analyzer = EmotionAnalyzer()
+    codes, confidences = analyzer.analyze_batch([])
+    assert len(codes) == len(confidences) == 0
+    texts = MIXED * 7 + NON_ASCII * 3
+    single = analyzer.analyze_batch(texts)
+    chunked = analyzer.analyze_batch(texts, chunk_size=4)
+    assert (single[0] == chunked[0]).all() and (single[1] == chunked[1]).all()
@@ -0,0 +1,43 @@
+"""
+Emotion trends are written in batches but must never be lost
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import EmotionCategory, EmotionTrendStore  # noqa: E402
+
+
+def stored_users(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {row[0] for row in conn.execute("SELECT user_id FROM emotion_trends")}
+
+
+def test_writes_wait_for_a_flush(tmp_path):
+    db_path = str(tmp_path / "trends.db")
+    store = EmotionTrendStore(db_path, max_users=4, flush_seconds=3600)
+    store.record("alice", EmotionCategory.LONELY, now=1000.0)
+    store.record("bob", EmotionCategory.HOPEFUL, now=1000.0)
+    assert stored_users(db_path) == set()
+
+    store.flush()
+    assert stored_users(db_path) == {"alice", "bob"}
+
+
+def test_evicted_and_closed_slots_are_saved(tmp_path):
+    db_path = str(tmp_path / "trends.db")
+    store = EmotionTrendStore(db_path, max_users=1, flush_seconds=3600)
+    store.record("alice", EmotionCategory.LONELY, now=1000.0)
+    store.record("bob", EmotionCategory.HOPEFUL, now=1000.0)
+    assert stored_users(db_path) == {"alice"}
+
+    trend = store.record("alice", EmotionCategory.LONELY, now=1000.0)
+    assert trend == {EmotionCategory.LONELY: 2.0}
+    store.close()
+
+    reopened = EmotionTrendStore(db_path, max_users=2)
+    assert reopened.trend("bob", now=1000.0) == {EmotionCategory.HOPEFUL: 1.0}
+    assert [emotion for emotion, _ in reopened.recent("alice")] == [EmotionCategory.LONELY] * 2
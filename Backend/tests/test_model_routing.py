@@ -0,0 +1,49 @@
+"""
+The fast route is optional: it must never take readiness or replies down with it
+"""
+
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import MentalHealthChatbot  # noqa: E402
+
+
+@pytest.fixture
+def chatbot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return MentalHealthChatbot(model_name="primary-model", fast_model_name="fast-model")
+
+
+def test_fast_route_error_falls_back_to_primary(chatbot):
+    models = []
+
+    def stream_reply(route, messages, deadline, expires_at, on_chunk=None):
+        models.append(route.model_name)
+        if route.name == "fast":
+            raise RuntimeError("model 'fast-model' not found")
+        return "primary reply"
+
+    chatbot._stream_reply = stream_reply
+    chatbot.model_ready = True
+
+    assert chatbot.generate_response("hi") == "primary reply"
+    assert models == ["fast-model", "primary-model"]
+    assert chatbot.model_ready
+    routes = chatbot.router.stats()
+    assert routes["fast"]["errors"] == 1 and routes["primary"]["hits"] == 1
+
+
+def test_readiness_ignores_a_missing_fast_model(chatbot, monkeypatch):
+    def generate(model, prompt, keep_alive):
+        if model == "fast-model":
+            raise RuntimeError("model 'fast-model' not found")
+
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(generate=generate))
+
+    assert chatbot.load_model()
+    assert chatbot.model_status()["ready"]
@@ -0,0 +1,31 @@
+"""
+Merging appended rows into the per-user index must match a full rebuild
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mood_store import MoodStore  # noqa: E402
+
+
+def test_merged_index_matches_a_rebuild(tmp_path, monkeypatch):
+    monkeypatch.setattr(MoodStore, "REINDEX_ROWS", 97)
+    store = MoodStore(str(tmp_path))
+    rng = random.Random(3)
+    expected = {}
+    for timestamp in range(3000):
+        # New users keep arriving after the first merges
+        user = f"user{rng.randrange(20 + timestamp // 50)}"
+        store.append(user, "Student", "calm", None, timestamp)
+        expected.setdefault(user, []).append(timestamp)
+
+    assert store._indexed_rows > 0
+    for user, rows in expected.items():
+        assert store.rows_for(user, "Student").tolist() == rows
+    store._merge_tails()
+    merged = store._order.copy()
+    store._build_index()
+    assert (store._order == merged).all()
@@ -0,0 +1,130 @@
+"""
+RedisRateLimiter against a stubbed redis.asyncio client
+
+redis is an optional dependency, so the client is replaced by one whose
+evalsha runs the limiter script's token bucket step in Python.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ratelimit  # noqa: E402
+from ratelimit import RateLimit, RedisRateLimiter  # noqa: E402
+
+
+class FakeScript:
+    """Mirrors redis.commands.core.AsyncScript: calling it runs EVALSHA"""
+
+    def __init__(self, client, script):
+        self.client = client
+        self.sha = hashlib.sha1(script.encode()).hexdigest()
+
+    async def __call__(self, keys=(), args=()):
+        return await self.client.evalsha(self.sha, len(keys), *keys, *args)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.ttls = {}
+        self.scripts = {}
+        self.calls = []
+
+    @classmethod
+    def from_url(cls, url):
+        client = cls()
+        client.url = url
+        return client
+
+    def register_script(self, script):
+        fake = FakeScript(self, script)
+        self.scripts[fake.sha] = script
+        return fake
+
+    async def evalsha(self, sha, numkeys, *keys_and_args):
+        assert self.scripts[sha] == RedisRateLimiter.SCRIPT
+        # Redis hands script arguments over as strings
+        keys = keys_and_args[:numkeys]
+        rate, burst, now, cost = (float(str(arg)) for arg in keys_and_args[numkeys:])
+        self.calls.append(keys)
+        await asyncio.sleep(0)
+
+        # One step, with no await, so it is atomic like the Lua script
+        bucket = self.hashes.get(keys[0])
+        if bucket is None:
+            tokens = burst
+        else:
+            tokens = min(burst, bucket["tokens"] + (now - bucket["updated"]) * rate)
+        allowed, retry_after = 0, 0.0
+        if tokens >= cost:
+            tokens -= cost
+            allowed = 1
+        else:
+            retry_after = (cost - tokens) / rate
+        self.hashes[keys[0]] = {"tokens": tokens, "updated": now}
+        self.ttls[keys[0]] = math.ceil(burst / rate) + 60
+        return [allowed, repr(retry_after).encode()]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(ratelimit.time, "time", lambda: clock.now)
+    return clock
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    redis = types.ModuleType("redis")
+    redis.asyncio = types.SimpleNamespace(Redis=FakeRedis)
+    monkeypatch.setitem(sys.modules, "redis", redis)
+    monkeypatch.setitem(sys.modules, "redis.asyncio", redis.asyncio)
+    return RedisRateLimiter("redis://localhost:6379/0", prefix="test:")
+
+
+def hits(limiter, key, limit, count):
+    async def run():
+        return [await limiter.hit(key, limit) for _ in range(count)]
+    return asyncio.run(run())
+
+
+def test_burst_then_refill(limiter, clock):
+    limit = RateLimit.per_minute(6, burst=3)
+
+    results = hits(limiter, "login:1.2.3.4", limit, 4)
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[-1][1] == pytest.approx(10.0)
+    assert limiter._client.calls[0] == ("test:login:1.2.3.4",)
+    assert limiter._client.ttls["test:login:1.2.3.4"] == 90
+
+    # One token comes back every 10 seconds, up to the burst
+    clock.now += 10
+    assert hits(limiter, "login:1.2.3.4", limit, 2) == [(True, 0.0), (False, pytest.approx(10.0))]
+    clock.now += 3600
+    results = hits(limiter, "login:1.2.3.4", limit, 4)
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+
+
+def test_buckets_are_per_key(limiter, clock):
+    limit = RateLimit.per_minute(60, burst=1)
+    assert hits(limiter, "chat:alice", limit, 2)[1][0] is False
+    assert hits(limiter, "chat:bob", limit, 1) == [(True, 0.0)]
+
+
+def test_concurrent_hits_never_exceed_the_burst(limiter, clock):
+    limit = RateLimit.per_minute(60, burst=5)
+
+    async def run():
+        return await asyncio.gather(*(limiter.hit("chat:alice", limit) for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert sum(allowed for allowed, _ in results) == 5
+    assert all(isinstance(allowed, bool) and isinstance(wait, float) for allowed, wait in results)
@@ -5,12 +5,14 @@ import AdminStats from './AdminStats';
 import StudentManagement from './StudentManagement';
 import BookingManagement from './BookingManagement';
 import MoodAnalytics from './MoodAnalytics';
+import ConversationSearch from './ConversationSearch';
 import { apiService } from '../services/api';
 
 const AdminDashboard = ({ user, onLogout }) => {
   const [activeTab, setActiveTab] = useState('stats');
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
+  const [crisisAlerts, setCrisisAlerts] = useState([]);
 
   // Verify admin access
   useEffect(() => {
@@ -19,6 +21,18 @@ const AdminDashboard = ({ user, onLogout }) => {
     }
   }, [user]);
 
+  // Live crisis alerts; keep the most recent few on screen
+  useEffect(() => {
+    if (user?.role !== 'admin') return undefined;
+    return apiService.subscribeCrisisAlerts((alert) => {
+      setCrisisAlerts((current) => [alert, ...current.filter((a) => a.id !== alert.id)].slice(0, 5));
+    });
+  }, [user]);
+
+  const dismissAlert = (alertId) => {
+    setCrisisAlerts((current) => current.filter((a) => a.id !== alertId));
+  };
+
   const handleTabChange = (tab) => {
     setActiveTab(tab);
     setError(''); // Clear any previous errors
@@ -105,6 +119,13 @@ const AdminDashboard = ({ user, onLogout }) => {
           <span className="nav-icon">📈</span>
           Analytics
         </button>
+        <button 
+          className={activeTab === 'conversations' ? 'active' : ''} 
+          onClick={() => handleTabChange('conversations')}
+        >
+          <span className="nav-icon">🔍</span>
+          Conversations
+        </button>
       </nav>
       
       <main className="dashboard-content">
@@ -113,11 +134,23 @@ const AdminDashboard = ({ user, onLogout }) => {
             <strong>Error:</strong> {error}
           </div>
         )}
+
+        {crisisAlerts.map((alert) => (
+          <div key={alert.id} className="error-banner">
+            <strong>Crisis alert:</strong> {alert.data.name} ({alert.data.email}) at{' '}
+            {new Date(alert.timestamp + 'Z').toLocaleTimeString()}
+            {alert.data.crisis_keywords.length > 0 && ` — "${alert.data.crisis_keywords.join('", "')}"`}
+            <button onClick={() => dismissAlert(alert.id)} className="action-btn">
+              Dismiss
+            </button>
+          </div>
+        ))}
         
         {activeTab === 'stats' && <AdminStats />}
         {activeTab === 'bookings' && <BookingManagement />}
         {activeTab === 'students' && <StudentManagement />}
         {activeTab === 'analytics' && <MoodAnalytics />}
+        {activeTab === 'conversations' && <ConversationSearch />}
       </main>
     </div>
   );
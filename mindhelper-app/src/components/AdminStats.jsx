@@ -5,8 +5,8 @@ import './AdminStats.css';
 
 const AdminStats = () => {
   const [stats, setStats] = useState(null);
-  const [users, setUsers] = useState([]);
-  const [bookings, setBookings] = useState([]);
+  const [recentRegistrations, setRecentRegistrations] = useState([]);
+  const [recentBookings, setRecentBookings] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [refreshing, setRefreshing] = useState(false);
@@ -15,15 +15,13 @@ const AdminStats = () => {
   const fetchAdminData = async () => {
     try {
       setError('');
-      const [statsData, usersData, bookingsData] = await Promise.all([
-        apiService.getAdminStats(),
-        apiService.getAllUsers(),
-        apiService.getAllBookings()
-      ]);
+      // Counters and the newest records come from one call; the server keeps
+      // them ready, so nothing is sorted here
+      const dashboard = await apiService.getAdminDashboard(3);
 
-      setStats(statsData.stats);
-      setUsers(usersData.users || []);
-      setBookings(bookingsData.bookings || []);
+      setStats(dashboard.stats);
+      setRecentRegistrations(dashboard.recent_registrations || []);
+      setRecentBookings(dashboard.recent_bookings || []);
     } catch (error) {
       console.error('Failed to fetch admin data:', error);
       setError(error.message || 'Failed to load dashboard data');
@@ -46,37 +44,31 @@ const AdminStats = () => {
   const getRecentActivities = () => {
     const activities = [];
     
-    // Add recent bookings
-    bookings
-      .sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
-      .slice(0, 3)
-      .forEach(booking => {
-        activities.push({
-          id: `booking-${booking.id}`,
-          student: booking.user_name,
-          action: `Booked counseling session for ${booking.date} at ${booking.time}`,
-          time: formatTimeAgo(booking.created_at),
-          type: 'booking'
-        });
+    // Both lists arrive newest first
+    recentBookings.forEach(booking => {
+      activities.push({
+        id: `booking-${booking.id}`,
+        student: booking.user_name,
+        action: `Booked counseling session for ${booking.date} at ${booking.time}`,
+        createdAt: booking.created_at,
+        time: formatTimeAgo(booking.created_at),
+        type: 'booking'
       });
+    });
 
-    // Add recent user registrations
-    users
-      .filter(user => user.role === 'student')
-      .sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
-      .slice(0, 2)
-      .forEach(user => {
-        activities.push({
-          id: `user-${user.user_id}`,
-          student: user.name,
-          action: 'Registered on the platform',
-          time: formatTimeAgo(user.created_at),
-          type: 'registration'
-        });
+    recentRegistrations.slice(0, 2).forEach(user => {
+      activities.push({
+        id: `user-${user.user_id}`,
+        student: user.name,
+        action: 'Registered on the platform',
+        createdAt: user.created_at,
+        time: formatTimeAgo(user.created_at),
+        type: 'registration'
       });
+    });
 
     return activities
-      .sort((a, b) => new Date(b.time) - new Date(a.time))
+      .sort((a, b) => new Date(b.createdAt) - new Date(a.createdAt))
       .slice(0, 5);
   };
 
@@ -28,18 +28,19 @@ const BookingManagement = () => {
     }
   };
 
-  const updateBookingStatus = async (bookingId, newStatus) => {
+  const updateBookingStatus = async (booking, newStatus) => {
     try {
-      setUpdating(bookingId);
-      // For now, update locally (you can add API endpoint later)
-      setBookings(prev => prev.map(booking => 
-        booking.id === bookingId 
-          ? { ...booking, status: newStatus }
-          : booking
+      setUpdating(booking.id);
+      setError('');
+      const response = await apiService.updateBookingStatus(booking.id, newStatus, booking.version);
+      setBookings(prev => prev.map(b => 
+        b.id === booking.id ? response.booking : b
       ));
     } catch (error) {
       console.error('Failed to update booking:', error);
       setError(error.message || 'Failed to update booking');
+      // Another admin may have changed this booking; reload the latest versions
+      fetchBookings();
     } finally {
       setUpdating(null);
     }
@@ -202,14 +203,14 @@ const BookingManagement = () => {
                     <>
                       <button
                         className="action-btn confirm"
-                        onClick={() => updateBookingStatus(booking.id, 'confirmed')}
+                        onClick={() => updateBookingStatus(booking, 'confirmed')}
                         disabled={updating === booking.id}
                       >
                         ✓ Confirm
                       </button>
                       <button
                         className="action-btn cancel"
-                        onClick={() => updateBookingStatus(booking.id, 'cancelled')}
+                        onClick={() => updateBookingStatus(booking, 'cancelled')}
                         disabled={updating === booking.id}
                       >
                         ✗ Cancel
@@ -219,7 +220,7 @@ const BookingManagement = () => {
                   {booking.status === 'confirmed' && (
                     <button
                       className="action-btn complete"
-                      onClick={() => updateBookingStatus(booking.id, 'completed')}
+                      onClick={() => updateBookingStatus(booking, 'completed')}
                       disabled={updating === booking.id}
                     >
                       ✓ Mark Complete
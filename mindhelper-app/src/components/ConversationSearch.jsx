@@ -0,0 +1,139 @@
+// src/components/ConversationSearch.jsx
+import React, { useState } from 'react';
+import { apiService } from '../services/api';
+import './ConversationSearch.css';
+
+const RISK_LEVELS = ['critical', 'high', 'moderate', 'low'];
+const PAGE_SIZE = 20;
+
+// The server stores naive UTC timestamps; a picked local date starts at local midnight
+const utcFromLocalDate = (date, addDays = 0) => {
+  const local = new Date(`${date}T00:00`);
+  local.setDate(local.getDate() + addDays);
+  return local.toISOString().slice(0, -1);
+};
+
+// ** pairs mark the matched words in a snippet
+const Snippet = ({ text }) => (
+  <>
+    {text.split('**').map((part, index) => (index % 2 ? <mark key={index}>{part}</mark> : part))}
+  </>
+);
+
+const ConversationSearch = () => {
+  const [query, setQuery] = useState('');
+  const [since, setSince] = useState('');
+  const [until, setUntil] = useState('');
+  const [riskLevels, setRiskLevels] = useState([]);
+  const [results, setResults] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState('');
+
+  const search = async (page = 1) => {
+    if (!query.trim()) return;
+    try {
+      setLoading(true);
+      setError('');
+      const response = await apiService.searchConversations(query.trim(), {
+        since: since ? utcFromLocalDate(since) : undefined,
+        until: until ? utcFromLocalDate(until, 1) : undefined,
+        riskLevels,
+        page,
+        pageSize: PAGE_SIZE,
+      });
+      setResults(response);
+    } catch (error) {
+      console.error('Conversation search failed:', error);
+      setError(error.message || 'Search failed');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const handleSubmit = (e) => {
+    e.preventDefault();
+    search(1);
+  };
+
+  const toggleRiskLevel = (level) => {
+    setRiskLevels((current) =>
+      current.includes(level) ? current.filter((l) => l !== level) : [...current, level]
+    );
+  };
+
+  return (
+    <div className="conversation-search">
+      <h2>Conversation Search</h2>
+      <form className="search-form" onSubmit={handleSubmit}>
+        <input
+          type="search"
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+          placeholder="Words or phrases from chat transcripts"
+          maxLength={200}
+        />
+        <label>
+          From <input type="date" value={since} onChange={(e) => setSince(e.target.value)} />
+        </label>
+        <label>
+          To <input type="date" value={until} onChange={(e) => setUntil(e.target.value)} />
+        </label>
+        <div className="risk-filters">
+          {RISK_LEVELS.map((level) => (
+            <label key={level}>
+              <input
+                type="checkbox"
+                checked={riskLevels.includes(level)}
+                onChange={() => toggleRiskLevel(level)}
+              />
+              {level}
+            </label>
+          ))}
+        </div>
+        <button type="submit" className="action-btn" disabled={loading || !query.trim()}>
+          {loading ? 'Searching...' : 'Search'}
+        </button>
+      </form>
+
+      {error && (
+        <div className="error-banner">
+          <strong>Error:</strong> {error}
+        </div>
+      )}
+
+      {results && (
+        <>
+          {results.results.length === 0 && <p>No conversations match.</p>}
+          {!results.exhaustive && (
+            <p className="search-note">Only the most recent matches were ranked; narrow the dates to see older ones.</p>
+          )}
+          <ul className="search-results">
+            {results.results.map((row) => (
+              <li key={row.id} className="search-result">
+                <div className="result-meta">
+                  <span className={`risk-badge risk-${row.risk_level}`}>{row.risk_level} risk</span>
+                  <span>{row.emotion_detected}</span>
+                  <span>{new Date(row.timestamp + 'Z').toLocaleString()}</span>
+                  <span className="result-user">User {row.user_id}</span>
+                </div>
+                <p><strong>Student:</strong> <Snippet text={row.user_snippet} /></p>
+                <p><strong>Assistant:</strong> <Snippet text={row.bot_snippet} /></p>
+              </li>
+            ))}
+          </ul>
+          <div className="search-pages">
+            <button className="action-btn" disabled={loading || results.page === 1} onClick={() => search(results.page - 1)}>
+              Previous
+            </button>
+            <span>Page {results.page}</span>
+            <button className="action-btn" disabled={loading || !results.has_more} onClick={() => search(results.page + 1)}>
+              Next
+            </button>
+          </div>
+        </>
+      )}
+    </div>
+  );
+};
+
+export default ConversationSearch;
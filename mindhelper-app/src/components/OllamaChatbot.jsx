@@ -10,6 +10,7 @@ const OllamaChatbot = () => {
   const [sessionId, setSessionId] = useState(null);
   const [analysis, setAnalysis] = useState(null);
   const messagesEndRef = useRef(null);
+  const sessionRef = useRef(null);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -20,8 +21,18 @@ const OllamaChatbot = () => {
   }, [messages]);
 
   useEffect(() => {
-    // Start chat session when component mounts
+    sessionRef.current = sessionId;
+  }, [sessionId]);
+
+  useEffect(() => {
+    // Start chat session when component mounts, and end it on the way out
+    // so the server records its summary now rather than at the idle timeout
     startChatSession();
+    return () => {
+      if (sessionRef.current) {
+        apiService.endChatSession(sessionRef.current).catch(() => {});
+      }
+    };
   }, []);
 
   const startChatSession = async () => {
@@ -65,6 +76,8 @@ const OllamaChatbot = () => {
 
     try {
       const result = await apiService.sendMessage(inputText, sessionId);
+      // The server starts a new session if ours timed out
+      setSessionId(result.session_id);
       
       const botMessage = {
         id: messages.length + 2,
@@ -98,6 +111,28 @@ const OllamaChatbot = () => {
     }
   };
 
+  const handleEndSession = async () => {
+    if (!sessionId || loading) return;
+    try {
+      setLoading(true);
+      const result = await apiService.endChatSession(sessionId);
+      setMessages(prev => [...prev, {
+        id: prev.length + 1,
+        text: result.message,
+        sender: 'bot',
+        timestamp: new Date().toLocaleTimeString()
+      }]);
+    } catch (error) {
+      // The server may have ended it already (idle timeout)
+      console.error('Error ending chat session:', error);
+    } finally {
+      // The next message starts a new session
+      setSessionId(null);
+      setAnalysis(null);
+      setLoading(false);
+    }
+  };
+
   const handleKeyPress = (e) => {
     if (e.key === 'Enter' && !e.shiftKey) {
       e.preventDefault();
@@ -120,6 +155,13 @@ const OllamaChatbot = () => {
         {sessionId && (
           <div className="session-info">
             Session Active • {messages.length} messages
+            <button
+              onClick={handleEndSession}
+              disabled={loading}
+              className="end-session-btn"
+            >
+              End session
+            </button>
           </div>
         )}
       </div>
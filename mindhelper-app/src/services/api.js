@@ -4,6 +4,8 @@ const API_BASE_URL = 'http://localhost:8000';
 class ApiService {
   constructor() {
     this.token = localStorage.getItem('authToken');
+    this.refreshToken = localStorage.getItem('refreshToken');
+    this.refreshing = null;
     this.user = JSON.parse(localStorage.getItem('user') || 'null');
   }
 
@@ -16,6 +18,15 @@ class ApiService {
     }
   }
 
+  setRefreshToken(token) {
+    this.refreshToken = token;
+    if (token) {
+      localStorage.setItem('refreshToken', token);
+    } else {
+      localStorage.removeItem('refreshToken');
+    }
+  }
+
   setUser(user) {
     this.user = user;
     if (user) {
@@ -27,11 +38,55 @@ class ApiService {
 
   removeToken() {
     this.token = null;
+    this.refreshToken = null;
     this.user = null;
     localStorage.removeItem('authToken');
+    localStorage.removeItem('refreshToken');
     localStorage.removeItem('user');
   }
 
+  // Swap the refresh token for a new pair; concurrent callers share one
+  // attempt, since a refresh token is only good once
+  refreshSession() {
+    if (!this.refreshing) {
+      this.refreshing = this.rotateTokens().finally(() => {
+        this.refreshing = null;
+      });
+    }
+    return this.refreshing;
+  }
+
+  async rotateTokens() {
+    // Another tab may already have spent our refresh token and stored the new pair
+    const stored = localStorage.getItem('refreshToken');
+    if (stored && stored !== this.refreshToken) {
+      this.token = localStorage.getItem('authToken');
+      this.refreshToken = stored;
+      return true;
+    }
+    if (!this.refreshToken) {
+      return false;
+    }
+
+    try {
+      const response = await fetch(`${API_BASE_URL}/auth/refresh`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: this.refreshToken }),
+      });
+      if (!response.ok) {
+        return false;
+      }
+      const result = await response.json();
+      this.setToken(result.access_token);
+      this.setRefreshToken(result.refresh_token);
+      return true;
+    } catch (error) {
+      console.error('Token refresh failed:', error);
+      return false;
+    }
+  }
+
   isAuthenticated() {
     return !!this.token;
   }
@@ -44,7 +99,7 @@ class ApiService {
     return this.user?.role === 'student';
   }
 
-  async request(endpoint, options = {}) {
+  async request(endpoint, options = {}, retried = false) {
     const url = `${API_BASE_URL}${endpoint}`;
     
     const config = {
@@ -82,6 +137,10 @@ class ApiService {
 
       if (!response.ok) {
         if (response.status === 401) {
+          // An expired access token is renewed once, without asking for the password
+          if (!retried && !endpoint.startsWith('/auth/') && await this.refreshSession()) {
+            return this.request(endpoint, options, true);
+          }
           console.log('401 error - removing token and reloading');
           this.removeToken();
           // Don't reload automatically, let the app handle it
@@ -149,6 +208,7 @@ class ApiService {
       
       if (token) {
         this.setToken(token);
+        this.setRefreshToken(result.refresh_token || null);
         
         // Get user details
         const userDetails = await this.getCurrentUser();
@@ -172,7 +232,14 @@ class ApiService {
 
   async logout() {
     try {
-      if (this.token) {
+      // The refresh token still identifies this login once the access token
+      // has expired, so it is what the server revokes
+      if (this.refreshToken) {
+        await this.request('/auth/logout', {
+          method: 'POST',
+          body: JSON.stringify({ refresh_token: this.refreshToken }),
+        });
+      } else if (this.token) {
         await this.request('/auth/logout', { method: 'POST' });
       }
     } catch (error) {
@@ -208,6 +275,10 @@ class ApiService {
     });
   }
 
+  async endChatSession(sessionId) {
+    return this.request(`/chat/sessions/${encodeURIComponent(sessionId)}/end`, { method: 'POST' });
+  }
+
   // Booking endpoints
   async createBooking(bookingData) {
     return this.request('/bookings/create', {
@@ -224,6 +295,13 @@ class ApiService {
     return this.request('/bookings/all');
   }
 
+  async updateBookingStatus(bookingId, status, version) {
+    return this.request(`/bookings/${bookingId}/status`, {
+      method: 'PATCH',
+      body: JSON.stringify({ status, version }),
+    });
+  }
+
   // Mood endpoints
   async addMoodEntry(moodData) {
     return this.request('/mood/entry', {
@@ -244,6 +322,72 @@ class ApiService {
   async getAllUsers() {
     return this.request('/admin/users');
   }
+
+  async getAdminDashboard(k = 3) {
+    return this.request(`/admin/dashboard?k=${k}`);
+  }
+
+  async searchConversations(query, { userId, since, until, riskLevels = [], page = 1, pageSize = 20 } = {}) {
+    const params = new URLSearchParams({ q: query, page, page_size: pageSize });
+    if (userId) params.append('user_id', userId);
+    if (since) params.append('since', since);
+    if (until) params.append('until', until);
+    riskLevels.forEach(level => params.append('risk_level', level));
+    return this.request(`/admin/conversations/search?${params}`);
+  }
+
+  // Crisis alerts are pushed over server-sent events. The token is part of
+  // the stream's URL, so rather than letting EventSource reconnect with a
+  // token that may have expired, every drop reopens the stream with the
+  // current one (refreshed first if the server refused it), resuming after
+  // the last event received
+  subscribeCrisisAlerts(onAlert) {
+    let source = null;
+    let lastEventId = null;
+    let retryTimer = null;
+    let retryDelay = 1000;
+    let stopped = false;
+
+    const open = () => {
+      if (stopped) {
+        return;
+      }
+      let url = `${API_BASE_URL}/admin/alerts/stream?access_token=${encodeURIComponent(this.token)}`;
+      if (lastEventId !== null) {
+        url += `&last_event_id=${encodeURIComponent(lastEventId)}`;
+      }
+      source = new EventSource(url);
+      source.onopen = () => {
+        retryDelay = 1000;
+      };
+      source.addEventListener('crisis', (event) => {
+        lastEventId = event.lastEventId;
+        onAlert(JSON.parse(event.data));
+      });
+      source.onerror = () => {
+        // CLOSED means the server answered with an error (401 once the
+        // token has expired); otherwise the connection just dropped
+        const refused = source.readyState === EventSource.CLOSED;
+        source.close();
+        const renewed = refused ? this.refreshSession() : Promise.resolve(true);
+        renewed.then((ok) => {
+          if (ok && !stopped) {
+            retryTimer = setTimeout(open, retryDelay);
+            retryDelay = Math.min(retryDelay * 2, 30000);
+          }
+        });
+      };
+    };
+
+    open();
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      if (source) {
+        source.close();
+      }
+    };
+  }
 }
 
 export const apiService = new ApiService();